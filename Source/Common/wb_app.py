@@ -25,6 +25,7 @@ from PyQt5 import QtGui
 import wb_platform_specific
 import wb_logging
 import wb_background_thread
+import wb_stall_watchdog
 
 qt_event_type_names = {}
 for name in dir(QtCore.QEvent):
@@ -75,6 +76,8 @@ class WbApp(wb_logging.AppLoggingMixin,
         self.__trace = False
         self.__git_debug = False
         self.__log_stdout = False
+        self.__stall_watchdog_ms = None
+        self.stall_watchdog = None
 
         self.all_positional_args = []
 
@@ -98,6 +101,10 @@ class WbApp(wb_logging.AppLoggingMixin,
                 self.__log_stdout = True
                 del args[ 1 ]
 
+            elif arg.startswith( '--stall-watchdog=' ):
+                self.__stall_watchdog_ms = int( arg[len('--stall-watchdog='):] )
+                del args[ 1 ]
+
             elif arg == '--debug' and len(args) > 2:
                 self.__debug = True
                 debug_config_string = args[2]
@@ -186,6 +193,11 @@ class WbApp(wb_logging.AppLoggingMixin,
 
         # background threads depend on Qt
         self.startBackgoundThread()
+
+        if self.__stall_watchdog_ms is not None:
+            self.stall_watchdog = wb_stall_watchdog.WbStallWatchdog( self, self.__stall_watchdog_ms )
+            self.stall_watchdog.start()
+
         self.log.infoheader( T_('Starting %s') % (' '.join( self.app_name_parts ),) )
 
         self.prefs_manager = self.createPreferencesManager()
@@ -0,0 +1,278 @@
+'''
+ ====================================================================
+ Copyright (c) 2016 Barry A Scott.  All rights reserved.
+
+ This software is licensed as described in the file LICENSE.txt,
+ which you should have received as part of this distribution.
+
+ ====================================================================
+
+    wb_async_commands.py
+
+    Run helper commands, such as git status, on an asyncio event loop
+    in its own thread so that several commands run at the same time.
+
+    A thread_switcher generator makes a WbAsyncCommandsWait, which
+    starts the commands at once, goes on with other work and then
+    yields the WbAsyncCommandsWait. No background worker is held while
+    the commands run. The generator carries on in the background once
+    all of the commands have finished. If the task is cancelled first
+    the commands are killed.
+
+    Code that is not a generator can use startCommand() and
+    waitForResult(), which blocks the calling thread.
+
+    Callers must check isSupported() first and run the command
+    another way if it returns False.
+
+'''
+import sys
+import os
+import asyncio
+import threading
+import concurrent.futures
+
+import wb_background_thread
+
+class WbAsyncCommandError(Exception):
+    pass
+
+class WbAsyncCommandResult:
+    def __init__( self, returncode, all_records, stderr ):
+        self.returncode = returncode
+        # None when the records were passed to the record_handler
+        self.all_records = all_records
+        self.stderr = stderr
+
+    def __repr__( self ):
+        return '<WbAsyncCommandResult: rc %r>' % (self.returncode,)
+
+class WbAsyncCommand:
+    '''
+    stdout is split into records at separator as it arrives.
+    Each record is passed to record_handler on the event loop thread
+    or, if there is no record_handler, kept in the result.
+    '''
+    def __init__( self, all_args, cwd, env=None, timeout=None, record_handler=None, separator=b'\n' ):
+        self.all_args = all_args
+        self.cwd = cwd
+        self.env = env
+        self.timeout = timeout
+        self.record_handler = record_handler
+        self.separator = separator
+
+    def __repr__( self ):
+        return '<WbAsyncCommand: %s>' % (' '.join( str(arg) for arg in self.all_args ),)
+
+    async def run( self ):
+        kwds = {}
+        if sys.platform == 'win32':
+            # CREATE_NO_WINDOW
+            kwds['creationflags'] = 0x08000000
+
+        proc = await asyncio.create_subprocess_exec(
+                    *[str(arg) for arg in self.all_args],
+                    cwd=str(self.cwd),
+                    env=self.env,
+                    stdin=asyncio.subprocess.DEVNULL,
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.PIPE,
+                    **kwds )
+
+        try:
+            if self.timeout is None:
+                return await self.__communicate( proc )
+
+            return await asyncio.wait_for( self.__communicate( proc ), self.timeout )
+
+        except asyncio.TimeoutError:
+            raise WbAsyncCommandError( '%r timed out after %ss' % (self, self.timeout) )
+
+        finally:
+            # timed out or cancelled
+            if proc.returncode is None:
+                proc.kill()
+                await proc.wait()
+
+    async def __communicate( self, proc ):
+        all_records = [] if self.record_handler is None else None
+        record_handler = self.record_handler if self.record_handler is not None else all_records.append
+
+        stderr_task = asyncio.ensure_future( proc.stderr.read() )
+        try:
+            pending = b''
+            while True:
+                data = await proc.stdout.read( 65536 )
+                if data == b'':
+                    break
+
+                pending += data
+                *all_complete, pending = pending.split( self.separator )
+                for record in all_complete:
+                    record_handler( record.decode( 'utf-8', 'surrogateescape' ) )
+
+            if pending != b'':
+                record_handler( pending.decode( 'utf-8', 'surrogateescape' ) )
+
+            stderr = await stderr_task
+
+        finally:
+            if not stderr_task.done():
+                stderr_task.cancel()
+
+        returncode = await proc.wait()
+        return WbAsyncCommandResult( returncode, all_records, stderr.decode( 'utf-8', 'replace' ) )
+
+class WbAsyncCommandRunner(threading.Thread):
+    def __init__( self ):
+        threading.Thread.__init__( self, name='AsyncCommandRunner' )
+        self.setDaemon( 1 )
+
+        if sys.platform == 'win32':
+            # only the proactor loop can run subprocesses on windows
+            self.loop = asyncio.ProactorEventLoop()
+
+        else:
+            self.loop = asyncio.new_event_loop()
+
+    def run( self ):
+        asyncio.set_event_loop( self.loop )
+        self.loop.run_forever()
+
+    def startCommand( self, command ):
+        return asyncio.run_coroutine_threadsafe( command.run(), self.loop )
+
+    def cancelOnCancelToken( self, cancel_token, all_futures ):
+        # kill the commands if cancel_token is cancelled before they finish
+        asyncio.run_coroutine_threadsafe( self.__watchCancelToken( cancel_token, all_futures ), self.loop )
+
+    async def __watchCancelToken( self, cancel_token, all_futures ):
+        while not all( future.done() for future in all_futures ):
+            if cancel_token.isCancelled():
+                for future in all_futures:
+                    future.cancel()
+
+                return
+
+            await asyncio.sleep( cancel_poll_interval )
+
+def isSupported():
+    '''
+    return True if commands can be run on the event loop thread.
+
+    Before python 3.8 the unix child watcher needs a loop
+    in the main thread, which is the Qt event loop.
+    '''
+    return sys.platform == 'win32' or sys.version_info >= (3, 8)
+
+__runner = None
+__runner_lock = threading.Lock()
+
+def commandRunner():
+    global __runner
+    with __runner_lock:
+        if __runner is None:
+            __runner = WbAsyncCommandRunner()
+            __runner.start()
+
+        return __runner
+
+def startCommand( command ):
+    '''
+    start running command and return a future for its WbAsyncCommandResult
+    '''
+    if not isSupported():
+        raise WbAsyncCommandError( 'cannot run %r on an event loop thread with python %d.%d' % (command, sys.version_info[0], sys.version_info[1]) )
+
+    return commandRunner().startCommand( command )
+
+# how often a waiting thread checks for cancellation
+cancel_poll_interval = 0.1
+
+def waitForResult( future ):
+    '''
+    return the WbAsyncCommandResult of the future from startCommand()
+    raises CancelledError if the calling task is cancelled first
+    '''
+    cancel_token = wb_background_thread.currentCancelToken()
+    while True:
+        try:
+            return future.result( timeout=cancel_poll_interval )
+
+        except concurrent.futures.TimeoutError:
+            if cancel_token.isCancelled():
+                # kills the command
+                future.cancel()
+                raise wb_background_thread.CancelledError()
+
+class WbAsyncCommandsWait:
+    '''
+    yield from a thread_switcher generator in place of app.switchToBackground
+    to wait for all_commands without holding a background worker.
+    results() then returns their WbAsyncCommandResult in the same order.
+    '''
+    def __init__( self, app, all_commands ):
+        self.app = app
+        # made on the generator's thread so this is the task's token
+        self.cancel_token = wb_background_thread.currentCancelToken()
+
+        self.__all_futures = [startCommand( command ) for command in all_commands]
+
+        self.__lock = threading.Lock()
+        self.__num_running = len(self.__all_futures)
+        self.__next_step = None
+
+    def __repr__( self ):
+        return '<WbAsyncCommandsWait: %d commands>' % (len(self.__all_futures),)
+
+    def __call__( self, function, args, serial_key=None, priority=None ):
+        # called by the thread switcher like app.runInBackground
+        self.__next_step = (function, args, serial_key, priority)
+        if len(self.__all_futures) == 0:
+            self.__runNextStep()
+            return
+
+        commandRunner().cancelOnCancelToken( self.cancel_token, self.__all_futures )
+        for future in self.__all_futures:
+            future.add_done_callback( self.__commandDone )
+
+    def __commandDone( self, future ):
+        with self.__lock:
+            self.__num_running -= 1
+            if self.__num_running > 0:
+                return
+
+        self.__runNextStep()
+
+    def __runNextStep( self ):
+        function, args, serial_key, priority = self.__next_step
+        self.app.runInBackground( function, args, serial_key=serial_key, priority=priority )
+
+    def cancel( self ):
+        # kills the commands that are still running
+        for future in self.__all_futures:
+            future.cancel()
+
+    def results( self ):
+        try:
+            return [future.result() for future in self.__all_futures]
+
+        except concurrent.futures.CancelledError:
+            raise wb_background_thread.CancelledError()
+
+def runCommands( all_commands ):
+    '''
+    run all_commands at the same time and return their results in the same order
+    '''
+    all_futures = [startCommand( command ) for command in all_commands]
+    try:
+        return [waitForResult( future ) for future in all_futures]
+
+    finally:
+        for future in all_futures:
+            future.cancel()
+
+def commandEnvironment( extra_environ ):
+    env = os.environ.copy()
+    env.update( extra_environ )
+    return env
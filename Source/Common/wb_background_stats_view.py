@@ -0,0 +1,184 @@
+'''
+ ====================================================================
+ Copyright (c) 2016 Barry A Scott.  All rights reserved.
+
+ This software is licensed as described in the file LICENSE.txt,
+ which you should have received as part of this distribution.
+
+ ====================================================================
+
+    wb_background_stats_view.py
+
+    Show where the time of the thread switcher tasks goes.
+    Time on the foreground thread is time that the UI is frozen.
+
+'''
+import time
+
+from PyQt5 import QtWidgets
+from PyQt5 import QtCore
+
+import wb_tracked_qwidget
+import wb_background_thread
+
+class WbBackgroundStatsView(wb_tracked_qwidget.WbTrackedModelessQWidget):
+    refresh_interval_ms = 1000
+    num_slowest_tasks = 25
+    # queue depth is shown for this many seconds
+    queue_depth_period = 60
+    histogram_bar_width = 40
+
+    def __init__( self, app, closed_handler ):
+        self.app = app
+        self.closed_handler = closed_handler
+
+        super().__init__()
+
+        self.setWindowTitle( T_('Background Tasks - %s') % (' '.join( self.app.app_name_parts ),) )
+        self.setWindowIcon( self.app.getAppQIcon() )
+
+        self.label_summary = QtWidgets.QLabel( T_('Time per task and queue depth') )
+        self.summary = QtWidgets.QPlainTextEdit( '' )
+        self.summary.setReadOnly( True )
+        self.summary.setFont( self.app.getCodeFont() )
+        self.summary.setLineWrapMode( QtWidgets.QPlainTextEdit.NoWrap )
+
+        self.label_slowest = QtWidgets.QLabel( T_('Slowest recent tasks') )
+        self.all_slowest_column_titles = (T_('Reason'), T_('Function'), T_('Priority'), T_('Outcome')
+                                         ,T_('Queue wait'), T_('Background'), T_('Foreground')
+                                         ,T_('Longest foreground step'), T_('Finished'))
+        self.slowest = QtWidgets.QTableWidget( 0, len(self.all_slowest_column_titles) )
+        self.slowest.setHorizontalHeaderLabels( self.all_slowest_column_titles )
+        self.slowest.setEditTriggers( QtWidgets.QAbstractItemView.NoEditTriggers )
+        self.slowest.setSelectionBehavior( QtWidgets.QAbstractItemView.SelectRows )
+        self.slowest.verticalHeader().hide()
+
+        self.layout = QtWidgets.QVBoxLayout()
+        self.layout.addWidget( self.label_summary )
+        self.layout.addWidget( self.summary )
+        self.layout.addWidget( self.label_slowest )
+        self.layout.addWidget( self.slowest )
+
+        self.setLayout( self.layout )
+
+        em = self.app.fontMetrics().width( 'm' )
+        ex = self.app.fontMetrics().lineSpacing()
+        self.resize( 110*em, 60*ex )
+
+        self.timer_refresh = QtCore.QTimer()
+        self.timer_refresh.timeout.connect( self.refresh )
+        self.timer_refresh.start( self.refresh_interval_ms )
+
+        self.refresh()
+
+    def updateSingleton( self ):
+        self.refresh()
+
+    def closeEvent( self, event ):
+        self.timer_refresh.stop()
+        self.closed_handler()
+
+        super().closeEvent( event )
+
+    def refresh( self ):
+        all_lines = []
+        self.__addHistogramLines( all_lines )
+        all_lines.append( '' )
+        self.__addQueueWaitLines( all_lines )
+        all_lines.append( '' )
+        self.__addQueueDepthLines( all_lines )
+        if self.app.stall_watchdog is not None:
+            all_lines.append( '' )
+            self.__addStallLines( all_lines )
+
+        # keep the users place in the text
+        scroll_bar = self.summary.verticalScrollBar()
+        position = scroll_bar.value()
+        self.summary.setPlainText( '\n'.join( all_lines ) )
+        scroll_bar.setValue( position )
+
+        self.__updateSlowestTasks()
+
+    def __addHistogramLines( self, all_lines ):
+        task_stats = self.app.task_stats
+        all_bound_names = (['< %s' % (formatDuration( bound ),) for bound in task_stats.histogram_bounds]
+                          + ['>= %s' % (formatDuration( task_stats.histogram_bounds[-1] ),)])
+
+        for name, all_counts in task_stats.allHistograms():
+            all_lines.append( T_('Tasks by %s time') % (name,) )
+            max_count = max( max( all_counts ), 1 )
+            for bound_name, count in zip( all_bound_names, all_counts ):
+                bar = '#' * ((count * self.histogram_bar_width + max_count - 1) // max_count)
+                all_lines.append( '  %8s |%-*s %d' % (bound_name, self.histogram_bar_width, bar, count) )
+
+    def __addQueueWaitLines( self, all_lines ):
+        all_lines.append( T_('Queue wait by priority') )
+        for name, stats in self.app.background_executor.allQueueWaitStats():
+            all_lines.append( '  %-11s count %6d  average %8s  longest %8s' %
+                                (name, stats.count, formatDuration( stats.average() ), formatDuration( stats.longest )) )
+
+    def __addQueueDepthLines( self, all_lines ):
+        now = time.monotonic()
+        period_start = now - self.queue_depth_period
+
+        # the greatest depth in each second of the period
+        all_depths = []
+        depth = 0
+        all_samples = self.app.background_executor.allQueueDepthSamples()
+        index = 0
+        for second in range( 1, self.queue_depth_period+1 ):
+            second_end = period_start + second
+            max_depth = depth
+            while index < len(all_samples) and all_samples[ index ][0] < second_end:
+                depth = all_samples[ index ][1]
+                max_depth = max( max_depth, depth )
+                index += 1
+
+            all_depths.append( max_depth )
+
+        greatest_depth = max( all_depths )
+        all_lines.append( T_('Queue depth over the last %d seconds - now %d, greatest %d') %
+                            (self.queue_depth_period, depth, greatest_depth) )
+
+        all_levels = ' .:-=+*#%@'
+        all_lines.append( '  |%s|' % (''.join( all_levels[ (max_depth * (len(all_levels)-1) + greatest_depth - 1) // max( greatest_depth, 1 ) ]
+                                                for max_depth in all_depths ),) )
+
+    def __addStallLines( self, all_lines ):
+        now = time.monotonic()
+        all_stalls = self.app.stall_watchdog.allRecentStalls()
+        all_lines.append( T_('GUI thread stalls - %d recent') % (len(all_stalls),) )
+        # newest first
+        for stall in reversed( all_stalls ):
+            all_lines.append( T_('  %(duration)s stall %(ago)s ago') %
+                                {'duration': formatDuration( stall.duration )
+                                ,'ago': formatDuration( now - stall.start_time )} )
+            for compound_line in stall.all_stack_lines:
+                for line in compound_line.rstrip( '\n' ).split( '\n' ):
+                    all_lines.append( '    %s' % (line,) )
+
+    def __updateSlowestTasks( self ):
+        now = time.monotonic()
+        all_tasks = self.app.task_stats.slowestRecentTasks( self.num_slowest_tasks )
+
+        self.slowest.setRowCount( len(all_tasks) )
+        for row, task_times in enumerate( all_tasks ):
+            all_values = (task_times.reason
+                         ,task_times.function_name
+                         ,wb_background_thread.priority_names[ task_times.priority ]
+                         ,task_times.outcome
+                         ,formatDuration( task_times.queue_wait )
+                         ,formatDuration( task_times.background )
+                         ,formatDuration( task_times.foreground )
+                         ,formatDuration( task_times.longest_foreground_step )
+                         ,T_('%s ago') % (formatDuration( now - task_times.finished_time ),))
+            for column, value in enumerate( all_values ):
+                self.slowest.setItem( row, column, QtWidgets.QTableWidgetItem( value ) )
+
+        self.slowest.resizeColumnsToContents()
+
+def formatDuration( seconds ):
+    if seconds < 1.0:
+        return '%.1fms' % (seconds*1000,)
+
+    return '%.2fs' % (seconds,)
@@ -12,6 +12,12 @@
 '''
 import threading
 import queue
+import heapq
+import collections
+import itertools
+import bisect
+import copy
+import time
 import types
 
 from PyQt5 import QtCore
@@ -29,6 +35,72 @@ def requiresThreadSwitcher( fn ):
     #print( 'qqq requiresThreadSwitcher( %r ) -> %r' % (fn, getattr( fn, _requires_thread_switcher_attr, False )) )
     return getattr( fn, _requires_thread_switcher_attr, False )
 
+#
+#   Priority of the background work of a thread switcher function
+#
+#   interactive - the user is waiting on it, selection changes and diffs
+#   normal - refresh of status
+#   bulk - log history, annotate, push, pull and fetch
+#
+PRIORITY_INTERACTIVE = 0
+PRIORITY_NORMAL = 1
+PRIORITY_BULK = 2
+
+all_priorities = (PRIORITY_INTERACTIVE, PRIORITY_NORMAL, PRIORITY_BULK)
+priority_names = {PRIORITY_INTERACTIVE: 'interactive', PRIORITY_NORMAL: 'normal', PRIORITY_BULK: 'bulk'}
+
+#
+#   Decorator used to set the background priority of a thread switcher function
+#
+_background_priority_attr = 'background_priority'
+def background_priority( priority ):
+    def setPriority( fn ):
+        setattr( fn, _background_priority_attr, priority )
+        return fn
+
+    return setPriority
+
+def backgroundPriority( fn ):
+    return getattr( fn, _background_priority_attr, PRIORITY_NORMAL )
+
+#------------------------------------------------------------
+#
+#   Each ThreadSwitchScheduler has a CancelToken.
+#   The generator is not stepped again once the token is cancelled
+#   and long loops in the projects call checkCancelled() on the
+#   token of the task they are running for.
+#
+class CancelledError(Exception):
+    pass
+
+class CancelToken:
+    def __init__( self ):
+        self.__cancelled = threading.Event()
+
+    def __repr__( self ):
+        return '<CancelToken: cancelled %r>' % (self.isCancelled(),)
+
+    def cancel( self ):
+        self.__cancelled.set()
+
+    def isCancelled( self ):
+        return self.__cancelled.is_set()
+
+    def checkCancelled( self ):
+        if self.isCancelled():
+            raise CancelledError()
+
+_thread_local = threading.local()
+
+def currentCancelToken():
+    # the token of the task running on this thread
+    cancel_token = getattr( _thread_local, 'cancel_token', None )
+    if cancel_token is None:
+        # not running for a task - nothing will cancel it
+        cancel_token = CancelToken()
+
+    return cancel_token
+
 #------------------------------------------------------------
 class MarshalledCall:
     def __init__( self, function, args ):
@@ -42,37 +114,224 @@ class MarshalledCall:
         return '<MarshalledCall: fn=%s nargs=%d>' % (self.function.__name__, len(self.args))
 
 class BackgroundThread(threading.Thread):
-    def __init__( self, app ):
-        threading.Thread.__init__( self )
+    def __init__( self, executor, index ):
+        threading.Thread.__init__( self, name='BackgroundThread-%d' % (index,) )
 
-        self.app = app
+        self.executor = executor
 
         self.setDaemon( 1 )
-        self.running = 1
-
-        self.work_queue = queue.Queue( maxsize=0 )
 
     def run( self ):
+        self.executor.runWorker()
+
+#
+#   BackgroundExecutor
+#
+#   Work is queued with a serial_key, normally the path of a project.
+#   Work with the same serial_key never runs on two threads at the same
+#   time, so the project objects only ever see one background thread
+#   at a time.
+#   Work with different serial_keys runs in parallel on the workers.
+#
+#   Work is started in priority order then in the order it was added.
+#   A thread switcher function goes back into the queue each time it
+#   switches to the background, so interactive work can run between
+#   the steps of bulk work.
+#
+class QueueWaitStats:
+    def __init__( self ):
+        self.count = 0
+        self.total = 0.0
+        self.longest = 0.0
+
+    def __repr__( self ):
+        return ('<QueueWaitStats: count %d total %.3f average %.3f longest %.3f>' %
+                (self.count, self.total, self.average(), self.longest))
+
+    def record( self, duration ):
+        self.count += 1
+        self.total += duration
+        self.longest = max( self.longest, duration )
+
+    def average( self ):
+        if self.count == 0:
+            return 0.0
+
+        return self.total / self.count
+
+#
+#   TaskStats
+#
+#   The time each ThreadSwitchScheduler task spent waiting for a
+#   background thread, running on a background thread and running
+#   on the foreground thread. Time running on the foreground thread
+#   is time that the UI cannot respond.
+#
+class TaskTimes:
+    def __init__( self, reason, function_name, priority ):
+        self.reason = reason
+        self.function_name = function_name
+        self.priority = priority
+        self.outcome = None
+        self.finished_time = None
+
+        self.queue_wait = 0.0
+        self.background = 0.0
+        self.foreground = 0.0
+        self.longest_foreground_step = 0.0
+
+    def __repr__( self ):
+        return ('<TaskTimes: %s %s queue %.3f background %.3f foreground %.3f>' %
+                (self.reason, self.outcome, self.queue_wait, self.background, self.foreground))
+
+    def total( self ):
+        return self.queue_wait + self.background + self.foreground
+
+class TaskStats:
+    # upper bound in seconds of each histogram bucket, the last bucket has no upper bound
+    histogram_bounds = (0.001, 0.004, 0.016, 0.064, 0.256, 1.0, 4.0)
+    histogram_names = ('queue wait', 'background', 'foreground')
+
+    # number of finished tasks kept for the slowest recent tasks
+    max_recent_tasks = 500
+
+    def __init__( self ):
+        self.__lock = threading.Lock()
+        self.__all_histograms = dict( [(name, [0]*(len(self.histogram_bounds)+1)) for name in self.histogram_names] )
+        self.__all_recent_tasks = collections.deque( maxlen=self.max_recent_tasks )
+
+    def recordTask( self, task_times ):
+        task_times.finished_time = time.monotonic()
+        with self.__lock:
+            for name, duration in zip( self.histogram_names
+                                     ,(task_times.queue_wait, task_times.background, task_times.foreground) ):
+                self.__all_histograms[ name ][ bisect.bisect_left( self.histogram_bounds, duration ) ] += 1
+
+            self.__all_recent_tasks.append( task_times )
+
+    def allHistograms( self ):
+        with self.__lock:
+            return [(name, list( self.__all_histograms[ name ] )) for name in self.histogram_names]
+
+    def slowestRecentTasks( self, count ):
+        with self.__lock:
+            all_tasks = list( self.__all_recent_tasks )
+
+        return sorted( all_tasks, key=lambda task_times: task_times.total(), reverse=True )[:count]
+
+class BackgroundExecutor:
+    # number of (time, queue depth) samples kept
+    max_queue_depth_samples = 10000
+
+    def __init__( self, app, num_workers ):
+        self.app = app
+
+        self.running = 1
+
+        # (priority, sequence, serial_key, MarshalledCall, queued_time) that may start now
+        self.ready_queue = queue.PriorityQueue( maxsize=0 )
+
+        self.__lock = threading.Lock()
+        self.__all_sequence = itertools.count()
+        # serial_key to a heap of the work waiting for the running work with that key
+        self.__all_pending = {}
+        self.__all_queue_wait = dict( [(priority, QueueWaitStats()) for priority in all_priorities] )
+        # work added and not yet started
+        self.__queue_depth = 0
+        self.__all_queue_depth_samples = collections.deque( maxlen=self.max_queue_depth_samples )
+        self.__thread_local = threading.local()
+
+        self.all_workers = [BackgroundThread( self, index ) for index in range( num_workers )]
+
+    def start( self ):
+        for worker in self.all_workers:
+            worker.start()
+
+    def currentSerialKey( self ):
+        # the serial_key of the work running on the calling thread
+        return getattr( self.__thread_local, 'serial_key', None )
+
+    def currentPriority( self ):
+        # the priority of the work running on the calling thread
+        return getattr( self.__thread_local, 'priority', PRIORITY_NORMAL )
+
+    def allQueueWaitStats( self ):
+        with self.__lock:
+            return [(priority_names[ priority ], copy.copy( self.__all_queue_wait[ priority ] ))
+                    for priority in all_priorities]
+
+    def allQueueDepthSamples( self ):
+        # (time.monotonic(), depth) each time the depth changed
+        with self.__lock:
+            return list( self.__all_queue_depth_samples )
+
+    def __recordQueueDepth( self, delta ):
+        # call with self.__lock held
+        self.__queue_depth += delta
+        self.__all_queue_depth_samples.append( (time.monotonic(), self.__queue_depth) )
+
+    def runWorker( self ):
         while self.running:
-            function = self.work_queue.get( block=True, timeout=None )
-            self.app.debug_options.debugLogThreading( 'BackgroundThread.run dispatching %r' % (function,) )
+            priority, _, serial_key, function, queued_time = self.ready_queue.get( block=True, timeout=None )
+            if function is None:
+                break
 
+            wait = time.monotonic() - queued_time
+            with self.__lock:
+                self.__all_queue_wait[ priority ].record( wait )
+                self.__recordQueueDepth( -1 )
+
+            self.app.debug_options.debugLogThreading( 'BackgroundExecutor.runWorker dispatching %r key %r %s waited %.3f' %
+                                                        (function, serial_key, priority_names[ priority ], wait) )
+
+            self.__thread_local.serial_key = serial_key
+            self.__thread_local.priority = priority
             try:
                 function()
 
             except:
                 self.app.log.exception( 'function failed on background thread' )
 
-    def addWork( self, function, args ):
-        self.app.debug_options.debugLogThreading( 'BackgroundThread.addWork( %r, %r )' % (function, args) )
+            finally:
+                self.__thread_local.serial_key = None
+                self.__thread_local.priority = PRIORITY_NORMAL
+                self.__startNext( serial_key )
+
+    def __startNext( self, serial_key ):
+        with self.__lock:
+            all_pending = self.__all_pending[ serial_key ]
+            if len(all_pending) == 0:
+                del self.__all_pending[ serial_key ]
+                return
+
+            priority, sequence, function, queued_time = heapq.heappop( all_pending )
+
+        self.ready_queue.put( (priority, sequence, serial_key, function, queued_time), block=False, timeout=None )
+
+    def addWork( self, function, args, serial_key=None, priority=PRIORITY_NORMAL ):
+        self.app.debug_options.debugLogThreading( 'BackgroundExecutor.addWork( %r, %r ) key %r %s' %
+                                                    (function, args, serial_key, priority_names[ priority ]) )
         assert self.running
-        self.work_queue.put( MarshalledCall( function, args ), block=False, timeout=None )
+        call = MarshalledCall( function, args )
+        queued_time = time.monotonic()
+
+        with self.__lock:
+            sequence = next( self.__all_sequence )
+            self.__recordQueueDepth( 1 )
+            if serial_key in self.__all_pending:
+                # wait for the work with the same key to finish
+                heapq.heappush( self.__all_pending[ serial_key ], (priority, sequence, call, queued_time) )
+                return
 
-    def shutdown( self ):
-        self.addWork( self.__shutdown )
+            self.__all_pending[ serial_key ] = []
 
-    def __shutdown( self ):
+        self.ready_queue.put( (priority, sequence, serial_key, call, queued_time), block=False, timeout=None )
+
+    def shutdown( self ):
         self.running = 0
+        for _ in self.all_workers:
+            # ahead of all other work
+            self.ready_queue.put( (-1, next( self.__all_sequence ), None, None, 0.0), block=False, timeout=None )
 
 #
 #   BackgroundWorkMixin
@@ -98,36 +357,139 @@ class BackgroundThread(threading.Thread):
 class BackgroundWorkMixin:
     foregroundProcessSignal = QtCore.pyqtSignal( [MarshalledCall] )
 
+    # number of background threads
+    # work for one project is still run one at a time
+    num_background_workers = 4
+
+    # calls for the foreground are run in batches at most this often
+    foreground_batch_interval = 0.016
+
     def __init__( self ):
         self.foreground_thread = threading.currentThread()
-        self.background_thread = BackgroundThread( self )
+        self.background_executor = BackgroundExecutor( self, self.num_background_workers )
+        self.task_stats = TaskStats()
+
+        # cancel_group to the CancelToken of the latest task in the group
+        self.__all_cancel_groups = {}
+
+        # each entry is [MarshalledCall] or [None] once replaced by a later coalesced call
+        self.__foreground_lock = threading.Lock()
+        self.__all_foreground_calls = collections.deque()
+        self.__all_coalesced_calls = {}
+        # the entry of the latest runInForegroundCombined() and its list of calls
+        self.__last_combined_entry = None
+        self.__last_combined_calls = None
+        self.__foreground_batch_signalled = False
+        self.__last_foreground_batch_time = 0.0
+        self.__foreground_batch_timer = None
 
     def startBackgoundThread( self ):
         self.foregroundProcessSignal.connect( self.__runInForeground, type=QtCore.Qt.QueuedConnection )
-        self.background_thread.start()
+
+        self.__foreground_batch_timer = QtCore.QTimer()
+        self.__foreground_batch_timer.setSingleShot( True )
+        self.__foreground_batch_timer.timeout.connect( self.__runForegroundBatch )
+
+        self.background_executor.start()
 
     def isForegroundThread( self ):
         # return true if the caller is running on the main thread
         return self.foreground_thread is threading.currentThread()
 
-    def deferRunInForeground( self, function ):
-        return DeferRunInForeground( self, function )
+    def deferRunInForeground( self, function, coalesce=None ):
+        return DeferRunInForeground( self, function, coalesce )
+
+    def runInBackground( self, function, args, serial_key=None, priority=None ):
+        if serial_key is None:
+            serial_key = self.backgroundSerialKey()
+
+        if priority is None:
+            # work queued from the background keeps the priority it is running with
+            if self.isForegroundThread():
+                priority = PRIORITY_NORMAL
+
+            else:
+                priority = self.background_executor.currentPriority()
+
+        self.debug_options.debugLogThreading( 'runInBackground( %r, %r ) key %r %s' % (function, args, serial_key, priority_names[ priority ]) )
+        self.background_executor.addWork( function, args, serial_key, priority )
+
+    def backgroundSerialKey( self ):
+        # work queued from the background keeps the key it is running with
+        if not self.isForegroundThread():
+            return self.background_executor.currentSerialKey()
+
+        return self.foregroundSerialKey()
 
-    def runInBackground( self, function, args ):
-        self.debug_options.debugLogThreading( 'runInBackground( %r, %r )' % (function, args) )
-        self.background_thread.addWork( function, args )
+    def foregroundSerialKey( self ):
+        # override to return the key of the project the user is working on
+        return None
 
-    def runInForeground( self, function, args ):
+    def runInForeground( self, function, args, coalesce=False ):
         # cannot call logging from here as this will cause the log call to be marshelled
-        self.foregroundProcessSignal.emit( MarshalledCall( function, args ) )
+        #
+        # coalesce is for calls where only the latest args matter,
+        # such as progress updates. The waiting call to the same function
+        # is dropped and this call runs in its place at the end of the batch.
+        entry = [MarshalledCall( function, args )]
 
-    def wrapWithThreadSwitcher( self, function, reason='' ):
+        with self.__foreground_lock:
+            if coalesce:
+                old_entry = self.__all_coalesced_calls.get( function )
+                if old_entry is not None:
+                    old_entry[0] = None
+
+                self.__all_coalesced_calls[ function ] = entry
+
+            self.__all_foreground_calls.append( entry )
+
+            if self.__foreground_batch_signalled:
+                return
+
+            self.__foreground_batch_signalled = True
+
+        self.foregroundProcessSignal.emit( MarshalledCall( self.__scheduleForegroundBatch, () ) )
+
+    def runInForegroundCombined( self, function, args ):
+        # for many small calls, such as log lines. While the latest waiting
+        # foreground call is a combined one this call is added to it, so all
+        # of them run as one foreground call in the order that they were made.
+        with self.__foreground_lock:
+            if( len(self.__all_foreground_calls) > 0
+            and self.__all_foreground_calls[-1] is self.__last_combined_entry ):
+                self.__last_combined_calls.append( MarshalledCall( function, args ) )
+                return
+
+            self.__last_combined_calls = [MarshalledCall( function, args )]
+            self.__last_combined_entry = [MarshalledCall( self.__runCombinedCalls, (self.__last_combined_calls,) )]
+            self.__all_foreground_calls.append( self.__last_combined_entry )
+
+            if self.__foreground_batch_signalled:
+                return
+
+            self.__foreground_batch_signalled = True
+
+        self.foregroundProcessSignal.emit( MarshalledCall( self.__scheduleForegroundBatch, () ) )
+
+    def __runCombinedCalls( self, all_calls ):
+        for function in all_calls:
+            self.__runInForeground( function )
+
+    def wrapWithThreadSwitcher( self, function, reason='', cancel_group=None, priority=None ):
         if requiresThreadSwitcher( function ):
-            return ThreadSwitchScheduler( self, function, reason )
+            return ThreadSwitchScheduler( self, function, reason, cancel_group, priority )
 
         else:
             return function
 
+    def startCancelGroup( self, cancel_group, cancel_token ):
+        # the results of an older task in the group are no longer wanted
+        old_cancel_token = self.__all_cancel_groups.get( cancel_group )
+        if old_cancel_token is not None:
+            old_cancel_token.cancel()
+
+        self.__all_cancel_groups[ cancel_group ] = cancel_token
+
     # alias that are better names when used from the threadSwitcher function
     switchToForeground = runInForeground
     switchToBackground = runInBackground
@@ -141,58 +503,188 @@ class BackgroundWorkMixin:
         except:
             self.log.exception( 'foregroundProcess function failed' )
 
+    def __scheduleForegroundBatch( self ):
+        # leave time for the event loop to paint between batches
+        delay = self.__last_foreground_batch_time + self.foreground_batch_interval - time.monotonic()
+        if delay > 0:
+            if not self.__foreground_batch_timer.isActive():
+                self.__foreground_batch_timer.start( int( delay*1000 ) + 1 )
+
+        else:
+            self.__runForegroundBatch()
+
+    def __runForegroundBatch( self ):
+        self.__last_foreground_batch_time = time.monotonic()
+
+        with self.__foreground_lock:
+            self.__foreground_batch_signalled = False
+            # calls added while the batch runs wait for the next batch
+            num_calls = len(self.__all_foreground_calls)
+
+        self.debug_options.debugLogThreading( '__runForegroundBatch() %d calls' % (num_calls,) )
+
+        for _ in range( num_calls ):
+            # take one at a time so that a nested event loop,
+            # for example a modal dialog, runs the rest in order
+            with self.__foreground_lock:
+                if len(self.__all_foreground_calls) == 0:
+                    break
+
+                entry = self.__all_foreground_calls.popleft()
+                function = entry[0]
+                if function is not None and self.__all_coalesced_calls.get( function.function ) is entry:
+                    del self.__all_coalesced_calls[ function.function ]
+
+            if function is None:
+                continue
+
+            self.__runInForeground( function )
+
 class DeferRunInForeground:
-    def __init__( self, app, function ):
+    def __init__( self, app, function, coalesce=None ):
         self.app = app
         self.function = function
+        # coalesce( *args ) returns True if only the latest call matters
+        self.coalesce = coalesce
 
     def __call__( self, *args ):
-        self.app.runInForeground( self.function, args )
+        coalesce = self.coalesce is not None and self.coalesce( *args )
+        self.app.runInForeground( self.function, args, coalesce=coalesce )
 
 class ThreadSwitchScheduler:
     next_instance_id = 0
-    def __init__( self, app, function, reason ):
+    def __init__( self, app, function, reason, cancel_group=None, priority=None ):
         self.app = app
         self.function = function
         self.reason = reason
+        if priority is None:
+            priority = backgroundPriority( function )
+
+        self.priority = priority
+        self.cancel_group = cancel_group
+
+    def __call__( self, *args, **kwds ):
+        # the scheduler is often made once and called for every click
+        # so each call is a new task with its own CancelToken, serial_key and times
+        ThreadSwitchTask( self )( *args, **kwds )
+
+class ThreadSwitchTask:
+    def __init__( self, scheduler ):
+        self.app = scheduler.app
+        self.function = scheduler.function
+        self.reason = scheduler.reason
+        self.priority = scheduler.priority
+        self.cancel_group = scheduler.cancel_group
+        self.cancel_token = CancelToken()
+        # set on the first switch to the background and kept
+        # so that all the steps of the function stay in order
+        self.serial_key = None
+
+        self.task_times = TaskTimes( self.reason, getattr( self.function, '__qualname__', repr( self.function ) ), self.priority )
+        # when the generator asked to switch thread
+        self.__switch_time = None
+
         self.debugLogThreading = self.app.debug_options.debugLogThreading
         ThreadSwitchScheduler.next_instance_id += 1
-        self.instance_id = self.next_instance_id
+        self.instance_id = ThreadSwitchScheduler.next_instance_id
 
     def __call__( self, *args, **kwds ):
         self.debugLogThreading( 'ThreadSwitchScheduler(%d:%s): start %r( %r, %r )' % (self.instance_id, self.reason, self.function, args, kwds) )
 
+        if self.cancel_group is not None:
+            self.app.startCancelGroup( self.cancel_group, self.cancel_token )
+
         #pylint disable=bare-except
         try:
             # call the function
-            result = self.function( *args, **kwds )
+            result = self.__step( self.function, *args, **kwds )
 
             # did the function run or make a generator?
             if type(result) != types.GeneratorType:
                 self.debugLogThreading( 'ThreadSwitchScheduler(%d:%s): done (not GeneratorType)' % (self.instance_id, self.reason) )
                 # it ran - we are all done
+                self.__recordTask( 'done' )
                 return
 
             # step the generator
             self.queueNextSwitch( result )
 
+        except CancelledError:
+            self.debugLogThreading( 'ThreadSwitchScheduler(%d:%s): cancelled' % (self.instance_id, self.reason) )
+            self.__recordTask( 'cancelled' )
+
         except:
             self.app.log.exception( 'ThreadSwitchScheduler(%d:%s)' % (self.instance_id, self.reason) )
+            self.__recordTask( 'failed' )
+
+    def __step( self, function, *args, **kwds ):
+        task_times = self.task_times
+        start_time = time.monotonic()
+        is_foreground = self.app.isForegroundThread()
+        if self.__switch_time is not None and not is_foreground:
+            task_times.queue_wait += start_time - self.__switch_time
+
+        # make the token available to the code the step calls
+        previous_cancel_token = getattr( _thread_local, 'cancel_token', None )
+        _thread_local.cancel_token = self.cancel_token
+        try:
+            return function( *args, **kwds )
+
+        finally:
+            _thread_local.cancel_token = previous_cancel_token
+
+            end_time = time.monotonic()
+            self.__switch_time = end_time
+            if is_foreground:
+                task_times.foreground += end_time - start_time
+                task_times.longest_foreground_step = max( task_times.longest_foreground_step, end_time - start_time )
+
+            else:
+                task_times.background += end_time - start_time
+
+    def __recordTask( self, outcome ):
+        if self.task_times.outcome is None:
+            self.task_times.outcome = outcome
+            self.app.task_stats.recordTask( self.task_times )
 
     def queueNextSwitch( self, generator ):
         self.debugLogThreading( 'ThreadSwitchScheduler(%d:%s): generator %r' % (self.instance_id, self.reason, generator) )
+        if self.cancel_token.isCancelled():
+            self.debugLogThreading( 'ThreadSwitchScheduler(%d:%s): cancelled' % (self.instance_id, self.reason) )
+            generator.close()
+            self.__recordTask( 'cancelled' )
+            return
+
         # result tells where to schedule the generator to next
         try:
-            where_to_go_next = next( generator )
+            where_to_go_next = self.__step( next, generator )
 
         except StopIteration:
             # no problem all done
             self.debugLogThreading( 'ThreadSwitchScheduler(%d:%s): done (StopIteration)' % (self.instance_id, self.reason) )
+            self.__recordTask( 'done' )
+            return
+
+        except CancelledError:
+            self.debugLogThreading( 'ThreadSwitchScheduler(%d:%s): cancelled' % (self.instance_id, self.reason) )
+            self.__recordTask( 'cancelled' )
             return
 
-        # will be one of app.runInForeground or app.runInForeground
+        except:
+            self.__recordTask( 'failed' )
+            raise
+
+        # will be app.runInForeground, app.runInBackground or an object,
+        # such as a WbAsyncCommandsWait, that calls app.runInBackground later
         self.debugLogThreading( 'ThreadSwitchScheduler(%d:%s): next %r' % (self.instance_id, self.reason, where_to_go_next) )
-        where_to_go_next( self.queueNextSwitch, (generator,) )
+        if where_to_go_next == self.app.runInForeground:
+            where_to_go_next( self.queueNextSwitch, (generator,) )
+
+        else:
+            if self.serial_key is None:
+                self.serial_key = self.app.backgroundSerialKey()
+
+            where_to_go_next( self.queueNextSwitch, (generator,), serial_key=self.serial_key, priority=self.priority )
 
 #------------------------------------------------------------
 #
@@ -0,0 +1,92 @@
+'''
+ ====================================================================
+ Copyright (c) 2016 Barry A Scott.  All rights reserved.
+
+ This software is licensed as described in the file LICENSE.txt,
+ which you should have received as part of this distribution.
+
+ ====================================================================
+
+    wb_change_fingerprint.py
+
+    A fingerprint of a working copy that changes whenever its
+    status may have changed. It is made from the mtimes of the SCM's
+    own files, such as the index, the mtime and size of each tracked
+    file and the mtime of each folder, which is far cheaper than a status.
+    Above a limit of files or folders there is no fingerprint and the
+    status is always refreshed.
+
+'''
+import os
+import hashlib
+import collections
+
+def statFingerprint( all_paths ):
+    '''
+    return the mtime and size of each of all_paths
+    a missing path is recorded as None
+    '''
+    all_stats = []
+    for path in all_paths:
+        try:
+            stat = path.stat()
+            all_stats.append( (str(path), stat.st_mtime_ns, stat.st_size) )
+
+        except OSError:
+            all_stats.append( (str(path), None) )
+
+    return tuple( all_stats )
+
+def filesFingerprint( all_paths, max_files ):
+    '''
+    return a digest of the mtime and size of each of all_paths,
+    or None if there are more than max_files of them.
+
+    Saving a file in place changes its mtime but not its folder's.
+    '''
+    if len(all_paths) > max_files:
+        return None
+
+    digest = hashlib.sha1()
+    for path in all_paths:
+        try:
+            stat = os.stat( str(path) )
+            digest.update( ('%s\0%d\0%d\n' % (path, stat.st_mtime_ns, stat.st_size)).encode( 'utf-8', 'surrogateescape' ) )
+
+        except OSError:
+            digest.update( ('%s\0missing\n' % (path,)).encode( 'utf-8', 'surrogateescape' ) )
+
+    return digest.hexdigest()
+
+def folderFingerprint( top_folder, all_skip_names, max_folders ):
+    '''
+    return a digest of the mtime of top_folder and the folders below it,
+    or None if there are more than max_folders of them.
+
+    A folder's mtime changes when a file is added or removed, which
+    finds new untracked files. Folders named in all_skip_names,
+    such as .git, are not walked.
+    '''
+    digest = hashlib.sha1()
+    num_folders = 0
+
+    all_folders = collections.deque( [str(top_folder)] )
+    while len(all_folders) > 0:
+        folder = all_folders.popleft()
+        num_folders += 1
+        if num_folders > max_folders:
+            return None
+
+        try:
+            stat = os.stat( folder )
+            digest.update( ('%s\0%d\n' % (folder, stat.st_mtime_ns)).encode( 'utf-8', 'surrogateescape' ) )
+
+            # os.scandir is not a context manager until python 3.6
+            for dir_entry in os.scandir( folder ):
+                if dir_entry.name not in all_skip_names and dir_entry.is_dir( follow_symlinks=False ):
+                    all_folders.append( dir_entry.path )
+
+        except OSError:
+            digest.update( ('%s\0missing\n' % (folder,)).encode( 'utf-8', 'surrogateescape' ) )
+
+    return digest.hexdigest()
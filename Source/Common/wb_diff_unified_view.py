@@ -75,6 +75,10 @@ class WbDiffViewText(WbDiffViewBase):
         self.resize( 130*em, 45*ex )
 
     def setUnifiedDiffText( self, all_lines ):
+        self.appendUnifiedDiffText( all_lines )
+        self.ensureStartVisible()
+
+    def appendUnifiedDiffText( self, all_lines ):
         for line in all_lines:
             if line.startswith('-'):
                 self.writeStyledText( line + '\n', self.style_delete )
@@ -88,8 +92,6 @@ class WbDiffViewText(WbDiffViewBase):
             else:
                 self.writeStyledText( line + '\n', self.style_header )
 
-        self.ensureStartVisible()
-
     def ensureStartVisible( self ):
         self.text_edit.moveCursor( QtGui.QTextCursor.Start )
         self.text_edit.ensureCursorVisible()
@@ -153,7 +153,8 @@ class ThreadSafeLogFacade:
             func( *args )
 
         else:
-            self.__app.runInForeground( func, args )
+            # lines logged one after another run as one foreground call
+            self.__app.runInForegroundCombined( func, args )
 
     def setLevel( self, level ):
         assert self.__app.isForegroundThread()
@@ -30,6 +30,9 @@ class WbMainWindow(QtWidgets.QMainWindow):
 
         self.__focus_is_in = self.focus_is_in_names[0]
 
+        # tasks that are only of use while the window is open
+        self.__all_cancel_tokens = []
+
         # Often the rest of init has to be done after the widgets are rendered
         # for example to set focus on a widget
         self.__timer_init = QtCore.QTimer()
@@ -48,6 +51,17 @@ class WbMainWindow(QtWidgets.QMainWindow):
     def close( self ):
         super().close()
 
+    def cancelOnClose( self, cancel_token ):
+        self.__all_cancel_tokens.append( cancel_token )
+
+    def closeEvent( self, event ):
+        for cancel_token in self.__all_cancel_tokens:
+            cancel_token.cancel()
+
+        self.__all_cancel_tokens = []
+
+        super().closeEvent( event )
+
     #------------------------------------------------------------
     def setFocusIsIn( self, widget_type ):
         assert widget_type in self.focus_is_in_names
@@ -51,6 +51,10 @@ def getLastCheckinMessageFilename():
 def getLastLockMessageFilename():
     return getPreferencesDir() / 'lock_message.txt'
 
+def getCacheDir():
+    # for data that can be fetched again if it is lost
+    return getPreferencesDir() / 'cache'
+
 def setupPlatform( all_name_parts, argv0 ):
     setupPlatformSpecific( all_name_parts, argv0 )
 
@@ -0,0 +1,57 @@
+'''
+ ====================================================================
+ Copyright (c) 2016 Barry A Scott.  All rights reserved.
+
+ This software is licensed as described in the file LICENSE.txt,
+ which you should have received as part of this distribution.
+
+ ====================================================================
+
+    wb_project_summary.py
+
+    The state of a project in a few numbers, shown next to the
+    project name in the tree. None means the SCM cannot tell.
+
+'''
+class WbProjectSummary:
+    def __init__( self, branch=None, num_staged=None, num_modified=None, num_untracked=None, num_ahead=None, num_behind=None ):
+        self.branch = branch
+        self.num_staged = num_staged
+        self.num_modified = num_modified
+        self.num_untracked = num_untracked
+        self.num_ahead = num_ahead
+        self.num_behind = num_behind
+
+    def __repr__( self ):
+        return ('<WbProjectSummary: %s staged %r modified %r untracked %r ahead %r behind %r>' %
+                (self.branch, self.num_staged, self.num_modified, self.num_untracked, self.num_ahead, self.num_behind))
+
+    def badgeText( self ):
+        all_badges = []
+        if self.branch:
+            all_badges.append( self.branch )
+
+        for symbol, count in (('+', self.num_staged)
+                             ,('*', self.num_modified)
+                             ,('?', self.num_untracked)
+                             ,('↑', self.num_ahead)
+                             ,('↓', self.num_behind)):
+            if count:
+                all_badges.append( '%s%d' % (symbol, count) )
+
+        return ' '.join( all_badges )
+
+    def toolTipText( self ):
+        all_lines = []
+        if self.branch:
+            all_lines.append( T_('Branch: %s') % (self.branch,) )
+
+        for label, count in ((T_('Staged files: %d'), self.num_staged)
+                            ,(T_('Modified files: %d'), self.num_modified)
+                            ,(T_('Untracked files: %d'), self.num_untracked)
+                            ,(T_('Commits ahead: %d'), self.num_ahead)
+                            ,(T_('Commits behind: %d'), self.num_behind)):
+            if count is not None:
+                all_lines.append( label % (count,) )
+
+        return '\n'.join( all_lines )
@@ -0,0 +1,106 @@
+'''
+ ====================================================================
+ Copyright (c) 2016 Barry A Scott.  All rights reserved.
+
+ This software is licensed as described in the file LICENSE.txt,
+ which you should have received as part of this distribution.
+
+ ====================================================================
+
+    wb_stall_watchdog.py
+
+    Find the code that blocks the GUI thread.
+
+    A timer on the GUI thread ticks the watchdog. When the ticks stop
+    for longer than the stall threshold the watchdog thread takes the
+    stack of the GUI thread. The stall is logged with that stack once
+    the event loop runs again.
+
+'''
+import sys
+import time
+import threading
+import traceback
+import collections
+
+from PyQt5 import QtCore
+
+class WbStall:
+    def __init__( self, start_time, all_stack_lines ):
+        self.start_time = start_time
+        self.all_stack_lines = all_stack_lines
+        self.duration = None
+
+    def __repr__( self ):
+        return '<WbStall: duration %r>' % (self.duration,)
+
+class WbStallWatchdog(threading.Thread):
+    # number of stalls kept for allRecentStalls()
+    max_recent_stalls = 50
+
+    def __init__( self, app, stall_threshold_ms ):
+        threading.Thread.__init__( self, name='StallWatchdog' )
+        self.setDaemon( 1 )
+
+        self.app = app
+        self.stall_threshold = stall_threshold_ms / 1000.0
+
+        self.__gui_thread_ident = threading.get_ident()
+
+        self.__lock = threading.Lock()
+        self.__last_tick_time = time.monotonic()
+        # the stall seen by the watchdog thread that the GUI thread has not logged yet
+        self.__pending_stall = None
+        self.__all_recent_stalls = collections.deque( maxlen=self.max_recent_stalls )
+
+        # tick often enough that a tick is never late by more than a quarter of the threshold
+        self.__timer_tick = QtCore.QTimer()
+        self.__timer_tick.timeout.connect( self.__tick )
+        self.__timer_tick.start( max( 10, stall_threshold_ms // 4 ) )
+
+    def allRecentStalls( self ):
+        with self.__lock:
+            return list( self.__all_recent_stalls )
+
+    def run( self ):
+        while True:
+            with self.__lock:
+                last_tick_time = self.__last_tick_time
+                is_pending = self.__pending_stall is not None
+
+            now = time.monotonic()
+            if now - last_tick_time < self.stall_threshold or is_pending:
+                time.sleep( self.stall_threshold / 4 )
+                continue
+
+            frame = sys._current_frames().get( self.__gui_thread_ident )
+            if frame is None:
+                # the GUI thread has exited
+                return
+
+            all_stack_lines = traceback.format_stack( frame )
+            del frame
+
+            with self.__lock:
+                # only a stall if the GUI thread did not tick while the stack was taken
+                if self.__last_tick_time == last_tick_time:
+                    self.__pending_stall = WbStall( last_tick_time, all_stack_lines )
+
+    def __tick( self ):
+        now = time.monotonic()
+        with self.__lock:
+            self.__last_tick_time = now
+
+            stall = self.__pending_stall
+            self.__pending_stall = None
+            if stall is None:
+                return
+
+            stall.duration = now - stall.start_time
+            self.__all_recent_stalls.append( stall )
+
+        self.app.log.warning( 'GUI thread stalled for %.0fms, the GUI thread stack after %.0fms was:' %
+                                (stall.duration*1000, self.stall_threshold*1000) )
+        for compound_line in stall.all_stack_lines:
+            for line in compound_line.rstrip( '\n' ).split( '\n' ):
+                self.app.log.info( line )
@@ -13,6 +13,7 @@
 from PyQt5 import QtCore
 
 import wb_table_view
+import wb_background_thread
 
 _alignment_map = {
     'L':    QtCore.Qt.AlignLeft,
@@ -89,7 +90,8 @@ class WbTableView(wb_table_view.WbTableView):
             self.setColumnWidth( index, em*self.view_model_map.emWidth( index ) )
 
     def setSelectionChangedCallback( self, selection_changed_callback ):
-        self.selection_changed_callback = self.app.wrapWithThreadSwitcher( selection_changed_callback, 'table_base_set_selection_changed' )
+        self.selection_changed_callback = self.app.wrapWithThreadSwitcher( selection_changed_callback, 'table_base_set_selection_changed',
+                                                                            priority=wb_background_thread.PRIORITY_INTERACTIVE )
 
     def loadRows( self, all_rows ):
         self.model.loadRows( all_rows )
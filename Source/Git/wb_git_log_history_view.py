@@ -15,6 +15,7 @@ from PyQt5 import QtWidgets
 from PyQt5 import QtGui
 from PyQt5 import QtCore
 
+import wb_background_thread
 from wb_background_thread import thread_switcher
 
 import wb_tracked_qwidget
@@ -509,6 +510,9 @@ class WbGitLogHistoryView(wb_main_window.WbMainWindow, wb_tracked_qwidget.WbTrac
         self.reload_commit_log_options = options
         self.git_project = git_project
 
+        # stop loading the log if the window is closed
+        self.cancelOnClose( wb_background_thread.currentCancelToken() )
+
         yield self.app.switchToBackground
 
         self.log_model.loadCommitLogForRepository(
@@ -528,6 +532,9 @@ class WbGitLogHistoryView(wb_main_window.WbMainWindow, wb_tracked_qwidget.WbTrac
         self.filename = filename
         self.git_project = git_project
 
+        # stop loading the log if the window is closed
+        self.cancelOnClose( wb_background_thread.currentCancelToken() )
+
         yield self.app.switchToBackground
 
         self.log_model.loadCommitLogForFile(
@@ -16,6 +16,10 @@ import pathlib
 
 import wb_annotate_node
 import wb_platform_specific
+import wb_background_thread
+import wb_change_fingerprint
+import wb_async_commands
+import wb_project_summary
 import wb_git_callback_server
 
 import git
@@ -83,6 +87,14 @@ def setCallbackReply( code, value ):
     __callback_server.setReply( code, value )
 
 class GitProject:
+    # above this many tracked files or folders the working tree
+    # is not fingerprinted and the status is always refreshed
+    change_fingerprint_max_files = 50000
+    change_fingerprint_max_folders = 5000
+
+    # status is worked out locally so can be fetched at startup for all projects
+    status_prefetch = True
+
     def __init__( self, app, prefs_project, ui_components ):
         self.app = app
         self.ui_components = ui_components
@@ -105,6 +117,9 @@ class GitProject:
         self.__num_staged_files = 0
         self.__num_modified_files = 0
 
+        # set by setRefreshLookupResults() after each updateState()
+        self.__refresh_lookups = None
+
     def getMasterBranchName( self ):
         if self.prefs_project.master_branch_name is None:
             return 'master'
@@ -180,6 +195,33 @@ class GitProject:
     def projectPath( self ):
         return pathlib.Path( self.prefs_project.path )
 
+    def changeFingerprint( self ):
+        '''
+        return a value that differs whenever the status may have changed
+        or None if the status must always be refreshed
+        '''
+        project_path = self.projectPath()
+        git_dir = project_path / '.git'
+        if not git_dir.is_dir():
+            # worktree or submodule with a .git file
+            return None
+
+        folder_fingerprint = wb_change_fingerprint.folderFingerprint( project_path, ('.git',), self.change_fingerprint_max_folders )
+        if folder_fingerprint is None:
+            return None
+
+        # the tracked files found by the last status update
+        all_tracked_paths = [project_path / path for path, file_state in list( self.all_file_state.items() )
+                                if file_state.isControlled() and not file_state.isDir()]
+        files_fingerprint = wb_change_fingerprint.filesFingerprint( all_tracked_paths, self.change_fingerprint_max_files )
+        if files_fingerprint is None:
+            return None
+
+        return (wb_change_fingerprint.statFingerprint( [git_dir / name for name in
+                    ('index', 'HEAD', 'packed-refs', 'FETCH_HEAD', 'refs/heads', 'refs/tags', 'refs/remotes')] )
+               ,folder_fingerprint
+               ,files_fingerprint)
+
     def configReader( self, level ):
         return self.repo().config_reader( level )
 
@@ -273,45 +315,74 @@ class GitProject:
 
     def __calculateStatus( self ):
         self.all_file_state = {}
+        self.__refresh_lookups = None
 
         repo_root = self.projectPath()
 
         git_dir = repo_root / '.git'
 
-        all_folders = set( [repo_root] )
-        while len(all_folders) > 0:
-            folder = all_folders.pop()
+        cancel_token = wb_background_thread.currentCancelToken()
 
-            for filename in folder.iterdir():
-                abs_path = folder / filename
+        # the untracked files are listed while the folders are walked and the index diffed.
+        # ls-files only reads the index, the index vs working tree diff is left to GitPython
+        untracked_files_future = None
+        if wb_async_commands.isSupported():
+            untracked_files_future = wb_async_commands.startCommand(
+                        wb_async_commands.WbAsyncCommand(
+                            [git.Git.GIT_PYTHON_GIT_EXECUTABLE or 'git', 'ls-files', '--others', '--exclude-standard', '-z'],
+                            repo_root,
+                            env=wb_async_commands.commandEnvironment( git_extra_environ ),
+                            separator=b'\0' ) )
 
-                repo_relative = abs_path.relative_to( repo_root )
+        try:
+            all_folders = set( [repo_root] )
+            while len(all_folders) > 0:
+                cancel_token.checkCancelled()
+                folder = all_folders.pop()
+
+                for filename in folder.iterdir():
+                    abs_path = folder / filename
+
+                    repo_relative = abs_path.relative_to( repo_root )
 
-                if abs_path.is_dir():
-                    if abs_path != git_dir:
-                        all_folders.add( abs_path )
+                    if abs_path.is_dir():
+                        if abs_path != git_dir:
+                            all_folders.add( abs_path )
 
+                            self.all_file_state[ repo_relative ] = WbGitFileState( self, repo_relative )
+                            self.all_file_state[ repo_relative ].setIsDir()
+
+                    else:
                         self.all_file_state[ repo_relative ] = WbGitFileState( self, repo_relative )
-                        self.all_file_state[ repo_relative ].setIsDir()
 
-                else:
-                    self.all_file_state[ repo_relative ] = WbGitFileState( self, repo_relative )
+            # ----------------------------------------
+            # can only get info from the index if there is at least 1 commit
+            self.index = git.index.IndexFile( self.repo() )
 
-        # ----------------------------------------
-        # can only get info from the index if there is at least 1 commit
-        self.index = git.index.IndexFile( self.repo() )
+            if self.hasCommits():
+                head_vs_index = self.index.diff( self.repo().head.commit )
+                index_vs_working = self.index.diff( None )
 
-        if self.hasCommits():
-            head_vs_index = self.index.diff( self.repo().head.commit )
-            index_vs_working = self.index.diff( None )
+            else:
+                head_vs_index = []
+                index_vs_working = []
 
-        else:
-            head_vs_index = []
-            index_vs_working = []
+            if untracked_files_future is not None:
+                result = wb_async_commands.waitForResult( untracked_files_future )
+                if result.returncode != 0:
+                    raise GitCommandError( ['git', 'ls-files'], result.returncode, result.stderr )
+
+                untracked_files = result.all_records
+
+            else:
+                # each ref to self.repo().untracked_files creates a new object
+                # cache the value once/update
+                untracked_files = self.repo().untracked_files
 
-        # each ref to self.repo().untracked_files creates a new object
-        # cache the value once/update
-        untracked_files = self.repo().untracked_files
+        finally:
+            # kills git status if the walk was cancelled
+            if untracked_files_future is not None:
+                untracked_files_future.cancel()
 
         for entry in self.index.entries.values():
             filepath = pathlib.Path( entry.path )
@@ -427,6 +498,60 @@ class GitProject:
     def canPull( self ):
         return self.repo().head.ref.tracking_branch() is not None
 
+    def refreshLookupCommands( self ):
+        '''
+        return the commands of the lookups that a refresh needs
+        besides the status. They are started before updateState()
+        so that they all run at the same time as it.
+        '''
+        if not wb_async_commands.isSupported():
+            return []
+
+        env = wb_async_commands.commandEnvironment( git_extra_environ )
+        return [wb_async_commands.WbAsyncCommand( [git.Git.GIT_PYTHON_GIT_EXECUTABLE or 'git'] + list( all_args ), self.projectPath(), env=env )
+                    for all_args in WbGitRefreshLookups.all_lookup_args]
+
+    def setRefreshLookupResults( self, all_results ):
+        # the WbAsyncCommandResult of each of refreshLookupCommands()
+        self.__refresh_lookups = WbGitRefreshLookups( [(result.returncode, '\n'.join( result.all_records ))
+                                                        for result in all_results] )
+
+    def __refreshLookups( self ):
+        if self.__refresh_lookups is None:
+            # the lookups could not run on the event loop thread
+            all_outputs = []
+            for all_args in WbGitRefreshLookups.all_lookup_args:
+                rc, stdout, stderr = self.repo().git.execute(
+                            ['git'] + list( all_args ),
+                            with_extended_output=True,
+                            with_exceptions=False,
+                            universal_newlines=False,   # GitPython bug will TB if true
+                            stdout_as_string=True )
+                all_outputs.append( (rc, stdout) )
+
+            self.__refresh_lookups = WbGitRefreshLookups( all_outputs )
+
+        return self.__refresh_lookups
+
+    def numStashes( self ):
+        # None until a refresh has listed the stashes
+        if self.__refresh_lookups is None:
+            return None
+
+        return len(self.__refresh_lookups.all_stashes)
+
+    def statusSummary( self ):
+        # call after updateState and setRefreshLookupResults
+        lookups = self.__refreshLookups()
+
+        return wb_project_summary.WbProjectSummary(
+                    branch=lookups.branch,
+                    num_staged=self.__num_staged_files,
+                    num_modified=self.__num_modified_files,
+                    num_untracked=len( [file_state for file_state in self.all_file_state.values() if file_state.isUncontrolled()] ),
+                    num_ahead=lookups.num_ahead,
+                    num_behind=lookups.num_behind )
+
     def getUnpushedCommits( self ):
         tracking_commit = self.getTrackingBranchCommit()
         if tracking_commit is None:
@@ -645,7 +770,9 @@ class GitProject:
         if since is not None:
             kwds['until'] = until
 
+        cancel_token = wb_background_thread.currentCancelToken()
         for commit in self.repo().iter_commits( None, **kwds ):
+            cancel_token.checkCancelled()
             all_commit_logs.append( GitCommitLogNode( commit ) )
 
         total = len(all_commit_logs)
@@ -671,7 +798,9 @@ class GitProject:
             kwds['until'] = until
 
         progress_callback( 0, 0 )
+        cancel_token = wb_background_thread.currentCancelToken()
         for commit in self.repo().iter_commits( None, str(filename), **kwds ):
+            cancel_token.checkCancelled()
             all_commit_logs.append( GitCommitLogNode( commit ) )
 
         total = len(all_commit_logs)
@@ -694,8 +823,10 @@ class GitProject:
 
     def __addCommitChangeInformation( self, progress_callback, all_commit_logs ):
         # now calculate what was added, deleted and modified in each commit
+        cancel_token = wb_background_thread.currentCancelToken()
         total = len(all_commit_logs)
         for offset in range( total ):
+            cancel_token.checkCancelled()
             progress_callback( offset, total )
             new_tree = all_commit_logs[ offset ].commitTree()
             old_tree = all_commit_logs[ offset ].commitPreviousTree()
@@ -763,8 +894,11 @@ class GitProject:
 
         all_annotate_nodes = []
 
+        cancel_token = wb_background_thread.currentCancelToken()
+
         line_num = 0
         for commit, all_lines in self.repo().blame( rev, self.pathForGit( filename ) ):
+            cancel_token.checkCancelled()
             commit_id = commit.hexsha
             for line_text in all_lines:
                 line_num += 1
@@ -875,22 +1009,50 @@ class GitProject:
                 self.app.log.error( line )
             return []
 
-        all_stashes = []
+        return parseStashList( stdout )
 
-        for line in stdout.split( '\n' ):
-            line = line.strip()
-            if line == '':
-                continue
+def parseStashList( stdout ):
+    all_stashes = []
 
-            stash_id, stash_branch, stash_message = line.split( ': ', 2 )
-            for branch_prefix in ('WIP on ', 'On '):
-                if stash_branch.startswith( branch_prefix ):
-                    stash_branch = stash_branch[len(branch_prefix):]
-                    break
+    for line in stdout.split( '\n' ):
+        line = line.strip()
+        if line == '':
+            continue
 
-            all_stashes.append( WbGitStashInfo( stash_id, stash_branch, stash_message ) )
+        stash_id, stash_branch, stash_message = line.split( ': ', 2 )
+        for branch_prefix in ('WIP on ', 'On '):
+            if stash_branch.startswith( branch_prefix ):
+                stash_branch = stash_branch[len(branch_prefix):]
+                break
+
+        all_stashes.append( WbGitStashInfo( stash_id, stash_branch, stash_message ) )
+
+    return all_stashes
+
+class WbGitRefreshLookups:
+    # the lookups that are independent of each other and of the status
+    all_lookup_args = (('symbolic-ref', '--short', '-q', 'HEAD')
+                      ,('stash', 'list')
+                      ,('rev-list', '--left-right', '--count', 'HEAD...@{upstream}'))
+
+    def __init__( self, all_outputs ):
+        # all_outputs is the (returncode, stdout) of each of all_lookup_args
+        (branch_rc, branch_stdout), (stash_rc, stash_stdout), (counts_rc, counts_stdout) = all_outputs
 
-        return all_stashes
+        # fails for a detached HEAD
+        self.branch = branch_stdout.strip() if branch_rc == 0 else None
+
+        self.all_stashes = parseStashList( stash_stdout ) if stash_rc == 0 else []
+
+        # fails when there is no upstream branch
+        self.num_ahead = None
+        self.num_behind = None
+        if counts_rc == 0 and counts_stdout.strip() != '':
+            self.num_ahead, self.num_behind = [int( count ) for count in counts_stdout.split()]
+
+    def __repr__( self ):
+        return ('<WbGitRefreshLookups: %s stashes %d ahead %r behind %r>' %
+                (self.branch, len(self.all_stashes), self.num_ahead, self.num_behind))
 
 
 class WbGitStashInfo:
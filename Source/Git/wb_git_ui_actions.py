@@ -24,6 +24,7 @@ import wb_git_annotate
 import wb_git_stash_dialogs
 
 from wb_background_thread import thread_switcher
+from wb_background_thread import background_priority, PRIORITY_BULK
 
 #
 #   Start with the main window components interface
@@ -101,10 +102,9 @@ class GitMainWindowActions(wb_ui_actions.WbMainWindowActions):
         if git_project is None:
             return False
 
-        # QQQ: git stash list of very slow on Windows.
-        # QQQ: don't run util we have a work around
-        #return len(git_project.cmdStashList()) > 0
-        return True
+        # git stash list is slow on Windows, use the count from the last refresh
+        num_stashes = git_project.numStashes()
+        return num_stashes is None or num_stashes > 0
 
     def enablerGitDiffHeadVsWorking( self ):
         return self.__enablerDiff( wb_git_project.WbGitFileState.canDiffHeadVsWorking )
@@ -225,6 +225,7 @@ class GitMainWindowActions(wb_ui_actions.WbMainWindowActions):
     def treeTableActionGitDiffHeadVsWorking( self ):
         self.main_window.callTreeOrTableFunction( self.treeActionGitDiffHeadVsWorking, self.tableActionGitDiffHeadVsWorking )
 
+    @background_priority( PRIORITY_BULK )
     @thread_switcher
     def treeTableActionGitLogHistory_Bg( self, checked=None ):
         yield from self.main_window.callTreeOrTableFunction_Bg( self.treeActionGitLogHistory_Bg, self.tableActionGitLogHistory_Bg )
@@ -290,6 +291,7 @@ class GitMainWindowActions(wb_ui_actions.WbMainWindowActions):
                 self.log.error( line )
 
     # ------------------------------------------------------------
+    @background_priority( PRIORITY_BULK )
     @thread_switcher
     def treeActionGitPush_Bg( self, checked=None ):
         git_project = self.selectedGitProject().newInstance()
@@ -306,7 +308,7 @@ class GitMainWindowActions(wb_ui_actions.WbMainWindowActions):
                 self.log.info( 'pushing "%s" id %s' % (commit.message.split('\n')[0], commit.hexsha) )
 
             git_project.cmdPush(
-                self.deferRunInForeground( self.pushProgressHandler ),
+                self.deferRunInForeground( self.pushProgressHandler, coalesce=self.isIntermediateProgress ),
                 self.deferRunInForeground( self.pushInfoHandler ) )
 
         except wb_git_project.GitCommandError as e:
@@ -320,6 +322,10 @@ class GitMainWindowActions(wb_ui_actions.WbMainWindowActions):
 
         self.main_window.updateActionEnabledStates()
 
+    def isIntermediateProgress( self, is_begin, is_end, stage_name, cur_count, max_count=None, message='' ):
+        # only the latest of these updates needs to be shown
+        return not is_begin and not is_end and message == ''
+
     def pushInfoHandler( self, info ):
         self.log.info( 'Push summary: %s' % (info.summary,) )
 
@@ -342,6 +348,7 @@ class GitMainWindowActions(wb_ui_actions.WbMainWindowActions):
             self.log.info( status )
 
     # ------------------------------------------------------------
+    @background_priority( PRIORITY_BULK )
     @thread_switcher
     def treeActionGitPull_Bg( self, checked=None ):
         git_project = self.selectedGitProject()
@@ -373,7 +380,7 @@ class GitMainWindowActions(wb_ui_actions.WbMainWindowActions):
                 git_project.cmdStashSave( stash_message )
 
             git_project.cmdPull(
-                self.deferRunInForeground( self.pullProgressHandler ),
+                self.deferRunInForeground( self.pullProgressHandler, coalesce=self.isIntermediateProgress ),
                 self.deferRunInForeground( self.pullInfoHandler ) )
 
             for commit in git_project.cmdCommitLogAfterCommitId( commit_id )[num_unpushed:]:
@@ -518,6 +525,7 @@ class GitMainWindowActions(wb_ui_actions.WbMainWindowActions):
         self.debugLog( 'tableActionGitDiffHeadVsWorking()' )
         self.table_view.tableActionViewRepo( self._actionGitDiffHeadVsWorking )
 
+    @background_priority( PRIORITY_BULK )
     @thread_switcher
     def tableActionGitLogHistory_Bg( self, checked=None ):
         yield from self.table_view.tableActionViewRepo_Bg( self._actionGitLogHistory_Bg )
@@ -655,6 +663,7 @@ class GitMainWindowActions(wb_ui_actions.WbMainWindowActions):
         return tree_node
 
     # ------------------------------------------------------------
+    @background_priority( PRIORITY_BULK )
     @thread_switcher
     def treeActionGitLogHistory_Bg( self, checked=None ):
         options = wb_log_history_options_dialog.WbLogHistoryOptions( self.app, self.main_window )
@@ -676,6 +685,7 @@ class GitMainWindowActions(wb_ui_actions.WbMainWindowActions):
 
         return True
 
+    @background_priority( PRIORITY_BULK )
     @thread_switcher
     def tableActionGitAnnotate_Bg( self, checked=None ):
         yield from self.table_view.tableActionViewRepo_Bg( self.__actionGitAnnotate_Bg )
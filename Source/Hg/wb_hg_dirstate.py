@@ -0,0 +1,278 @@
+'''
+ ====================================================================
+ Copyright (c) 2016 Barry A Scott.  All rights reserved.
+
+ This software is licensed as described in the file LICENSE.txt,
+ which you should have received as part of this distribution.
+
+ ====================================================================
+
+    wb_hg_dirstate.py
+
+    read .hg/dirstate without the help of the hg command server.
+
+    The recorded size and mtime of each tracked file is compared
+    against the working file in the same way as hg's own fast path.
+    Files that cannot be decided from the dirstate alone are
+    reported as ambiguous and must be checked with hg status.
+
+'''
+import os
+import sys
+import stat
+import struct
+import pathlib
+
+class WbHgDirstateError(Exception):
+    pass
+
+null_node = b'\0' * 20
+
+# hg stores size and mtime truncated to 31 bits
+_range_mask = 0x7fffffff
+
+# dirstate-v1
+_v1_parents = struct.Struct( '>20s20s' )
+_v1_entry = struct.Struct( '>cllll' )
+
+# dirstate-v2
+_v2_marker = b'dirstate-v2\n'
+_v2_docket = struct.Struct( '>12s32s32s44sIB' )
+_v2_tree_metadata = struct.Struct( '>IIIII4s20s' )
+_v2_node = struct.Struct( '>IHHIHIIIIHIII' )
+
+_v2_wdir_tracked = 1 << 0
+_v2_p1_tracked = 1 << 1
+_v2_p2_info = 1 << 2
+_v2_mode_exec_perm = 1 << 3
+_v2_mode_is_symlink = 1 << 4
+_v2_expected_state_is_modified = 1 << 9
+_v2_has_mode_and_size = 1 << 10
+_v2_has_mtime = 1 << 11
+_v2_mtime_second_ambiguous = 1 << 12
+
+class WbHgDirstateEntry:
+    __slots__ = ('state', 'mode', 'size', 'mtime', 'mtime_ns')
+
+    def __init__( self, state, mode, size, mtime, mtime_ns=0 ):
+        self.state = state          # one of 'n', 'a', 'r', 'm'
+        self.mode = mode
+        self.size = size            # -1 if unknown
+        self.mtime = mtime          # -1 if unknown
+        self.mtime_ns = mtime_ns    # 0 if only seconds are recorded
+
+    def __repr__( self ):
+        return ('<WbHgDirstateEntry: %s mode %o size %d mtime %d.%09d>' %
+                (self.state, self.mode, self.size, self.mtime, self.mtime_ns))
+
+def readDirstate( repo_root ):
+    '''
+    return a WbHgDirstate for the working copy at repo_root
+    raises WbHgDirstateError if the dirstate cannot be understood
+    '''
+    hg_dir = repo_root / '.hg'
+    dirstate_path = hg_dir / 'dirstate'
+
+    try:
+        all_requires = (hg_dir / 'requires').read_text( encoding='utf-8' ).split()
+        dirstate_stat = dirstate_path.stat()
+        data = dirstate_path.read_bytes()
+
+    except OSError as e:
+        raise WbHgDirstateError( 'cannot read %s: %s' % (dirstate_path, e) )
+
+    try:
+        if 'dirstate-v2' in all_requires:
+            parents, all_entries = _parseV2( hg_dir, data )
+
+        else:
+            parents, all_entries = _parseV1( data )
+
+    except struct.error as e:
+        raise WbHgDirstateError( 'corrupt %s: %s' % (dirstate_path, e) )
+
+    return WbHgDirstate( parents, all_entries, dirstate_stat )
+
+def _pathForWb( bytes_path ):
+    return pathlib.Path( bytes_path.decode( sys.getfilesystemencoding() ) )
+
+def _parseV1( data ):
+    parents = _v1_parents.unpack_from( data, 0 )
+
+    all_entries = {}
+
+    pos = _v1_parents.size
+    while pos < len(data):
+        state, mode, size, mtime, length = _v1_entry.unpack_from( data, pos )
+        pos += _v1_entry.size
+
+        filename = data[pos:pos+length]
+        pos += length
+
+        # copies are recorded as "name\0source"
+        if b'\0' in filename:
+            filename = filename.split( b'\0' )[0]
+
+        all_entries[ _pathForWb( filename ) ] = WbHgDirstateEntry( state.decode( 'ascii' ), mode, size, mtime )
+
+    return parents, all_entries
+
+def _parseV2( hg_dir, docket ):
+    if not docket.startswith( _v2_marker ):
+        raise WbHgDirstateError( 'unknown dirstate-v2 docket marker' )
+
+    (marker, parent_1, parent_2, tree_metadata
+    ,data_size, uuid_size) = _v2_docket.unpack_from( docket, 0 )
+
+    uuid = docket[_v2_docket.size:_v2_docket.size+uuid_size].decode( 'ascii' )
+
+    data_path = hg_dir / ('dirstate.%s' % (uuid,))
+    try:
+        with data_path.open( 'rb' ) as f:
+            data = f.read( data_size )
+
+    except OSError as e:
+        raise WbHgDirstateError( 'cannot read %s: %s' % (data_path, e) )
+
+    if len(data) != data_size:
+        raise WbHgDirstateError( '%s is truncated' % (data_path,) )
+
+    root_offset, root_len = _v2_tree_metadata.unpack_from( tree_metadata, 0 )[0:2]
+
+    all_entries = {}
+
+    all_children = [(root_offset, root_len)]
+    while len(all_children) > 0:
+        offset, count = all_children.pop()
+
+        for index in range( count ):
+            (path_offset, path_len, base_name_start
+            ,copy_offset, copy_len
+            ,children_offset, children_len
+            ,descendants_with_entry_count, tracked_descendants_count
+            ,flags, size, mtime, mtime_ns) = _v2_node.unpack_from( data, offset + index*_v2_node.size )
+
+            if children_len > 0:
+                all_children.append( (children_offset, children_len) )
+
+            entry = _v2Entry( flags, size, mtime, mtime_ns )
+            if entry is not None:
+                all_entries[ _pathForWb( data[path_offset:path_offset+path_len] ) ] = entry
+
+    # only the first 20 bytes of each 32 byte parent are used
+    return (parent_1[:20], parent_2[:20]), all_entries
+
+def _v2Entry( flags, size, mtime, mtime_ns ):
+    wdir_tracked = flags&_v2_wdir_tracked != 0
+    p1_tracked = flags&_v2_p1_tracked != 0
+    p2_info = flags&_v2_p2_info != 0
+
+    # nodes that are not files, such as cached directories
+    if not (wdir_tracked or p1_tracked or p2_info):
+        return None
+
+    if not wdir_tracked:
+        return WbHgDirstateEntry( 'r', 0, -1, -1 )
+
+    if not p1_tracked and not p2_info:
+        return WbHgDirstateEntry( 'a', 0, -1, -1 )
+
+    if p2_info:
+        return WbHgDirstateEntry( 'm', 0, -1, -1 )
+
+    if flags&_v2_has_mode_and_size == 0 or flags&_v2_expected_state_is_modified != 0:
+        return WbHgDirstateEntry( 'n', 0, -1, -1 )
+
+    if flags&_v2_mode_is_symlink != 0:
+        mode = stat.S_IFLNK | 0o777
+
+    elif flags&_v2_mode_exec_perm != 0:
+        mode = stat.S_IFREG | 0o755
+
+    else:
+        mode = stat.S_IFREG | 0o644
+
+    if flags&_v2_has_mtime == 0 or flags&_v2_mtime_second_ambiguous != 0:
+        return WbHgDirstateEntry( 'n', mode, size, -1 )
+
+    return WbHgDirstateEntry( 'n', mode, size, mtime, mtime_ns )
+
+class WbHgDirstate:
+    # exec bit is not recorded on windows
+    check_exec = os.name != 'nt'
+
+    def __init__( self, parents, all_entries, dirstate_stat ):
+        self.__parents = parents
+        self.__all_entries = all_entries
+        # files modified in the same second that the dirstate
+        # was written cannot be trusted to be clean
+        self.__dirstate_mtime = int( dirstate_stat.st_mtime ) & _range_mask
+        self.__identity = (dirstate_stat.st_mtime_ns, dirstate_stat.st_size)
+
+    def __repr__( self ):
+        return '<WbHgDirstate: p1 %s entries %d>' % (self.__parents[0].hex(), len(self.__all_entries))
+
+    def identity( self ):
+        # changes whenever hg writes the dirstate
+        return self.__identity
+
+    def firstParent( self ):
+        return self.__parents[0]
+
+    def isMerging( self ):
+        return self.__parents[1] != null_node
+
+    def allTrackedPaths( self ):
+        return self.__all_entries.keys()
+
+    def isTracked( self, filepath ):
+        return filepath in self.__all_entries
+
+    def statusOfFile( self, filepath, file_stat ):
+        '''
+        return the hg status letter for filepath
+        file_stat is the lstat result of the working file or None if missing.
+        returns None if only hg can decide the status.
+        '''
+        entry = self.__all_entries.get( filepath )
+        if entry is None:
+            # unknown or ignored depends on the .hgignore rules
+            return None
+
+        if entry.state == 'r':
+            return 'R'
+
+        if file_stat is None:
+            return '!'
+
+        if entry.state == 'a':
+            return 'A'
+
+        if entry.state == 'm':
+            return 'M'
+
+        if entry.size < 0:
+            return None
+
+        if entry.size != file_stat.st_size & _range_mask:
+            return 'M'
+
+        if( self.check_exec
+        and stat.S_ISREG( file_stat.st_mode )
+        and (entry.mode ^ file_stat.st_mode) & 0o100 != 0 ):
+            return 'M'
+
+        # same size but the contents may still have changed
+        if entry.mtime < 0:
+            return None
+
+        if entry.mtime != int( file_stat.st_mtime ) & _range_mask:
+            return None
+
+        if entry.mtime_ns != 0 and entry.mtime_ns != file_stat.st_mtime_ns % 1000000000:
+            return None
+
+        if entry.mtime >= self.__dirstate_mtime:
+            return None
+
+        return 'C'
@@ -20,6 +20,7 @@ import wb_main_window
 import wb_ui_components
 import wb_table_view
 
+import wb_background_thread
 from wb_background_thread import thread_switcher
 
 def U_( s: str ) -> str:
@@ -196,6 +197,9 @@ class WbHgLogHistoryView(wb_main_window.WbMainWindow, wb_tracked_qwidget.WbTrack
         self.filename = None
         self.hg_project = hg_project
 
+        # stop loading the log if the window is closed
+        self.cancelOnClose( wb_background_thread.currentCancelToken() )
+
         yield self.app.switchToBackground
 
         self.log_model.loadCommitLogForRepository( self.ui_component.deferedLogHistoryProgress(), hg_project, options.getLimit(), options.getSince(), options.getUntil() )
@@ -213,6 +217,9 @@ class WbHgLogHistoryView(wb_main_window.WbMainWindow, wb_tracked_qwidget.WbTrack
         self.filename = filename
         self.hg_project = hg_project
 
+        # stop loading the log if the window is closed
+        self.cancelOnClose( wb_background_thread.currentCancelToken() )
+
         yield self.app.switchToBackground
 
         self.log_model.loadCommitLogForFile( self.ui_component.deferedLogHistoryProgress(), hg_project, filename, options.getLimit(), options.getSince(), options.getUntil() )
@@ -13,10 +13,17 @@
 from typing import List
 import pathlib
 import sys
+import os
+import time
+import threading
 import pytz
 
 import wb_background_thread
 import wb_annotate_node
+import wb_change_fingerprint
+import wb_project_summary
+
+import wb_hg_dirstate
 
 import hglib
 import hglib.util
@@ -24,6 +31,12 @@ import hglib.client
 
 HgCommandError = hglib.error.CommandError
 
+# incoming and outgoing commits are shared by all HgProject
+# instances for the same repository, see newInstance()
+__all_remote_commits_caches = {}
+def remoteCommitsCache( project_path ):
+    return __all_remote_commits_caches.setdefault( project_path, WbHgRemoteCommitsCache() )
+
 def hgInit( wc_path ):
     hglib.init( str(wc_path).encode('utf-8') )
 
@@ -43,6 +56,24 @@ def HgVersion():
     return out.decode( 'utf-8' ).split('\n')[0]
 
 class HgProject:
+    # read .hg/dirstate to avoid a full hg status on every refresh
+    use_dirstate = True
+    # above this many files that need hg to decide do a full hg status
+    max_dirstate_ambiguous_files = 1000
+    # seconds before cached incoming and outgoing commits are refetched
+    remote_commits_ttl = 5*60
+    # seconds before a failed background fetch of the remote commits is retried
+    # doubled after each failure up to the max
+    remote_commits_retry_min = 60
+    remote_commits_retry_max = 60*60
+    # above this many tracked files or folders the working tree
+    # is not fingerprinted and the status is always refreshed
+    change_fingerprint_max_files = 50000
+    change_fingerprint_max_folders = 5000
+
+    # status is worked out locally so can be fetched at startup for all projects
+    status_prefetch = True
+
     def __init__( self, app, prefs_project, ui_components ):
         self.app = app
         self.ui_components = ui_components
@@ -66,6 +97,10 @@ class HgProject:
 
         self.__num_modified_files = 0
 
+        self.__manifest_cache = None
+        self.__untracked_identity = None
+        self.__all_untracked_states = {}
+
     def repo( self ):
         # setup repo on demand
         if self.__repo is None:
@@ -73,6 +108,12 @@ class HgProject:
 
         return self.__repo
 
+    def close( self ):
+        # stop the hg command server
+        if self.__repo is not None:
+            self.__repo.close()
+            self.__repo = None
+
     def cmdClone( self, url, wc_path, out_handler, err_handler, prompt_handler, auth_failed_handler ):
         assert self.prefs_project is None
         with WbHgIoHandler( self, out_handler, err_handler, prompt_handler, auth_failed_handler ):
@@ -123,12 +164,61 @@ class HgProject:
     def projectPath( self ):
         return self.prefs_project.path
 
+    def changeFingerprint( self ):
+        '''
+        return a value that differs whenever the status may have changed
+        or None if the status must always be refreshed
+        '''
+        project_path = pathlib.Path( self.projectPath() )
+        hg_dir = project_path / '.hg'
+        if not hg_dir.is_dir():
+            return None
+
+        folder_fingerprint = wb_change_fingerprint.folderFingerprint( project_path, ('.hg',), self.change_fingerprint_max_folders )
+        if folder_fingerprint is None:
+            return None
+
+        # the tracked files found by the last status update
+        all_tracked_paths = [project_path / path for path, file_state in list( self.all_file_state.items() )
+                                if file_state.isControlled() and not file_state.isDir()]
+        files_fingerprint = wb_change_fingerprint.filesFingerprint( all_tracked_paths, self.change_fingerprint_max_files )
+        if files_fingerprint is None:
+            return None
+
+        return (wb_change_fingerprint.statFingerprint( [hg_dir / name for name in
+                    ('dirstate', 'branch', 'bookmarks', 'store/00changelog.i', 'store/phaseroots')] )
+               ,folder_fingerprint
+               ,files_fingerprint)
+
     def headRefName( self ):
         return 'unknown'
 
     def numModifiedFiles( self ):
         return self.__num_modified_files
 
+    def refreshLookupCommands( self ):
+        return []
+
+    def setRefreshLookupResults( self, all_results ):
+        pass
+
+    def statusSummary( self ):
+        # call after updateState
+        num_ahead = None
+        num_behind = None
+        # only use incoming and outgoing commits that have already been fetched
+        remote_commits = remoteCommitsCache( self.projectPath() ).get()
+        if remote_commits is not None:
+            all_outgoing, all_incoming, _ = remote_commits
+            num_ahead = len(all_outgoing)
+            num_behind = len(all_incoming)
+
+        return wb_project_summary.WbProjectSummary(
+                    num_modified=self.__num_modified_files,
+                    num_untracked=len( [file_state for file_state in self.all_file_state.values() if file_state.isUncontrolled()] ),
+                    num_ahead=num_ahead,
+                    num_behind=num_behind )
+
     def updateState( self, tree_leaf ):
         # rebuild the tree
         self.tree = HgProjectTreeNode( self, self.prefs_project.name, pathlib.Path( '.' ) )
@@ -151,21 +241,29 @@ class HgProject:
 
     def __calculateStatus( self ):
         self.all_file_state = {}
+        self.__num_modified_files = 0
 
         repo_root = self.projectPath()
 
         hg_dir = repo_root / '.hg'
 
+        # stat of every file is kept for the dirstate fast path
+        all_file_stats = {}
+
+        cancel_token = wb_background_thread.currentCancelToken()
+
         all_folders = set( [repo_root] )
         while len(all_folders) > 0:
+            cancel_token.checkCancelled()
             folder = all_folders.pop()
 
-            for filename in folder.iterdir():
-                abs_path = folder / filename
+            # os.scandir is not a context manager until python 3.6
+            for dir_entry in os.scandir( str( folder ) ):
+                abs_path = folder / dir_entry.name
 
                 repo_relative = abs_path.relative_to( repo_root )
 
-                if abs_path.is_dir():
+                if dir_entry.is_dir():
                     if abs_path != hg_dir:
                         all_folders.add( abs_path )
 
@@ -174,8 +272,22 @@ class HgProject:
 
                 else:
                     self.all_file_state[ repo_relative ] = WbHgFileState( self, repo_relative )
+                    all_file_stats[ repo_relative ] = dir_entry.stat( follow_symlinks=False )
 
-        for nodeid, permission, executable, symlink, filepath in self.repo().manifest():
+        dirstate = None
+        if self.use_dirstate:
+            try:
+                dirstate = wb_hg_dirstate.readDirstate( repo_root )
+                self.debugLog( '__calculateStatus() %r' % (dirstate,) )
+
+                if dirstate.isMerging():
+                    # leave the details of a merge to hg
+                    dirstate = None
+
+            except wb_hg_dirstate.WbHgDirstateError as e:
+                self.debugLog( '__calculateStatus() dirstate not used: %s' % (e,) )
+
+        for nodeid, permission, executable, symlink, filepath in self.__manifest( dirstate ):
             filepath = self.pathForWb( filepath )
             if filepath not in self.all_file_state:
                 # filepath has been deleted
@@ -183,7 +295,13 @@ class HgProject:
 
             self.all_file_state[ filepath ].setManifest( nodeid, permission, executable, symlink )
 
-        for state, filepath in self.repo().status( all=True, ignored=True ):
+        if dirstate is None:
+            all_status = self.repo().status( all=True, ignored=True )
+
+        else:
+            all_status = self.__statusFromDirstate( dirstate, all_file_stats )
+
+        for state, filepath in all_status:
             state = state.decode( 'utf-8' )
 
             filepath = self.pathForWb( filepath )
@@ -196,6 +314,78 @@ class HgProject:
             if state in ('A', 'M', 'R'):
                 self.__num_modified_files += 1
 
+    def __manifest( self, dirstate ):
+        if dirstate is None:
+            return self.repo().manifest()
+
+        # the manifest of a revision never changes
+        # so only ask hg when the working copy parent moves
+        p1 = dirstate.firstParent()
+        if self.__manifest_cache is None or self.__manifest_cache[0] != p1:
+            self.__manifest_cache = (p1, list( self.repo().manifest() ))
+
+        return self.__manifest_cache[1]
+
+    def __statusFromDirstate( self, dirstate, all_file_stats ):
+        # returns the same (state, filepath) bytes tuples as repo().status()
+        encoding = sys.getfilesystemencoding()
+
+        # the ignored and unknown verdicts from the last hg status
+        # stay good until the dirstate or .hgignore changes
+        hgignore = self.projectPath() / '.hgignore'
+        try:
+            hgignore_identity = hgignore.stat().st_mtime_ns
+
+        except OSError:
+            hgignore_identity = None
+
+        untracked_identity = (dirstate.identity(), hgignore_identity)
+        if untracked_identity != self.__untracked_identity:
+            self.__all_untracked_states = {}
+            self.__untracked_identity = untracked_identity
+
+        all_status = []
+        all_ambiguous = []
+
+        for filepath, file_stat in all_file_stats.items():
+            state = dirstate.statusOfFile( filepath, file_stat )
+            if state is None and not dirstate.isTracked( filepath ):
+                state = self.__all_untracked_states.get( filepath )
+
+            if state is None:
+                all_ambiguous.append( filepath )
+
+            else:
+                all_status.append( (state.encode( 'utf-8' ), str( filepath ).encode( encoding )) )
+
+        for filepath in dirstate.allTrackedPaths():
+            if filepath not in all_file_stats:
+                state = dirstate.statusOfFile( filepath, None )
+                all_status.append( (state.encode( 'utf-8' ), str( filepath ).encode( encoding )) )
+
+        self.debugLog( '__statusFromDirstate() decided %d ambiguous %d' % (len(all_status), len(all_ambiguous)) )
+
+        if len(all_ambiguous) == 0:
+            return all_status
+
+        if len(all_ambiguous) > self.max_dirstate_ambiguous_files:
+            # cheaper to let hg do all the work
+            all_status = []
+            all_hg_status = self.repo().status( all=True, ignored=True )
+
+        else:
+            # confirm only the ambiguous files with hg
+            all_patterns = [('path:%s' % (filepath.as_posix(),)).encode( encoding ) for filepath in all_ambiguous]
+            all_hg_status = self.repo().status( all=True, ignored=True, include=all_patterns )
+
+        for state, filepath in all_hg_status:
+            if state in (b'?', b'I'):
+                self.__all_untracked_states[ self.pathForWb( filepath ) ] = state.decode( 'utf-8' )
+
+            all_status.append( (state, filepath) )
+
+        return all_status
+
     def __updateTree( self, path ):
         self.debugLogTree( '__updateTree path %r' % (path,) )
         node = self.tree
@@ -257,6 +447,35 @@ class HgProject:
     def canPush( self ):
         return True
 
+    def getCachedRemoteCommits( self ):
+        # returns (all_outgoing, all_incoming, fetched_time) or None if never fetched
+        return remoteCommitsCache( self.projectPath() ).get()
+
+    def remoteCommitsNeedRefresh( self ):
+        return remoteCommitsCache( self.projectPath() ).needsRefresh( self.remote_commits_ttl )
+
+    def remoteCommitsRetryDue( self ):
+        # False while waiting to retry after a failed fetch
+        return remoteCommitsCache( self.projectPath() ).retryDue()
+
+    def invalidateRemoteCommits( self ):
+        remoteCommitsCache( self.projectPath() ).invalidate()
+
+    def cmdRefreshRemoteCommits( self, out_handler, err_handler, prompt_handler, auth_failed_handler ):
+        self.debugLog( 'cmdRefreshRemoteCommits()' )
+
+        cache = remoteCommitsCache( self.projectPath() )
+        generation = cache.generation()
+        try:
+            all_outgoing = self.cmdOutgoingCommits( out_handler, err_handler, prompt_handler, auth_failed_handler )
+            all_incoming = self.cmdIncomingCommits( out_handler, err_handler, prompt_handler, auth_failed_handler )
+
+        except HgCommandError:
+            cache.setFailed( self.remote_commits_retry_min, self.remote_commits_retry_max )
+            raise
+
+        return cache.set( all_outgoing, all_incoming, generation )
+
     def cmdIncomingCommits( self, out_handler, err_handler, prompt_handler, auth_failed_handler ):
         with WbHgIoHandler( self, out_handler, err_handler, prompt_handler, auth_failed_handler ):
             all_logs = [WbHgLogBasic( data, self.repo() ) for data in self.repo().incoming()]
@@ -324,6 +543,7 @@ class HgProject:
         return text.decode( 'utf-8' )
 
     def cmdCommit( self, message ):
+        self.invalidateRemoteCommits()
         return self.repo().commit( message )
 
     def cmdAnnotationForFile( self, filename, rev=None ):
@@ -332,8 +552,11 @@ class HgProject:
 
         all_annotate_nodes = []
 
+        cancel_token = wb_background_thread.currentCancelToken()
+
         line_num = 0
         for rev, line_text in self.repo().annotate( self.pathForHg( filename ) ):
+            cancel_token.checkCancelled()
             line_num += 1
             all_annotate_nodes.append(
                 wb_annotate_node.AnnotateNode( line_num, line_text.decode('utf-8'), rev ) )
@@ -394,7 +617,9 @@ class HgProject:
 
     def __addCommitChangeInformation( self, all_commit_logs ):
         # now calculate what was added, deleted and modified in each commit
+        cancel_token = wb_background_thread.currentCancelToken()
         for commit_log in all_commit_logs:
+            cancel_token.checkCancelled()
             new_tree = commit_log.commitTree()
             old_tree = commit_log.commitPreviousTree()
 
@@ -449,14 +674,83 @@ class HgProject:
     def cmdPull( self, out_handler, err_handler, prompt_handler, auth_failed_handler ):
         self.debugLog( 'cmdPull()' )
 
-        with WbHgIoHandler( self, out_handler, err_handler, prompt_handler, auth_failed_handler ):
-            self.repo().pull( update=True )
+        try:
+            with WbHgIoHandler( self, out_handler, err_handler, prompt_handler, auth_failed_handler ):
+                self.repo().pull( update=True )
+
+        finally:
+            # after the pull so that a refresh that ran during it is not kept
+            self.invalidateRemoteCommits()
 
     def cmdPush( self, out_handler, err_handler, prompt_handler, auth_failed_handler ):
         self.debugLog( 'cmdPush()' )
 
-        with WbHgIoHandler( self, out_handler, err_handler, prompt_handler, auth_failed_handler ):
-            self.repo().push()
+        try:
+            with WbHgIoHandler( self, out_handler, err_handler, prompt_handler, auth_failed_handler ):
+                self.repo().push()
+
+        finally:
+            # after the push so that a refresh that ran during it is not kept
+            self.invalidateRemoteCommits()
+
+class WbHgRemoteCommitsCache:
+    def __init__( self ):
+        self.__lock = threading.Lock()
+
+        self.__all_outgoing = None
+        self.__all_incoming = None
+        self.__fetched_time = None
+        self.__is_valid = False
+        # changed by each invalidate()
+        self.__generation = 0
+
+        self.__num_failures = 0
+        self.__retry_time = None
+
+    def get( self ):
+        with self.__lock:
+            if self.__fetched_time is None:
+                return None
+
+            # callers get their own lists
+            return list( self.__all_outgoing ), list( self.__all_incoming ), self.__fetched_time
+
+    def generation( self ):
+        with self.__lock:
+            return self.__generation
+
+    def set( self, all_outgoing, all_incoming, generation ):
+        # generation is from before the fetch started
+        with self.__lock:
+            self.__all_outgoing = all_outgoing
+            self.__all_incoming = all_incoming
+            self.__fetched_time = time.time()
+            # a pull or push during the fetch may have made it out of date
+            self.__is_valid = generation == self.__generation
+
+            self.__num_failures = 0
+            self.__retry_time = None
+
+            return list( self.__all_outgoing ), list( self.__all_incoming ), self.__fetched_time
+
+    def invalidate( self ):
+        # keep the old values to show while the new values are fetched
+        with self.__lock:
+            self.__is_valid = False
+            self.__generation += 1
+
+    def setFailed( self, retry_min, retry_max ):
+        with self.__lock:
+            self.__num_failures += 1
+            self.__retry_time = time.time() + min( retry_min * 2**(self.__num_failures-1), retry_max )
+
+    def retryDue( self ):
+        with self.__lock:
+            return self.__retry_time is None or time.time() >= self.__retry_time
+
+    def needsRefresh( self, ttl ):
+        with self.__lock:
+            return not self.__is_valid or (time.time() - self.__fetched_time) > ttl
 
 class WbHgOutBuffer:
     def __init__( self, cb ):
@@ -10,6 +10,8 @@
     wb_git_status_view.py
 
 '''
+import time
+
 from PyQt5 import QtWidgets
 
 import wb_tracked_qwidget
@@ -55,13 +57,11 @@ class WbHgStatusView(wb_tracked_qwidget.WbTrackedModelessQWidget):
         ex = self.app.fontMetrics().lineSpacing()
         self.resize( 100*em, 50*ex )
 
-    def setStatus( self, all_outgoing_commits, all_incoming_commits, all_modified_files, all_untracked_files ):
+    def setStatus( self, all_outgoing_commits, all_incoming_commits, all_modified_files, all_untracked_files,
+                    fetched_time=None, is_stale=False ):
         # new to old
-        all_incoming_commits.reverse()
-        all_outgoing_commits.reverse()
-
-        outgoing_text = '\n'.join( ['"%s": r%d' % (log.messageFirstLine(), log.rev) for log in all_outgoing_commits] )
-        incoming_text = '\n'.join( ['"%s": r%d' % (log.messageFirstLine(), log.rev) for log in all_incoming_commits] )
+        outgoing_text = '\n'.join( ['"%s": r%d' % (log.messageFirstLine(), log.rev) for log in reversed( all_outgoing_commits )] )
+        incoming_text = '\n'.join( ['"%s": r%d' % (log.messageFirstLine(), log.rev) for log in reversed( all_incoming_commits )] )
         modified_text = '\n'.join( ['%s: %s' % (status, filename) for status, filename in sorted( all_modified_files )] )
         untracked_text = '\n'.join( ['%s: %s' % (status, filename) for status, filename in sorted( all_untracked_files )] )
 
@@ -69,3 +69,25 @@ class WbHgStatusView(wb_tracked_qwidget.WbTrackedModelessQWidget):
         self.incoming.setPlainText( incoming_text )
         self.modified.setPlainText( modified_text )
         self.untracked.setPlainText( untracked_text )
+
+        if fetched_time is None:
+            self.label_outgoing.setText( T_('Outgoing commits') )
+            self.label_incoming.setText( T_('Incoming commits') )
+
+        else:
+            age = self.__ageText( fetched_time, is_stale )
+            self.label_outgoing.setText( T_('Outgoing commits - %s') % (age,) )
+            self.label_incoming.setText( T_('Incoming commits - %s') % (age,) )
+
+    def __ageText( self, fetched_time, is_stale ):
+        age = int( time.time() - fetched_time )
+        if age < 60:
+            age_text = S_('fetched %d second ago', 'fetched %d seconds ago', age) % (age,)
+
+        else:
+            age_text = S_('fetched %d minute ago', 'fetched %d minutes ago', age//60) % (age//60,)
+
+        if is_stale:
+            age_text = T_('%s, updating…') % (age_text,)
+
+        return age_text
@@ -13,6 +13,8 @@
 import sys
 import pathlib
 
+from PyQt5 import QtCore
+
 import wb_log_history_options_dialog
 import wb_ui_actions
 import wb_common_dialogs
@@ -24,6 +26,7 @@ import wb_hg_credential_dialogs
 import wb_hg_annotate
 
 from wb_background_thread import thread_switcher
+from wb_background_thread import background_priority, PRIORITY_BULK
 
 #
 #   Start with the main window components interface
@@ -34,10 +37,14 @@ from wb_background_thread import thread_switcher
 #   appropiate to each context
 #
 class HgMainWindowActions(wb_ui_actions.WbMainWindowActions):
+    # seconds between checks for stale incoming and outgoing commits
+    remote_commits_check_interval = 60
+
     def __init__( self, factory ):
         super().__init__( 'hg', factory )
 
         self.__hg_credential_cache = HgCredentialCache()
+        self.__timer_remote_commits = None
 
     def setupDebug( self ):
         self.debugLog = self.main_window.app.debug_options.debugLogHgUi
@@ -167,10 +174,12 @@ class HgMainWindowActions(wb_ui_actions.WbMainWindowActions):
     def treeTableActionHgDiffHeadVsWorking( self ):
         self.main_window.callTreeOrTableFunction( self.treeActionHgDiffHeadVsWorking, self.tableActionHgDiffHeadVsWorking )
 
+    @background_priority( PRIORITY_BULK )
     @thread_switcher
     def treeTableActionHgLogHistory_Bg( self, checked=None ):
         yield from self.main_window.callTreeOrTableFunction_Bg( self.treeActionHgLogHistory_Bg, self.tableActionHgLogHistory_Bg )
 
+    @background_priority( PRIORITY_BULK )
     @thread_switcher
     def tableActionHgLogHistory_Bg( self, checked=None ):
         yield from self.table_view.tableActionViewRepo_Bg( self._actionHgLogHistory_Bg )
@@ -234,6 +243,7 @@ class HgMainWindowActions(wb_ui_actions.WbMainWindowActions):
                 self.log.error( line )
 
     # ------------------------------------------------------------
+    @background_priority( PRIORITY_BULK )
     @thread_switcher
     def treeActionHgPush_Bg( self, checked=None ):
         hg_project = self.selectedHgProject().newInstance()
@@ -245,8 +255,8 @@ class HgMainWindowActions(wb_ui_actions.WbMainWindowActions):
 
         try:
             hg_project.cmdPush(
-                self.deferRunInForeground( self.hgOutputHandler ),
-                self.deferRunInForeground( self.hgErrorHandler ),
+                self.hgOutputHandler,
+                self.hgErrorHandler,
                 self.hgCredentialsPrompt,
                 self.hgAuthFailed )
 
@@ -262,6 +272,7 @@ class HgMainWindowActions(wb_ui_actions.WbMainWindowActions):
         self.main_window.updateActionEnabledStates()
 
     # ------------------------------------------------------------
+    @background_priority( PRIORITY_BULK )
     @thread_switcher
     def treeActionHgPull_Bg( self, checked=None ):
         hg_project = self.selectedHgProject().newInstance()
@@ -273,8 +284,8 @@ class HgMainWindowActions(wb_ui_actions.WbMainWindowActions):
 
         try:
             hg_project.cmdPull(
-                self.deferRunInForeground( self.hgOutputHandler ),
-                self.deferRunInForeground( self.hgErrorHandler ),
+                self.hgOutputHandler,
+                self.hgErrorHandler,
                 self.hgCredentialsPrompt,
                 self.hgAuthFailed )
 
@@ -289,6 +300,7 @@ class HgMainWindowActions(wb_ui_actions.WbMainWindowActions):
         self.main_window.updateActionEnabledStates()
 
     #------------------------------------------------------------
+    # called on the background thread, self.log moves the lines to the foreground
     def hgOutputHandler( self, line ):
         self.log.info( line )
 
@@ -318,36 +330,123 @@ class HgMainWindowActions(wb_ui_actions.WbMainWindowActions):
     def hgAuthFailed( self, url ):
         self.__hg_credential_cache.removeCredentials( url )
 
+    def hgCredentialsPromptCachedOnly( self, url, realm, prompt ):
+        if not self.__hg_credential_cache.hasCredentials( url ):
+            return ''
+
+        if prompt == self.hg_username_prompt:
+            return self.__hg_credential_cache.username( url )
+
+        elif prompt == self.hg_password_prompt:
+            return self.__hg_credential_cache.password( url )
+
+        return ''
+
+    def hgAuthFailedIgnore( self, url ):
+        pass
+
     #------------------------------------------------------------
     @thread_switcher
     def treeActionHgStatus_Bg( self, checked=None ):
         hg_project = self.selectedHgProject()
 
+        commit_status_view = wb_hg_status_view.WbHgStatusView(
+                self.app,
+                T_('Status for %s') % (hg_project.projectName(),) )
+
+        # show what is known now and update when the fetch is done
+        cached_remote_commits = hg_project.getCachedRemoteCommits()
+        need_refresh = hg_project.remoteCommitsNeedRefresh()
+
+        if cached_remote_commits is not None:
+            all_outgoing_commits, all_incoming_commits, fetched_time = cached_remote_commits
+            commit_status_view.setStatus(
+                        all_outgoing_commits,
+                        all_incoming_commits,
+                        hg_project.getReportModifiedFiles(),
+                        hg_project.getReportUntrackedFiles(),
+                        fetched_time,
+                        need_refresh )
+            commit_status_view.show()
+
+        if not need_refresh:
+            return
+
         yield self.app.switchToBackground
 
-        all_outgoing_commits = hg_project.cmdOutgoingCommits(
-                                    None,   # self.deferRunInForeground( self.hgOutputHandler ),
-                                    self.deferRunInForeground( self.hgErrorHandler ),
-                                    self.hgCredentialsPrompt,
-                                    self.hgAuthFailed )
-        all_incoming_commits = hg_project.cmdIncomingCommits(
-                                    None,   # self.deferRunInForeground( self.hgOutputHandler ),
-                                    self.deferRunInForeground( self.hgErrorHandler ),
+        try:
+            remote_commits = hg_project.cmdRefreshRemoteCommits(
+                                    None,   # self.hgOutputHandler,
+                                    self.hgErrorHandler,
                                     self.hgCredentialsPrompt,
                                     self.hgAuthFailed )
 
+        except wb_hg_project.HgCommandError as e:
+            self.__logHgCommandError( e )
+            remote_commits = None
+
         yield self.app.switchToForeground
 
-        commit_status_view = wb_hg_status_view.WbHgStatusView(
-                self.app,
-                T_('Status for %s') % (hg_project.projectName(),) )
+        if remote_commits is None:
+            return
 
+        all_outgoing_commits, all_incoming_commits, fetched_time = remote_commits
         commit_status_view.setStatus(
                     all_outgoing_commits,
                     all_incoming_commits,
                     hg_project.getReportModifiedFiles(),
-                    hg_project.getReportUntrackedFiles() )
-        commit_status_view.show()
+                    hg_project.getReportUntrackedFiles(),
+                    fetched_time,
+                    False )
+
+        if cached_remote_commits is None:
+            commit_status_view.show()
+
+    #------------------------------------------------------------
+    #
+    #   keep the incoming and outgoing commits of all hg projects
+    #   up to date in the background
+    #
+    #------------------------------------------------------------
+    def startRemoteCommitsRefresher( self ):
+        self.__timer_remote_commits = QtCore.QTimer()
+        self.__timer_remote_commits.timeout.connect( self.refreshAllRemoteCommits )
+        self.__timer_remote_commits.start( self.remote_commits_check_interval*1000 )
+
+    def refreshAllRemoteCommits( self ):
+        all_hg_projects = [scm_project
+                            for scm_project, tree_node in self.main_window.tree_model.all_scm_projects.values()
+                            if isinstance( scm_project, wb_hg_project.HgProject )]
+
+        for hg_project in all_hg_projects:
+            if hg_project.remoteCommitsNeedRefresh() and hg_project.remoteCommitsRetryDue():
+                # a lane of its own so that a slow remote does not hold up
+                # the status, diff and commit work of the project
+                self.app.runInBackground( self.__refreshRemoteCommits, (hg_project,),
+                            serial_key=('hg-remote', hg_project.projectPath()), priority=PRIORITY_BULK )
+
+    def __refreshRemoteCommits( self, hg_project ):
+        # a refresh queued by an earlier tick may have done the work
+        if not hg_project.remoteCommitsNeedRefresh() or not hg_project.remoteCommitsRetryDue():
+            return
+
+        # use a private command server so that the
+        # foreground is not blocked by the network access
+        hg_project = hg_project.newInstance()
+
+        try:
+            # never prompt the user from a refresh they did not ask for
+            hg_project.cmdRefreshRemoteCommits(
+                                None,
+                                None,
+                                self.hgCredentialsPromptCachedOnly,
+                                self.hgAuthFailedIgnore )
+
+        except wb_hg_project.HgCommandError as e:
+            self.debugLog( '__refreshRemoteCommits %r failed %s' % (hg_project, e) )
+
+        finally:
+            hg_project.close()
 
     # ------------------------------------------------------------
     @thread_switcher
@@ -432,6 +531,7 @@ class HgMainWindowActions(wb_ui_actions.WbMainWindowActions):
         return tree_node
 
     # ------------------------------------------------------------
+    @background_priority( PRIORITY_BULK )
     @thread_switcher
     def treeActionHgLogHistory_Bg( self, checked=None ):
         options = wb_log_history_options_dialog.WbLogHistoryOptions( self.app, self.main_window )
@@ -453,6 +553,7 @@ class HgMainWindowActions(wb_ui_actions.WbMainWindowActions):
 
         return True
 
+    @background_priority( PRIORITY_BULK )
     @thread_switcher
     def tableActionHgAnnotate_Bg( self, checked=None ):
         yield from self.table_view.tableActionViewRepo_Bg( self.__actionHgAnnotate_Bg )
@@ -33,6 +33,8 @@ class HgMainWindowComponents(wb_ui_components.WbMainWindowComponents):
 
         self.log.info( T_('Hg using program %s') % (shutil.which( hglib.HGPATH ),) )
 
+        self.ui_actions.startRemoteCommitsRefresher()
+
     def createProject( self, project ):
         tm = self.table_view.table_model
         self.all_visible_table_columns = (tm.col_status, tm.col_name, tm.col_date)
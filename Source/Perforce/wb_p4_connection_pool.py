@@ -0,0 +1,180 @@
+'''
+ ====================================================================
+ Copyright (c) 2018 Barry A Scott.  All rights reserved.
+
+ This software is licensed as described in the file LICENSE.txt,
+ which you should have received as part of this distribution.
+
+ ====================================================================
+
+    wb_p4_connection_pool.py
+
+    A P4.P4 object must not be used by more than one thread at a time.
+    The pool gives each thread its own connection to the server so
+    that status, describe and print can run in parallel.
+
+    All the connections share the user and the P4 tickets file
+    so a login on one thread is seen by all the others.
+
+'''
+import threading
+import time
+
+import P4
+
+class WbP4CommandLatency:
+    def __init__( self ):
+        self.count = 0
+        self.total = 0.0
+        self.longest = 0.0
+
+    def __repr__( self ):
+        return ('<WbP4CommandLatency: count %d total %.3f average %.3f longest %.3f>' %
+                (self.count, self.total, self.average(), self.longest))
+
+    def record( self, duration ):
+        self.count += 1
+        self.total += duration
+        self.longest = max( self.longest, duration )
+
+    def average( self ):
+        if self.count == 0:
+            return 0.0
+
+        return self.total / self.count
+
+class WbP4ConnectionPool:
+    # ping connections that have been idle for longer than this
+    # the server may have dropped them
+    keepalive_interval = 5*60
+
+    max_attempts = 5
+    reconnect_delay_initial = 0.25
+    reconnect_delay_max = 8.0
+
+    def __init__( self, log ):
+        self.log = log
+
+        self.__lock = threading.Lock()
+        self.__thread_local = threading.local()
+        self.__all_connections = []
+
+        self.__user = None
+        self.__all_latency = {}
+
+    def __repr__( self ):
+        return '<WbP4ConnectionPool: connections %d>' % (len(self.__all_connections),)
+
+    def setUser( self, user ):
+        with self.__lock:
+            self.__user = user
+            all_connections = list( self.__all_connections )
+
+        for p4 in all_connections:
+            p4.user = user
+
+    def connection( self ):
+        # return the P4 object of the calling thread
+        p4 = getattr( self.__thread_local, 'p4', None )
+        if p4 is None:
+            p4 = P4.P4()
+            with self.__lock:
+                if self.__user is not None:
+                    p4.user = self.__user
+
+                self.__all_connections.append( p4 )
+
+            self.__thread_local.p4 = p4
+            self.__thread_local.last_used = 0.0
+
+        return p4
+
+    def connect( self ):
+        p4 = self.connection()
+        if not p4.connected():
+            p4.connect()
+
+        self.__thread_local.last_used = time.monotonic()
+        return p4
+
+    def disconnectAll( self ):
+        with self.__lock:
+            all_connections = list( self.__all_connections )
+
+        for p4 in all_connections:
+            try:
+                if p4.connected():
+                    p4.disconnect()
+
+            except P4.P4Exception:
+                pass
+
+    def run( self, fn_name, *args, handler ):
+        delay = self.reconnect_delay_initial
+
+        attempt = 1
+        while True:
+            p4 = self.connection()
+            try:
+                self.__keepAlive( p4 )
+
+                start = time.monotonic()
+                result = p4.run( fn_name, *args, handler=handler )
+                self.__recordLatency( fn_name, time.monotonic() - start )
+                self.__thread_local.last_used = time.monotonic()
+
+                if not handler.retry:
+                    return result
+
+                # the handler saw a connection time out
+                handler.retry = False
+                if attempt >= self.max_attempts:
+                    raise P4.P4Exception( 'p4 %s timed out %d times' % (fn_name, attempt) )
+
+            except P4.P4Exception:
+                # only a dropped connection is worth another attempt
+                if p4.connected() or attempt >= self.max_attempts:
+                    raise
+
+            self.log.info( 'p4 %s attempt %d failed - retry in %.2fs' % (fn_name, attempt, delay) )
+            time.sleep( delay )
+            delay = min( delay*2, self.reconnect_delay_max )
+            attempt += 1
+
+    def __keepAlive( self, p4 ):
+        if not p4.connected():
+            p4.connect()
+            return
+
+        if time.monotonic() - self.__thread_local.last_used < self.keepalive_interval:
+            return
+
+        try:
+            p4.run( 'counter', 'change' )
+
+        except P4.P4Exception:
+            if p4.connected():
+                p4.disconnect()
+
+            p4.connect()
+
+    def __recordLatency( self, fn_name, duration ):
+        with self.__lock:
+            if fn_name not in self.__all_latency:
+                self.__all_latency[ fn_name ] = WbP4CommandLatency()
+
+            self.__all_latency[ fn_name ].record( duration )
+
+    def allCommandLatency( self ):
+        with self.__lock:
+            return sorted( self.__all_latency.items() )
+
+__all_connection_pools = {}
+__all_connection_pools_lock = threading.Lock()
+
+def connectionPool( project_path, log ):
+    with __all_connection_pools_lock:
+        if project_path not in __all_connection_pools:
+            __all_connection_pools[ project_path ] = WbP4ConnectionPool( log )
+
+        return __all_connection_pools[ project_path ]
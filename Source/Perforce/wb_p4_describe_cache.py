@@ -0,0 +1,113 @@
+'''
+ ====================================================================
+ Copyright (c) 2018 Barry A Scott.  All rights reserved.
+
+ This software is licensed as described in the file LICENSE.txt,
+ which you should have received as part of this distribution.
+
+ ====================================================================
+
+    wb_p4_describe_cache.py
+
+    submitted changes never change so the output of
+    "p4 describe -s" is kept in memory and on disk.
+
+'''
+import threading
+import hashlib
+import json
+
+import wb_platform_specific
+
+# only the fields that the log history and annotate use are kept
+_describe_fields = ('change', 'user', 'desc', 'time', 'status', 'action', 'depotFile')
+
+class WbP4DescribeCache:
+    # number of changes to describe in one p4 command
+    describe_chunk_size = 100
+
+    def __init__( self, server_address, log ):
+        self.log = log
+
+        self.__lock = threading.Lock()
+        self.__all_describe = None
+
+        # changes are numbered per server
+        name = hashlib.sha1( server_address.encode( 'utf-8' ) ).hexdigest()
+        self.__cache_path = wb_platform_specific.getCacheDir() / ('p4-describe-%s.json' % (name,))
+
+    def __repr__( self ):
+        return '<WbP4DescribeCache: %s>' % (self.__cache_path,)
+
+    def describeChanges( self, all_changes, run ):
+        '''
+        return a dict of change number to describe data for all_changes
+        run( *args ) is called to run "p4 describe -s" for missing changes
+        '''
+        all_changes = [int(change) for change in all_changes]
+
+        with self.__lock:
+            self.__load()
+            all_missing = [change for change in all_changes if change not in self.__all_describe]
+
+        all_fetched = {}
+        for start in range( 0, len(all_missing), self.describe_chunk_size ):
+            all_chunk = all_missing[start:start+self.describe_chunk_size]
+            for data in run( 'describe', '-s', *[str(change) for change in all_chunk] ):
+                data = dict( [(field, data[ field ]) for field in _describe_fields if field in data] )
+                all_fetched[ int(data['change']) ] = data
+
+        with self.__lock:
+            all_submitted = [(change, data) for change, data in all_fetched.items()
+                                if data.get( 'status' ) == 'submitted']
+            if len(all_submitted) > 0:
+                self.__all_describe.update( all_submitted )
+                self.__save()
+
+            all_result = dict( [(change, self.__all_describe[ change ])
+                                for change in all_changes if change in self.__all_describe] )
+
+        # pending changes are returned but not cached
+        for change, data in all_fetched.items():
+            all_result.setdefault( change, data )
+
+        return all_result
+
+    def __load( self ):
+        if self.__all_describe is not None:
+            return
+
+        self.__all_describe = {}
+        if not self.__cache_path.exists():
+            return
+
+        try:
+            with self.__cache_path.open( 'r', encoding='utf-8' ) as f:
+                all_describe = json.load( f )
+
+            self.__all_describe = dict( [(int(change), data) for change, data in all_describe.items()] )
+
+        except (OSError, ValueError) as e:
+            self.log.error( 'Cannot read P4 describe cache %s: %s' % (self.__cache_path, e) )
+
+    def __save( self ):
+        tmp_path = self.__cache_path.with_suffix( '.tmp' )
+        try:
+            self.__cache_path.parent.mkdir( parents=True, exist_ok=True )
+            with tmp_path.open( 'w', encoding='utf-8' ) as f:
+                json.dump( self.__all_describe, f )
+
+            tmp_path.replace( self.__cache_path )
+
+        except OSError as e:
+            self.log.error( 'Cannot write P4 describe cache %s: %s' % (self.__cache_path, e) )
+
+__all_describe_caches = {}
+__all_describe_caches_lock = threading.Lock()
+
+def describeCache( server_address, log ):
+    with __all_describe_caches_lock:
+        if server_address not in __all_describe_caches:
+            __all_describe_caches[ server_address ] = WbP4DescribeCache( server_address, log )
+
+        return __all_describe_caches[ server_address ]
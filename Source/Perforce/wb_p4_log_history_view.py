@@ -20,6 +20,7 @@ import wb_main_window
 import wb_ui_components
 import wb_table_view
 
+import wb_background_thread
 from wb_background_thread import thread_switcher
 
 def U_( s: str ) -> str:
@@ -207,6 +208,9 @@ class WbP4LogHistoryView(wb_main_window.WbMainWindow, wb_tracked_qwidget.WbTrack
         self.filename = None
         self.p4_project = p4_project
 
+        # stop loading the log if the window is closed
+        self.cancelOnClose( wb_background_thread.currentCancelToken() )
+
         yield self.app.switchToBackground
 
         self.log_model.loadChangeLogForFolder( self.ui_component.deferedLogHistoryProgress(), p4_project, folder, options.getLimit(), options.getSince(), options.getUntil() )
@@ -224,6 +228,9 @@ class WbP4LogHistoryView(wb_main_window.WbMainWindow, wb_tracked_qwidget.WbTrack
         self.filename = filename
         self.p4_project = p4_project
 
+        # stop loading the log if the window is closed
+        self.cancelOnClose( wb_background_thread.currentCancelToken() )
+
         yield self.app.switchToBackground
 
         self.log_model.loadChangeLogForFile( self.ui_component.deferedLogHistoryProgress(), p4_project, filename, options.getLimit(), options.getSince(), options.getUntil() )
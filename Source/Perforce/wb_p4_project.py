@@ -19,6 +19,10 @@ import datetime
 
 import wb_background_thread
 import wb_annotate_node
+import wb_project_summary
+
+import wb_p4_connection_pool
+import wb_p4_describe_cache
 
 import P4
 
@@ -59,6 +63,16 @@ class SkipEmptyWarnings(ReportErrors):
         return super().outputMessage( e )
 
 class P4Project:
+    # fetch the fstat of the whole client in one call
+    # instead of one fstat per folder
+    use_client_fstat_prefetch = True
+
+    # fields that the tree and file state need from fstat
+    client_fstat_fields = 'depotFile,clientFile,action,change,type,headAction'
+
+    # status needs the server, which may ask for a password, so is not fetched at startup
+    status_prefetch = False
+
     def __init__( self, app, prefs_project, ui_components ):
         self.app = app
         self.ui_components = ui_components
@@ -76,12 +90,26 @@ class P4Project:
             self.tree = None
             self.flat_tree = None
 
-        self.__repo = P4.P4()
+        # each thread gets its own connection from the pool
+        if self.prefs_project is not None:
+            self.__pool = wb_p4_connection_pool.connectionPool( self.prefs_project.path, self.app.log )
+
+        else:
+            self.__pool = wb_p4_connection_pool.WbP4ConnectionPool( self.app.log )
 
         self.all_file_state = {}
+        # repo relative folders whose files are in all_file_state
+        self.__all_loaded_folders = set()
 
         self.__num_modified_files = 0
 
+        # fstat of all opened files by depotFile, fetched on demand
+        self.__all_opened_fstat = None
+
+        # fstat of the whole client grouped by repo relative folder
+        self.__all_client_fstat = None
+        self.__client_fstat_key = None
+
     def _threadName( self ):
         if self.app.isForegroundThread():
             return 'fg'
@@ -89,7 +117,6 @@ class P4Project:
             return 'bg'
 
     def _run( self, fn_name, *args, **kwds ):
-        repo = self.repo()
         if self.app.isForegroundThread():
             self.app.log.stack( 'QQQ running P4 in foreground' )
         self.app.log.info( 'P4 CMD(%s): %r %r %r' % (self._threadName(), fn_name, args, kwds) )
@@ -99,46 +126,44 @@ class P4Project:
         else:
             handler =  ReportErrors( self.app.log )
 
-        while True:
-            try:
-                if not repo.connected():
-                    repo.connect()
-
-                result = self.repo().run( fn_name, *args, handler=handler )
-                if handler.retry:
-                    continue
-
-                return result
+        try:
+            return self.__pool.run( fn_name, *args, handler=handler )
 
-            except P4.P4Exception as e:
-                self.app.log.error( 'In _run( %r, %r, %r ) error %s' %
-                                    (fn_name, args, kwds
-                                    ,str(e)) )
-                raise
+        except P4.P4Exception as e:
+            self.app.log.error( 'In _run( %r, %r, %r ) error %s' %
+                                (fn_name, args, kwds
+                                ,str(e)) )
+            raise
 
     def repo( self ):
-        # setup repo on demand
-        return self.__repo
+        # the P4 object of the calling thread
+        return self.__pool.connection()
+
+    def allCommandLatency( self ):
+        return self.__pool.allCommandLatency()
 
     def cmdLogin( self, username, password ):
+        repo = self.repo()
         try:
-            self.__repo.user = username
-            self.__repo.password = password
-            self.__repo.connect()
-            self.__repo.run_login()
-            self.__repo.password = ''
+            repo.user = username
+            repo.password = password
+            self.__pool.connect()
+            repo.run_login()
+            repo.password = ''
+            # other threads use the ticket from this login
+            self.__pool.setUser( username )
             return True
 
         except P4.P4Exception as e:
-            self.__repo.password = ''
+            repo.password = ''
             self.app.log.error( str(e) )
             return False
 
     def cmdConnect( self ):
         try:
-            self.__repo.connect()
+            repo = self.__pool.connect()
             global _p4_version
-            _p4_version = self.__repo.identify().split('\n')[-2]
+            _p4_version = repo.identify().split('\n')[-2]
             return True
 
         except P4.P4Exception as e:
@@ -163,7 +188,8 @@ class P4Project:
 
     # return a new P4Project that can be used in another thread
     def newInstance( self ):
-        raise NotImplementedError('newInstance')
+        # shares the connection pool of this project
+        return P4Project( self.app, self.prefs_project, self.ui_components )
 
     def isNotEqual( self, other ):
         return self.prefs_project.name != other.prefs_project.name
@@ -177,12 +203,26 @@ class P4Project:
     def projectPath( self ):
         return self.prefs_project.path
 
+    def changeFingerprint( self ):
+        # opened files and the have list live on the server
+        return None
+
     def headRefName( self ):
         return 'unknown'
 
     def numModifiedFiles( self ):
         return self.__num_modified_files
 
+    def refreshLookupCommands( self ):
+        return []
+
+    def setRefreshLookupResults( self, all_results ):
+        pass
+
+    def statusSummary( self ):
+        # call after updateState
+        return wb_project_summary.WbProjectSummary( num_modified=self.__num_modified_files )
+
     def updateState( self, tree_leaf ):
         self.debugLog( '-'*80 )
         self.debugLog( 'updateState( %r ) repo=%s' % (tree_leaf, self.projectPath()) )
@@ -191,6 +231,9 @@ class P4Project:
         self.tree = P4ProjectTreeNode( self, self.prefs_project.name, pathlib.Path( '.' ) )
         self.flat_tree = P4ProjectTreeNode( self, self.prefs_project.name, pathlib.Path( '.' ) )
 
+        # files may have been opened or reverted outside of workbench
+        self.__all_opened_fstat = None
+
         if not self.projectPath().exists():
             self.app.log.error( T_('Project %(name)s folder %(folder)s has been deleted') %
                             {'name': self.projectName()
@@ -199,6 +242,7 @@ class P4Project:
             self.all_file_state = {}
 
         else:
+            self.__prefetchClientFStat()
             self.__calculateStatus( tree_leaf )
 
         for path, file_state in self.all_file_state.items():
@@ -211,14 +255,18 @@ class P4Project:
         # incrementally update the file state
         self.debugLogTree( 'updateTreeNodeState( %r )' % (tree_node,) )
 
-        self.__calculateFolderStatus( tree_node.absolutePath() )
+        if tree_node.relativePath() in self.__all_loaded_folders:
+            self.debugLogTree( 'updateTreeNodeState() already loaded' )
+            return
 
-        for path, file_state in self.all_file_state.items():
-            self.__updateTree( path, file_state )
+        # only merge the paths of this folder into the existing tree
+        for path in self.__calculateFolderStatus( tree_node.absolutePath() ):
+            self.__updateTree( path, self.all_file_state[ path ] )
 
     def __calculateStatus( self, tree_leaf ):
         self.debugLogTree( '__calculateStatus( %s ) ' % (tree_leaf,) )
         self.all_file_state = {}
+        self.__all_loaded_folders = set()
 
         repo_root = self.projectPath()
 
@@ -231,22 +279,31 @@ class P4Project:
 
         self.debugLogTree( '__calculateStatus() all_folders %r' % (all_folders,) )
 
+        cancel_token = wb_background_thread.currentCancelToken()
+
         while len(all_folders) > 0:
+            cancel_token.checkCancelled()
             folder = all_folders.pop()
             self.debugLogTree( '__calculateStatus() folder %s' % (folder,) )
 
             self.__calculateFolderStatus( folder )
 
     def __calculateFolderStatus( self, folder ):
+        # returns the repo relative paths of the folder's contents
         self.debugLogTree( '__calculateFolderStatus( %s )' % (folder,) )
         repo_root = self.projectPath()
 
+        self.__all_loaded_folders.add( folder.relative_to( repo_root ) )
+
+        all_paths = []
+
         # files all the files in the folder
         for filename in folder.iterdir():
             abs_path = folder / filename
             self.debugLogTree( '__calculateFolderStatus() abs_path %s' % (abs_path,) )
 
             repo_relative = abs_path.relative_to( repo_root )
+            all_paths.append( repo_relative )
 
             if abs_path.is_dir():
                 self.all_file_state[ repo_relative ] = WbP4FileState( self, repo_relative )
@@ -259,10 +316,14 @@ class P4Project:
 
         # get the p4 file status for all the files in this folder
         try:
-            all_fstat = self._run( 'fstat', '-Rc', '%s/*' % (self.pathForP4( folder ),), handler=SkipEmptyWarnings( self.app.log ) )
-            # sometimes fstat returns False (??!)
-            if type(all_fstat) == bool:
-                all_fstat = []
+            if self.__all_client_fstat is not None:
+                all_fstat = self.__all_client_fstat.get( folder.relative_to( repo_root ), [] )
+
+            else:
+                all_fstat = self._run( 'fstat', '-Rc', '%s/*' % (self.pathForP4( folder ),), handler=SkipEmptyWarnings( self.app.log ) )
+                # sometimes fstat returns False (??!)
+                if type(all_fstat) == bool:
+                    all_fstat = []
 
             for fstat in all_fstat:
                 # not interested in delete files
@@ -275,6 +336,7 @@ class P4Project:
                 if repo_relative not in self.all_file_state:
                     # filepath has been deleted
                     self.all_file_state[ repo_relative ] = WbP4FileState( self, repo_relative )
+                    all_paths.append( repo_relative )
 
                 self.all_file_state[ repo_relative ].setFStat( fstat )
 
@@ -282,6 +344,65 @@ class P4Project:
             self.app.log.error( 'P4 fstat error: %s' % (e,) )
             self.debugLogTree( '__calculateFolderStatus() fstat error %r' % (e,) )
 
+        return all_paths
+
+    def __prefetchClientFStat( self ):
+        if not self.use_client_fstat_prefetch:
+            return
+
+        # the fstat of the client only changes when a change is
+        # submitted, which bumps the change counter, or when files
+        # are opened, moved between changes or reverted
+        try:
+            change_counter = self._run( 'counter', 'change' )[0]['value']
+            all_opened_files = self.cmdOpenedFiles()
+
+        except P4.P4Exception as e:
+            self.app.log.error( 'P4 fstat prefetch error: %s' % (e,) )
+            self.__all_client_fstat = None
+            return
+
+        key = (change_counter
+              ,frozenset( [(ofile.get( 'depotFile' ), ofile.get( 'action' ), ofile.get( 'change' ))
+                            for ofile in all_opened_files] ))
+
+        if self.__all_client_fstat is not None and key == self.__client_fstat_key:
+            self.debugLogTree( '__prefetchClientFStat() using cached fstat for change %s' % (change_counter,) )
+            return
+
+        self.debugLogTree( '__prefetchClientFStat() fetching fstat for change %s' % (change_counter,) )
+
+        repo_root = self.projectPath()
+
+        try:
+            all_fstat = self._run( 'fstat', '-Rc', '-T', self.client_fstat_fields,
+                                    '%s/...' % (self.pathForP4( repo_root ),),
+                                    handler=SkipEmptyWarnings( self.app.log ) )
+            # sometimes fstat returns False (??!)
+            if type(all_fstat) == bool:
+                all_fstat = []
+
+        except P4.P4Exception as e:
+            self.app.log.error( 'P4 fstat prefetch error: %s' % (e,) )
+            self.__all_client_fstat = None
+            return
+
+        all_client_fstat = {}
+        for fstat in all_fstat:
+            if 'clientFile' not in fstat:
+                continue
+
+            try:
+                repo_relative = self.pathForWb( fstat['clientFile'] ).relative_to( repo_root )
+
+            except ValueError:
+                continue
+
+            all_client_fstat.setdefault( repo_relative.parent, [] ).append( fstat )
+
+        self.__all_client_fstat = all_client_fstat
+        self.__client_fstat_key = key
+
     def __updateTree( self, path, file_state ):
         self.debugLogTree( '__updateTree( %r, %r )' % (path, file_state) )
         node = self.tree
@@ -381,7 +502,7 @@ class P4Project:
 
     def cmdFetchChange( self ):
         self.debugLog( 'cmdFetchChange()' )
-        changespec = self.__repo.fetch_change()
+        changespec = self.repo().fetch_change()
         # lose useless UI prompt
         changespec['Description'] = ''
         # Jobs are not supported - remove is present
@@ -399,8 +520,23 @@ class P4Project:
         repo_root = self.projectPath()
 
         try:
-            cmd = ['fstat'] + all_files
-            all_fstat = self._run( *cmd )
+            # the files in a change are all opened so use the
+            # opened files fstat that is shared with the status view
+            all_opened_fstat = self.__openedFilesFStat()
+
+            all_fstat = []
+            all_missing_files = []
+            for depot_file in all_files:
+                if depot_file in all_opened_fstat:
+                    all_fstat.append( all_opened_fstat[ depot_file ] )
+
+                else:
+                    all_missing_files.append( depot_file )
+
+            if len(all_missing_files) > 0:
+                cmd = ['fstat'] + all_missing_files
+                all_fstat.extend( self._run( *cmd ) )
+
             for fstat in all_fstat:
                 abs_path = self.pathForWb( fstat['clientFile'] )
                 repo_relative = abs_path.relative_to( repo_root )
@@ -420,12 +556,14 @@ class P4Project:
 
     def cmdSaveChange( self, changespec ):
         self.debugLog( 'cmdSaveChange()' )
-        result = self.__repo.save_change( changespec )
+        self.__all_opened_fstat = None
+        result = self.repo().save_change( changespec )
         for line in result:
             self.app.log.info( line )
 
     def cmdSubmitChange( self, change ):
         self.debugLog( 'cmdSubmitChange( %r )' % (change,) )
+        self.__all_opened_fstat = None
         self._run( 'submit', change )
 
     def cmdShelveChange( self, change, reshelve=False ):
@@ -445,15 +583,19 @@ class P4Project:
         return stats, text
 
     def cmdEdit( self, filename ):
+        self.__all_opened_fstat = None
         self._run( 'edit', self.pathForP4( filename ) )
 
     def cmdAdd( self, filename ):
-        self_run( 'add', self.pathForP4( filename ) )
+        self.__all_opened_fstat = None
+        self._run( 'add', self.pathForP4( filename ) )
 
     def cmdRevert( self, filename ):
+        self.__all_opened_fstat = None
         self._run( 'revert', self.pathForP4( filename ) )
 
     def cmdDelete( self, filename ):
+        self.__all_opened_fstat = None
         self._run( 'delete', self.pathForP4( filename ) )
 
     def cmdDiffFolder( self, folder ):
@@ -515,10 +657,14 @@ class P4Project:
 
         return all_annotate_nodes
 
+    def __describeChanges( self, all_changes ):
+        cache = wb_p4_describe_cache.describeCache( self.repo().port, self.app.log )
+        return cache.describeChanges( all_changes, self._run )
+
     def cmdChangeLogForAnnotateFile( self, filename, all_revs ):
         all_change_logs = {}
 
-        for desc in self._run( 'describe', '-s', *all_revs ):
+        for desc in self.__describeChanges( all_revs ).values():
             all_change_logs[ desc['change'] ] = WbP4LogBasic( desc, self.repo() )
 
         return all_change_logs
@@ -536,8 +682,11 @@ class P4Project:
             cmd = ['%s/...' % (folder,)]
 
         try:
-            all_logs = [WbP4LogFull( data, self.repo() )
-                            for data in self._run( 'changes', cmd )]
+            all_changes = self._run( 'changes', cmd )
+            all_describe = self.__describeChanges( [data['change'] for data in all_changes] )
+            # a change that describe did not return falls back to the changes record
+            all_logs = [WbP4LogFull( data, all_describe.get( int(data['change']), data ) )
+                            for data in all_changes]
             return all_logs
 
         except P4.P4Exception as e:
@@ -557,8 +706,11 @@ class P4Project:
             cmd = [self.pathForP4( filename )]
 
         try:
-            all_logs = [WbP4LogFull( data, self.repo() )
-                            for data in self._run( 'changes', cmd )]
+            all_changes = self._run( 'changes', cmd )
+            all_describe = self.__describeChanges( [data['change'] for data in all_changes] )
+            # a change that describe did not return falls back to the changes record
+            all_logs = [WbP4LogFull( data, all_describe.get( int(data['change']), data ) )
+                            for data in all_changes]
 
             return all_logs
 
@@ -619,13 +771,34 @@ class P4Project:
     def canPush( self ) -> bool:
         return False
 
+    # fields that fstat returns for cmdOpenedFiles
+    opened_files_fstat_fields = 'depotFile,clientFile,action,change,type,workRev,headAction'
+
     def cmdOpenedFiles( self ):
-        all_opened_files = self._run( 'opened' )
+        # one fstat of the opened files returns the clientFile
+        # that p4 opened does not provide
+        all_opened_files = self._run( 'fstat', '-Ro', '-T', self.opened_files_fstat_fields,
+                                        '//%s/...' % (self.repo().client,),
+                                        handler=SkipEmptyWarnings( self.app.log ) )
+        # sometimes fstat returns False (??!)
+        if type(all_opened_files) == bool:
+            all_opened_files = []
+
         for ofile in all_opened_files:
-            fstat = self._run( 'fstat', ofile[ 'depotFile' ] )[0]
-            ofile[ 'clientFile' ] = fstat[ 'clientFile' ]
+            # opened calls the workRev rev
+            if 'workRev' in ofile:
+                ofile[ 'rev' ] = ofile[ 'workRev' ]
+
+        self.__all_opened_fstat = dict( [(ofile[ 'depotFile' ], ofile) for ofile in all_opened_files] )
+
         return all_opened_files
 
+    def __openedFilesFStat( self ):
+        if self.__all_opened_fstat is None:
+            self.cmdOpenedFiles()
+
+        return self.__all_opened_fstat
+
     def cmdChangesPending( self ):
         cmd = ['-u', os.getlogin(), '-s', 'pending', '-c', self.getClientName()]
         return self._run( 'changes', cmd )
@@ -660,13 +833,13 @@ class WbP4LogBasic:
         return '%d' % (self.change,)
 
 class WbP4LogFull(WbP4LogBasic):
-    def __init__( self, data, repo ):
-        super().__init__( data, repo )
+    def __init__( self, data, describe ):
+        super().__init__( data, None )
 
-        data = repo.run_describe( '-s', self.change )[0]
-        self.message = data['desc']
+        # changes truncates the desc so use the one from describe
+        self.message = describe['desc']
         # could add in 'type', 'rev' and 'fileSize'
-        self.all_changed_files = list( zip( data['action'], data['depotFile'] ) )
+        self.all_changed_files = list( zip( describe.get( 'action', [] ), describe.get( 'depotFile', [] ) ) )
 
 class WbP4FileState:
     map_p4_action_to_state = {
@@ -25,6 +25,7 @@ import wb_p4_credential_dialogs
 import wb_p4_annotate
 
 from wb_background_thread import thread_switcher
+from wb_background_thread import background_priority, PRIORITY_BULK
 
 #
 #   Start with the main window components interface
@@ -143,6 +144,8 @@ class P4MainWindowActions(wb_ui_actions.WbMainWindowActions):
         self.log.info( 'P4MainWindowActions.treeActionP4Debug1()' )
         p4_project = self.selectedP4Project()
         self.log.info( 'P4 Project: %r' % (p4_project,) )
+        for fn_name, latency in p4_project.allCommandLatency():
+            self.log.info( 'P4 %s: %r' % (fn_name, latency) )
 
     @thread_switcher
     def treeActionP4Connect_Bg( self, _arg=None ):
@@ -167,10 +170,12 @@ class P4MainWindowActions(wb_ui_actions.WbMainWindowActions):
     def treeTableActionP4DiffHeadVsWorking( self ):
         self.main_window.callTreeOrTableFunction( self.treeActionP4DiffHeadVsWorking, self.tableActionP4DiffHeadVsWorking )
 
+    @background_priority( PRIORITY_BULK )
     @thread_switcher
     def treeTableActionP4LogHistory_Bg( self, checked=None ):
         yield from self.main_window.callTreeOrTableFunction_Bg( self.treeActionP4LogHistory_Bg, self.tableActionP4LogHistory_Bg )
 
+    @background_priority( PRIORITY_BULK )
     @thread_switcher
     def tableActionP4LogHistory_Bg( self, checked=None ):
         yield from self.table_view.tableActionViewRepo_Bg( self._actionP4LogHistory_Bg )
@@ -251,6 +256,7 @@ class P4MainWindowActions(wb_ui_actions.WbMainWindowActions):
                 self.log.error( line )
 
     # ------------------------------------------------------------
+    @background_priority( PRIORITY_BULK )
     @thread_switcher
     def treeActionP4Push_Bg( self, checked=None ):
         p4_project = self.selectedP4Project().newInstance()
@@ -262,8 +268,8 @@ class P4MainWindowActions(wb_ui_actions.WbMainWindowActions):
 
         try:
             p4_project.cmdPush(
-                self.deferRunInForeground( self.p4OutputHandler ),
-                self.deferRunInForeground( self.p4ErrorHandler ),
+                self.p4OutputHandler,
+                self.p4ErrorHandler,
                 self.p4CredentialsPrompt,
                 self.p4AuthFailed )
 
@@ -279,6 +285,7 @@ class P4MainWindowActions(wb_ui_actions.WbMainWindowActions):
         self.main_window.updateActionEnabledStates()
 
     # ------------------------------------------------------------
+    @background_priority( PRIORITY_BULK )
     @thread_switcher
     def treeActionP4Pull_Bg( self, checked=None ):
         p4_project = self.selectedP4Project().newInstance()
@@ -290,8 +297,8 @@ class P4MainWindowActions(wb_ui_actions.WbMainWindowActions):
 
         try:
             p4_project.cmdPull(
-                self.deferRunInForeground( self.p4OutputHandler ),
-                self.deferRunInForeground( self.p4ErrorHandler ),
+                self.p4OutputHandler,
+                self.p4ErrorHandler,
                 self.p4CredentialsPrompt,
                 self.p4AuthFailed )
 
@@ -306,6 +313,7 @@ class P4MainWindowActions(wb_ui_actions.WbMainWindowActions):
         self.main_window.updateActionEnabledStates()
 
     #------------------------------------------------------------
+    # called on the background thread, self.log moves the lines to the foreground
     def p4OutputHandler( self, line ):
         self.log.info( line )
 
@@ -428,6 +436,7 @@ class P4MainWindowActions(wb_ui_actions.WbMainWindowActions):
         return tree_node
 
     # ------------------------------------------------------------
+    @background_priority( PRIORITY_BULK )
     @thread_switcher
     def treeActionP4LogHistory_Bg( self, checked=None ):
         folder_path = self.table_view.selectedAbsoluteFolder()
@@ -453,6 +462,7 @@ class P4MainWindowActions(wb_ui_actions.WbMainWindowActions):
 
         return True
 
+    @background_priority( PRIORITY_BULK )
     @thread_switcher
     def tableActionP4Annotate_Bg( self, checked=None ):
         yield from self.table_view.tableActionViewRepo_Bg( self.__actionP4Annotate_Bg )
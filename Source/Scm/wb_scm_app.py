@@ -81,6 +81,18 @@ class WbScmApp(wb_app.WbApp):
     def getAllSingletons( self ) -> List[Any]:
         return list( self.__all_singletons.values() )
 
+    def foregroundSerialKey( self ) -> Any:
+        # background work for one project runs in order
+        # while other projects use the other background threads
+        if self.main_window is None:
+            return None
+
+        scm_project_tree_node = self.main_window.selectedScmProjectTreeNode()
+        if scm_project_tree_node is None:
+            return None
+
+        return scm_project_tree_node.project.projectPath()
+
     def optionParse( self, args:List[str] ):
         for factory in self.all_factories.values():
             if factory.optionParse( args ):
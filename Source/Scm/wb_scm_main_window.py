@@ -44,10 +44,12 @@ import wb_tracked_qwidget
 import wb_platform_specific
 import wb_shell_commands
 import wb_background_thread
+import wb_background_stats_view
 
 ellipsis = '…'
 
 from wb_background_thread import thread_switcher
+from wb_background_thread import background_priority, PRIORITY_INTERACTIVE
 
 class WbScmMainWindow(wb_main_window.WbMainWindow):
     INIT_STATE_INCONSISTENT = 0 # cannot trust self variables to exist yet
@@ -269,6 +271,9 @@ class WbScmMainWindow(wb_main_window.WbMainWindow):
 
             self.tree_view.scrollTo( index )
 
+        # the other projects are updated in the background
+        self.tree_model.startStatusPrefetch()
+
     @thread_switcher
     def gotoFavorite_bg( self, favorite ):
         project = self.app.prefs.getProjectByPath( favorite.project_path )
@@ -366,21 +371,53 @@ class WbScmMainWindow(wb_main_window.WbMainWindow):
             scm_project.switchToBranch( branch_name )
 
     singleton_update_table_running = False
+    # set when an update is asked for while one is running
+    update_table_again = False
+    update_table_again_folder = None
 
     @thread_switcher
-    def updateTableView_Bg( self, folder=None ):
+    def updateTableView_Bg( self, folder=None, fingerprint=None ):
         if WbScmMainWindow.singleton_update_table_running:
+            # the running update may have missed the change
+            # all the requests made while it runs are served by one more update
+            if not WbScmMainWindow.update_table_again:
+                WbScmMainWindow.update_table_again_folder = folder
+
+            elif WbScmMainWindow.update_table_again_folder != folder:
+                WbScmMainWindow.update_table_again_folder = None
+
+            WbScmMainWindow.update_table_again = True
             return
 
         WbScmMainWindow.singleton_update_table_running = True
-
+        try:
+            while True:
+                yield from self.__updateTableView_Bg( folder, fingerprint )
+
+                if not WbScmMainWindow.update_table_again:
+                    break
+
+                # taken before this update so it may be out of date
+                fingerprint = None
+                folder = WbScmMainWindow.update_table_again_folder
+                WbScmMainWindow.update_table_again = False
+                WbScmMainWindow.update_table_again_folder = None
+                self.debugLog( 'updateTableView_Bg() updating again for %r' % (folder,) )
+
+        finally:
+            # a cancelled or failed update leaves no update to do again
+            WbScmMainWindow.singleton_update_table_running = False
+            WbScmMainWindow.update_table_again = False
+            WbScmMainWindow.update_table_again_folder = None
+
+    def __updateTableView_Bg( self, folder, fingerprint ):
         self.__updateBranches()
 
         # need to turn sort on and off to have the view sorted on an update
         self.tree_view.setSortingEnabled( False )
 
         # load in the latest status
-        yield from self.tree_model.refreshTree_Bg( folder )
+        yield from self.tree_model.refreshTree_Bg( folder, fingerprint )
 
         # sort filter is now invalid
         self.table_view.table_sortfilter.refreshFilter()
@@ -394,8 +431,6 @@ class WbScmMainWindow(wb_main_window.WbMainWindow):
         # enabled states will have changed
         self.timer_update_enable_states.start( 0 )
 
-        WbScmMainWindow.singleton_update_table_running = False
-
     def updateActionEnabledStates( self ):
         # can be called during __init__ on macOS version
         if self.table_view is None or self.table_view.table_model is None:
@@ -408,6 +443,7 @@ class WbScmMainWindow(wb_main_window.WbMainWindow):
         m = mb.addMenu( T_('&File') )
         self._addMenu( m, T_('&Preferences…'), self.appActionPreferences, role=QtWidgets.QAction.PreferencesRole )
         self._addMenu( m, T_('View Log'), self.appActionViewLog )
+        self._addMenu( m, T_('View Background Tasks'), self.appActionViewBackgroundTasks )
         self._addMenu( m, T_('E&xit'), self.close, role=QtWidgets.QAction.QuitRole )
 
         m = mb.addMenu( T_('&View') )
@@ -653,7 +689,29 @@ class WbScmMainWindow(wb_main_window.WbMainWindow):
         if self.__init_state != self.INIT_STATE_COMPLETE:
             return
 
-        self.app.wrapWithThreadSwitcher( self.updateTableView_Bg, 'appActiveHandler' )()
+        self.app.wrapWithThreadSwitcher( self.appActiveUpdate_Bg, 'appActiveHandler' )()
+
+    @thread_switcher
+    def appActiveUpdate_Bg( self ):
+        scm_project_tree_node = self.selectedScmProjectTreeNode()
+        if scm_project_tree_node is not None and not WbScmMainWindow.singleton_update_table_running:
+            scm_project = scm_project_tree_node.project
+            # a few stats of the working copy are far cheaper than a status
+            yield self.app.switchToBackground
+            fingerprint = scm_project.changeFingerprint()
+            yield self.app.switchToForeground
+
+            last_fingerprint = self.tree_model.refreshFingerprint( scm_project )
+            if last_fingerprint is not None and fingerprint == last_fingerprint:
+                self.debugLog( 'appActiveUpdate_Bg() %s has not changed' % (scm_project.projectName(),) )
+                return
+
+            # the fingerprint is only good for the project it was taken of
+            if self.selectedScmProjectTreeNode() is scm_project_tree_node:
+                yield from self.updateTableView_Bg( fingerprint=fingerprint )
+                return
+
+        yield from self.updateTableView_Bg()
 
     #------------------------------------------------------------
     #
@@ -759,6 +817,22 @@ class WbScmMainWindow(wb_main_window.WbMainWindow):
     def appActionViewLog( self ):
         wb_shell_commands.editFile( self.app, wb_platform_specific.getHomeFolder(), [wb_platform_specific.getLogFilename()] )
 
+    background_stats_key = 'background-stats-view'
+    def appActionViewBackgroundTasks( self ):
+        if self.app.hasSingleton( self.background_stats_key ):
+            stats_view = self.app.getSingleton( self.background_stats_key )
+            stats_view.raise_()
+            return
+
+        stats_view = wb_background_stats_view.WbBackgroundStatsView( self.app, self.__backgroundStatsViewClosed )
+        stats_view.show()
+
+        self.app.addSingleton( self.background_stats_key, stats_view )
+
+    def __backgroundStatsViewClosed( self ):
+        if self.app.hasSingleton( self.background_stats_key ):
+            self.app.popSingleton( self.background_stats_key )
+
     def appActionAbout( self ):
         all_about_info = []
         all_about_info.append( '%s %d.%d.%d' %
@@ -972,6 +1046,7 @@ class WbScmMainWindow(wb_main_window.WbMainWindow):
         if self.__ui_active_scm_type is not None:
             self.all_ui_components[ self.__ui_active_scm_type ].getTreeContextMenu().exec_( global_pos )
 
+    @background_priority( PRIORITY_INTERACTIVE )
     @thread_switcher
     def treeSelectionChanged_Bg( self, selected, deselected ):
         if self.__init_state < self.INIT_STATE_CONSISTENT:
@@ -16,6 +16,8 @@ import pathlib
 #   ScmProjectPlaceholder is used when the project cannot be loaded
 #
 class ScmProjectPlaceholder:
+    status_prefetch = False
+
     def __init__( self, app, prefs_project ):
         self.app = app
         self.prefs_project = prefs_project
@@ -40,6 +42,18 @@ class ScmProjectPlaceholder:
     def projectPath( self ):
         return pathlib.Path( self.prefs_project.path )
 
+    def changeFingerprint( self ):
+        return None
+
+    def refreshLookupCommands( self ):
+        return []
+
+    def setRefreshLookupResults( self, all_results ):
+        pass
+
+    def statusSummary( self ):
+        return None
+
     def updateState( self, tree_leaf ):
         pass
 
@@ -14,6 +14,8 @@ from PyQt5 import QtGui
 from PyQt5 import QtCore
 
 import wb_scm_project_place_holder
+import wb_background_thread
+import wb_async_commands
 
 from wb_background_thread import thread_switcher
 
@@ -36,11 +38,15 @@ class WbScmTreeSortFilter(QtCore.QSortFilterProxyModel):
         return left_ent.text().lower() > right_ent.text().lower()
 
     def selectionChanged( self, selected, deselected ):
-        self.app.wrapWithThreadSwitcher( self.main_window.treeSelectionChanged_Bg, 'sort filter SelectionChanged' )(
+        # a newer selection cancels the work for an older one
+        self.app.wrapWithThreadSwitcher( self.main_window.treeSelectionChanged_Bg, 'sort filter SelectionChanged', cancel_group='tree selection' )(
                 self.mapSelectionToSource( selected ),
                 self.mapSelectionToSource( deselected ) )
 
 class WbScmTreeModel(QtGui.QStandardItemModel):
+    # number of projects that have their status prefetched at the same time
+    status_prefetch_parallelism = 2
+
     def __init__( self, app, table_model ):
         assert table_model is not None
         self.app = app
@@ -56,6 +62,20 @@ class WbScmTreeModel(QtGui.QStandardItemModel):
         self.debugLog( 'WbScmTreeModel.__init__ self.selected_node = None' )
         self.selected_node = None
 
+        # set while the status of a project is being updated
+        # and left set if the update is cancelled
+        self.interrupted_refresh_project = None
+
+        # projectPath to the changeFingerprint() taken at the start
+        # of the last completed status update of that project
+        self.all_refresh_fingerprints = {}
+
+        # project name to the WbProjectSummary shown next to the name
+        self.all_project_summaries = {}
+
+        # projects waiting for startStatusPrefetch() to update them
+        self.all_prefetch_projects = []
+
     def addProject( self, project ):
         scm_project = self.app.top_window.createProject( project )
         if scm_project is None:
@@ -84,23 +104,52 @@ class WbScmTreeModel(QtGui.QStandardItemModel):
         self.removeRow( row, QtCore.QModelIndex() )
 
     @thread_switcher
-    def refreshTree_Bg( self, folder=None ):
+    def refreshTree_Bg( self, folder=None, fingerprint=None ):
         self.debugLog( 'refreshTree_Bg( %r ) selected_node %r' % (folder, self.selected_node) )
         if self.selected_node is None:
             return
 
         scm_project = self.selected_node.scm_project_tree_node.project
         self.app.top_window.setStatusAction( T_('Update status of %s') % (scm_project.projectName(),) )
+        self.interrupted_refresh_project = scm_project
         yield self.app.switchToBackground
 
         # update the project data
         if folder is None:
             folder = self.selected_node.scm_project_tree_node.relativePath()
 
-        scm_project.updateState( folder )
+        # the caller takes the fingerprint before the update so that
+        # changes made during the update cause the next refresh to happen
+        self.all_refresh_fingerprints.pop( scm_project.projectPath(), None )
+
+        # the lookups run while the status is updated
+        all_lookup_commands = scm_project.refreshLookupCommands()
+        commands_wait = None
+        if len(all_lookup_commands) > 0:
+            commands_wait = wb_async_commands.WbAsyncCommandsWait( self.app, all_lookup_commands )
+
+        try:
+            scm_project.updateState( folder )
+
+        except:
+            if commands_wait is not None:
+                commands_wait.cancel()
+            raise
+
+        self.interrupted_refresh_project = None
+        if fingerprint is not None:
+            self.all_refresh_fingerprints[ scm_project.projectPath() ] = fingerprint
+
+        if commands_wait is not None:
+            yield commands_wait
+            scm_project.setRefreshLookupResults( commands_wait.results() )
+
+        summary = scm_project.statusSummary()
 
         yield self.app.switchToForeground
 
+        self.setProjectSummary( scm_project, summary )
+
         self.app.top_window.setStatusAction()
 
         # add new nodes
@@ -114,6 +163,121 @@ class WbScmTreeModel(QtGui.QStandardItemModel):
             self.table_model.setScmProjectTreeNode( self.selected_node.scm_project_tree_node )
         self.debugLog( 'refreshTree_Bg() Done' )
 
+    def refreshFingerprint( self, scm_project ):
+        return self.all_refresh_fingerprints.get( scm_project.projectPath() )
+
+    def setProjectSummary( self, scm_project, summary ):
+        name = scm_project.tree.name
+        self.all_project_summaries[ name ] = summary
+
+        index = self.indexFromProjectName( name )
+        if index is not None:
+            self.dataChanged.emit( index, index )
+
+    def data( self, index, role=QtCore.Qt.DisplayRole ):
+        if role in (QtCore.Qt.DisplayRole, QtCore.Qt.ToolTipRole) and index.isValid() and not index.parent().isValid():
+            # the top level items are the projects
+            name = super().data( index, QtCore.Qt.DisplayRole )
+            summary = self.all_project_summaries.get( name )
+            if summary is not None:
+                if role == QtCore.Qt.ToolTipRole:
+                    return summary.toolTipText()
+
+                badge_text = summary.badgeText()
+                if badge_text != '':
+                    return '%s  [%s]' % (name, badge_text)
+
+        return super().data( index, role )
+
+    #------------------------------------------------------------
+    #
+    #   update the status of the projects that are not selected
+    #   so that switching to them does not need a status update
+    #
+    #------------------------------------------------------------
+    def startStatusPrefetch( self ):
+        selected_scm_project = None
+        if self.selected_node is not None:
+            selected_scm_project = self.selected_node.scm_project_tree_node.project
+
+        self.all_prefetch_projects = [scm_project for scm_project, tree_node in self.all_scm_projects.values()
+                                        if scm_project.status_prefetch and scm_project is not selected_scm_project]
+        self.debugLog( 'startStatusPrefetch() %d projects' % (len(self.all_prefetch_projects),) )
+
+        for _ in range( self.status_prefetch_parallelism ):
+            self.__prefetchNextStatus()
+
+    def __prefetchNextStatus( self ):
+        while len(self.all_prefetch_projects) > 0:
+            scm_project = self.all_prefetch_projects.pop( 0 )
+            # deleted or already updated by selecting it
+            if( scm_project.tree.name in self.all_scm_projects
+            and self.refreshFingerprint( scm_project ) is None ):
+                break
+
+        else:
+            return
+
+        # bulk priority so that the users work goes first
+        self.app.runInBackground( self.__prefetchStatus, (scm_project,),
+                    serial_key=scm_project.projectPath(), priority=wb_background_thread.PRIORITY_BULK )
+
+    def __prefetchStatus( self, scm_project ):
+        self.debugLog( '__prefetchStatus( %r )' % (scm_project,) )
+        commands_wait = None
+        try:
+            fingerprint = scm_project.changeFingerprint()
+            # the lookups run while the status is updated
+            all_lookup_commands = scm_project.refreshLookupCommands()
+            if len(all_lookup_commands) > 0:
+                commands_wait = wb_async_commands.WbAsyncCommandsWait( self.app, all_lookup_commands )
+
+            scm_project.updateState( scm_project.tree.relativePath() )
+
+        except:
+            self.app.log.exception( 'status prefetch of %s failed' % (scm_project.projectName(),) )
+            if commands_wait is not None:
+                commands_wait.cancel()
+
+            self.app.runInForeground( self.__prefetchStatusDone, (scm_project, None, None) )
+            return
+
+        if commands_wait is None:
+            self.__prefetchStatusSummary( scm_project, fingerprint, None )
+
+        else:
+            # no background worker is held while the lookups finish
+            commands_wait( self.__prefetchStatusSummary, (scm_project, fingerprint, commands_wait),
+                        serial_key=scm_project.projectPath(), priority=wb_background_thread.PRIORITY_BULK )
+
+    def __prefetchStatusSummary( self, scm_project, fingerprint, commands_wait ):
+        try:
+            if commands_wait is not None:
+                scm_project.setRefreshLookupResults( commands_wait.results() )
+
+            summary = scm_project.statusSummary()
+
+        except:
+            self.app.log.exception( 'status prefetch of %s failed' % (scm_project.projectName(),) )
+            fingerprint = None
+            summary = None
+
+        self.app.runInForeground( self.__prefetchStatusDone, (scm_project, fingerprint, summary) )
+
+    def __prefetchStatusDone( self, scm_project, fingerprint, summary ):
+        if scm_project.tree.name in self.all_scm_projects:
+            if fingerprint is not None:
+                self.all_refresh_fingerprints[ scm_project.projectPath() ] = fingerprint
+
+            if summary is not None:
+                self.setProjectSummary( scm_project, summary )
+
+            # show the folders of the project
+            _, tree_node = self.all_scm_projects[ scm_project.tree.name ]
+            tree_node.update( scm_project.tree )
+
+        self.__prefetchNextStatus()
+
     def getFirstProjectIndex( self ):
         if self.invisibleRootItem().rowCount() == 0:
             return None
@@ -129,6 +293,9 @@ class WbScmTreeModel(QtGui.QStandardItemModel):
         return item.text()
 
     def indexFromProject( self, project ):
+        return self.indexFromProjectName( project.name )
+
+    def indexFromProjectName( self, name ):
         item = self.invisibleRootItem()
 
         row = 0
@@ -138,7 +305,7 @@ class WbScmTreeModel(QtGui.QStandardItemModel):
             if child is None:
                 return None
 
-            if child.text() == project.name:
+            if child.text() == name:
                 item = child
                 break
 
@@ -212,18 +379,39 @@ class WbScmTreeModel(QtGui.QStandardItemModel):
         self.debugLog( 'selectionChanged() selected_node %r' % (selected_node,) )
 
         need_to_refresh = False
+        new_project = selected_node.scm_project_tree_node.project
         if self.selected_node is not None:
             old_project = self.selected_node.scm_project_tree_node.project
-            new_project = selected_node.scm_project_tree_node.project
             if old_project != new_project:
                 need_to_refresh = True
 
+        # the status of the project is incomplete
+        if self.interrupted_refresh_project is new_project:
+            need_to_refresh = True
+
         self.debugLog( 'selectionChanged() self.selected_node = %r' % (selected_node,) )
         self.selected_node = selected_node
 
+        fingerprint = None
+        if need_to_refresh and self.interrupted_refresh_project is not new_project:
+            # the status from an earlier refresh or the prefetch is still good
+            # if nothing has changed since it was taken
+            yield self.app.switchToBackground
+            fingerprint = new_project.changeFingerprint()
+            yield self.app.switchToForeground
+
+            last_fingerprint = self.refreshFingerprint( new_project )
+            if last_fingerprint is not None and fingerprint == last_fingerprint:
+                self.debugLog( 'selectionChanged() %s has not changed' % (new_project.projectName(),) )
+                need_to_refresh = False
+
+            # the fingerprint is only good for the project it was taken of
+            if self.selected_node is not selected_node:
+                fingerprint = None
+
         if need_to_refresh:
             self.debugLog( 'selectionChanged() calling refreshTree_Bg' )
-            yield from self.refreshTree_Bg()
+            yield from self.refreshTree_Bg( fingerprint=fingerprint )
 
             self.app.top_window.setStatusAction()
 
@@ -0,0 +1,47 @@
+'''
+ ====================================================================
+ Copyright (c) 2016 Barry A Scott.  All rights reserved.
+
+ This software is licensed as described in the file LICENSE.txt,
+ which you should have received as part of this distribution.
+
+ ====================================================================
+
+    wb_svn_client_pool.py
+
+    A pysvn.Client must only be used by one thread at a time.
+    The pool hands out idle clients to worker threads and
+    creates new ones when all are in use.
+
+'''
+import threading
+import contextlib
+
+class WbSvnClientPool:
+    def __init__( self, new_client ):
+        self.__new_client = new_client
+
+        self.__lock = threading.Lock()
+        self.__all_idle_clients = []
+
+    def __repr__( self ):
+        return '<WbSvnClientPool: idle %d>' % (len(self.__all_idle_clients),)
+
+    @contextlib.contextmanager
+    def client( self ):
+        with self.__lock:
+            if len(self.__all_idle_clients) > 0:
+                client = self.__all_idle_clients.pop()
+
+            else:
+                client = None
+
+        if client is None:
+            client = self.__new_client()
+
+        try:
+            yield client
+
+        finally:
+            with self.__lock:
+                self.__all_idle_clients.append( client )
@@ -0,0 +1,187 @@
+'''
+ ====================================================================
+ Copyright (c) 2016 Barry A Scott.  All rights reserved.
+
+ This software is licensed as described in the file LICENSE.txt,
+ which you should have received as part of this distribution.
+
+ ====================================================================
+
+    wb_svn_log_cache.py
+
+    Keep the svn log of paths on disk.
+
+    Revisions never change once committed so the log of a path
+    is complete for the range of revisions that has been fetched.
+    Only revisions outside of that range need to come from the server.
+
+'''
+import threading
+import hashlib
+import json
+
+import pysvn
+
+import wb_platform_specific
+
+class WbSvnLogEntry(dict):
+    # looks like the PysvnLog and PysvnLogChangedPath that pysvn returns
+    def __getattr__( self, name ):
+        try:
+            return self[ name ]
+
+        except KeyError:
+            raise AttributeError( name )
+
+    def __setattr__( self, name, value ):
+        self[ name ] = value
+
+def _revisionNumber( revision ):
+    if revision is None:
+        return None
+
+    return revision.number
+
+def _revision( number ):
+    if number is None:
+        return None
+
+    return pysvn.Revision( pysvn.opt_revision_kind.number, number )
+
+def plainLog( log ):
+    # turn a PysvnLog into something that json can save
+    all_changed_paths = []
+    for changed_path in log.get( 'changed_paths', [] ):
+        all_changed_paths.append(
+            {'action': changed_path.action
+            ,'path': changed_path.path
+            ,'copyfrom_path': changed_path.copyfrom_path
+            ,'copyfrom_revision': _revisionNumber( changed_path.copyfrom_revision )} )
+
+    return {'revision': log.revision.number
+           ,'author': log.get( 'author', '' )
+           ,'date': log.get( 'date', 0 )
+           ,'message': log.get( 'message', '' )
+           ,'changed_paths': all_changed_paths}
+
+def logEntry( plain_log ):
+    # a new object every time as callers add attributes such as is_tag
+    entry = WbSvnLogEntry( plain_log )
+    entry.revision = _revision( plain_log['revision'] )
+    entry.changed_paths = []
+    for plain_changed_path in plain_log['changed_paths']:
+        changed_path = WbSvnLogEntry( plain_changed_path )
+        changed_path.copyfrom_revision = _revision( plain_changed_path['copyfrom_revision'] )
+        entry.changed_paths.append( changed_path )
+
+    return entry
+
+class WbSvnPathLog:
+    '''
+    the log entries of one path for the revisions oldest to youngest.
+    hold lock while using the path log.
+    '''
+    def __init__( self, cache_path, log ):
+        self.log = log
+        self.lock = threading.Lock()
+
+        self.__cache_path = cache_path
+
+        self.oldest = None
+        self.youngest = None
+        # true when there are no older revisions to fetch
+        self.is_complete = False
+        self.__all_logs = {}
+
+        self.__load()
+
+    def __repr__( self ):
+        return ('<WbSvnPathLog: r%s:r%s complete %r logs %d>' %
+                (self.oldest, self.youngest, self.is_complete, len(self.__all_logs)))
+
+    def isEmpty( self ):
+        return self.youngest is None
+
+    def oldestLog( self ):
+        if len(self.__all_logs) == 0:
+            return None
+
+        return self.__all_logs[ min( self.__all_logs ) ]
+
+    def addLogs( self, all_plain_logs, oldest, youngest, is_complete ):
+        '''
+        add the logs of all the revisions oldest to youngest
+        the range must touch or overlap the range already held
+        '''
+        if self.isEmpty():
+            self.oldest = oldest
+            self.youngest = youngest
+
+        else:
+            assert oldest <= self.youngest+1 and youngest >= self.oldest-1
+            self.oldest = min( self.oldest, oldest )
+            self.youngest = max( self.youngest, youngest )
+
+        if is_complete:
+            self.is_complete = True
+
+        for plain_log in all_plain_logs:
+            self.__all_logs[ plain_log['revision'] ] = plain_log
+
+        self.__save()
+
+    def allLogs( self, oldest=None, youngest=None ):
+        # youngest first
+        return [logEntry( self.__all_logs[ revision ] )
+                    for revision in sorted( self.__all_logs, reverse=True )
+                    if (oldest is None or revision >= oldest)
+                    and (youngest is None or revision <= youngest)]
+
+    def __load( self ):
+        if not self.__cache_path.exists():
+            return
+
+        try:
+            with self.__cache_path.open( 'r', encoding='utf-8' ) as f:
+                data = json.load( f )
+
+            self.oldest = data['oldest']
+            self.youngest = data['youngest']
+            self.is_complete = data['is_complete']
+            self.__all_logs = dict( [(plain_log['revision'], plain_log) for plain_log in data['logs']] )
+
+        except (OSError, ValueError, KeyError) as e:
+            self.log.error( 'Cannot read svn log cache %s: %s' % (self.__cache_path, e) )
+
+    def __save( self ):
+        data = {'oldest': self.oldest
+               ,'youngest': self.youngest
+               ,'is_complete': self.is_complete
+               ,'logs': list( self.__all_logs.values() )}
+
+        tmp_path = self.__cache_path.with_suffix( '.tmp' )
+        try:
+            self.__cache_path.parent.mkdir( parents=True, exist_ok=True )
+            with tmp_path.open( 'w', encoding='utf-8' ) as f:
+                json.dump( data, f )
+
+            tmp_path.replace( self.__cache_path )
+
+        except OSError as e:
+            self.log.error( 'Cannot write svn log cache %s: %s' % (self.__cache_path, e) )
+
+__all_path_logs = {}
+__all_path_logs_lock = threading.Lock()
+
+def pathLog( repos_uuid, url, strict_node_history, log ):
+    '''
+    return the WbSvnPathLog for url in the repository repos_uuid
+    '''
+    key = (repos_uuid, url, strict_node_history)
+    with __all_path_logs_lock:
+        if key not in __all_path_logs:
+            name = hashlib.sha1( repr( key ).encode( 'utf-8' ) ).hexdigest()
+            cache_path = wb_platform_specific.getCacheDir() / 'svn-log' / repos_uuid / ('%s.json' % (name,))
+            __all_path_logs[ key ] = WbSvnPathLog( cache_path, log )
+
+        return __all_path_logs[ key ]
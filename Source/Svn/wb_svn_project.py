@@ -12,25 +12,96 @@
 '''
 import pathlib
 import tempfile
+import threading
+import difflib
+import concurrent.futures
 import pysvn
 
 import wb_date
 import wb_read_file
 import wb_annotate_node
 import wb_background_thread
+import wb_change_fingerprint
+import wb_project_summary
 import wb_svn_utils
+import wb_svn_log_cache
+import wb_svn_wc_db
+import wb_svn_client_pool
 
 ClientError = pysvn.ClientError
 
 class SvnProject:
     svn_depth_empty = pysvn.depth.empty
+    svn_depth_immediates = pysvn.depth.immediates
     svn_depth_infinity = pysvn.depth.infinity
 
+    # only ask svn for the files that are not clean
+    # clean files are the versioned files that status2 does not return
+    use_changed_only_status = True
+
+    # status each folder as it is expanded rather than the whole working copy
+    # numUncommittedFiles only counts the folders that have been expanded
+    use_lazy_folder_status = False
+
+    # find the changed files from .svn/wc.db and only ask status2 about them
+    use_wc_db_status = False
+    # beyond this many possibly changed files a full status2 is quicker
+    max_wc_db_status_candidates = 1000
+
+    # run status2 on each top level folder in its own thread
+    # pysvn releases the GIL while svn works
+    use_parallel_status = False
+    parallel_status_workers = 4
+
+    # number of threads used to diff the files of a folder
+    diff_folder_workers = 4
+
+    # read BASE text from .svn/pristine rather than svn cat
+    use_pristine_store = True
+
+    # answer log requests from the on disk log cache
+    use_log_cache = True
+    # number of older log entries to fetch at a time to fill the log cache
+    log_cache_fetch_size = 100
+
+    # above this many tracked files or folders the working tree
+    # is not fingerprinted and the status is always refreshed
+    change_fingerprint_max_files = 50000
+    change_fingerprint_max_folders = 5000
+
+    # status is worked out locally so can be fetched at startup for all projects
+    status_prefetch = True
+
     svn_rev_head = pysvn.Revision( pysvn.opt_revision_kind.head )
     svn_rev_base = pysvn.Revision( pysvn.opt_revision_kind.base )
     svn_rev_working = pysvn.Revision( pysvn.opt_revision_kind.working )
     svn_rev_r0 = pysvn.Revision( pysvn.opt_revision_kind.number, 0 )
 
+    # notifications for paths whose info2 may have changed
+    info_changing_notify_actions = (
+        pysvn.wc_notify_action.add
+        ,pysvn.wc_notify_action.copy
+        ,pysvn.wc_notify_action.delete
+        ,pysvn.wc_notify_action.revert
+        ,pysvn.wc_notify_action.restore
+        ,pysvn.wc_notify_action.resolved
+        ,pysvn.wc_notify_action.locked
+        ,pysvn.wc_notify_action.unlocked
+        ,pysvn.wc_notify_action.commit_added
+        ,pysvn.wc_notify_action.commit_modified
+        ,pysvn.wc_notify_action.commit_deleted
+        ,pysvn.wc_notify_action.commit_replaced
+        ,pysvn.wc_notify_action.commit_copied
+        ,pysvn.wc_notify_action.commit_copied_replaced
+        ,pysvn.wc_notify_action.update_started
+        ,pysvn.wc_notify_action.update_add
+        ,pysvn.wc_notify_action.update_delete
+        ,pysvn.wc_notify_action.update_update
+        ,pysvn.wc_notify_action.update_completed
+        ,pysvn.wc_notify_action.update_external
+        ,pysvn.wc_notify_action.tree_conflict
+        )
+
     def __init__( self, app, prefs_project, ui_components ):
         self.app = app
         self.ui_components = ui_components
@@ -50,21 +121,37 @@ class SvnProject:
         self.__client_fg.callback_get_login = self.ui_components.svnGetLogin
         self.__client_fg.callback_ssl_server_trust_prompt = self.ui_components.svnSslServerTrustPrompt
 
-        self.__client_bg = pysvn.Client()
-        self.__client_bg.exception_style = 1
-        self.__client_bg.commit_info_style = 2
-        self.__client_bg.callback_notify = self.svnCallbackNotify
-        self.__client_bg.callback_get_login = wb_background_thread.GetReturnFromCallingFunctionOnMainThread( self.app, self.ui_components.svnGetLogin )
-        self.__client_bg.callback_ssl_server_trust_prompt = wb_background_thread.GetReturnFromCallingFunctionOnMainThread( self.app, self.ui_components.svnSslServerTrustPrompt )
+        self.__client_bg = self.__newBackgroundClient()
+
+        # clients for the worker threads
+        self.__client_pool = wb_svn_client_pool.WbSvnClientPool( self.__newBackgroundClient )
+
+        # info2 of abs paths, kept until a notification says it changed
+        # or the status is updated
+        self.__info_lock = threading.Lock()
+        self.__all_info = {}
+        self.__repos_uuid = None
+        self.__repos_root_url = None
 
         if prefs_project is not None:
             self.tree = SvnProjectTreeNode( self, prefs_project.name, pathlib.Path( '.' ) )
 
             self.all_file_state = {}
+            self.__all_loaded_folders = set()
+            self.__root_url = None
             self.__stale_status = False
 
             self.__num_uncommitted_files = 0
 
+    def __newBackgroundClient( self ):
+        client = pysvn.Client()
+        client.exception_style = 1
+        client.commit_info_style = 2
+        client.callback_notify = self.svnCallbackNotify
+        client.callback_get_login = wb_background_thread.GetReturnFromCallingFunctionOnMainThread( self.app, self.ui_components.svnGetLogin )
+        client.callback_ssl_server_trust_prompt = wb_background_thread.GetReturnFromCallingFunctionOnMainThread( self.app, self.ui_components.svnSslServerTrustPrompt )
+        return client
+
     def client( self ):
         if self.app.isForegroundThread():
             return self.__client_fg
@@ -99,6 +186,31 @@ class SvnProject:
     def projectPath( self ):
         return self.prefs_project.path
 
+    def changeFingerprint( self ):
+        '''
+        return a value that differs whenever the status may have changed
+        or None if the status must always be refreshed
+        '''
+        project_path = pathlib.Path( self.projectPath() )
+        wc_root = wb_svn_wc_db.findWcRoot( project_path )
+        if wc_root is None:
+            return None
+
+        folder_fingerprint = wb_change_fingerprint.folderFingerprint( project_path, ('.svn',), self.change_fingerprint_max_folders )
+        if folder_fingerprint is None:
+            return None
+
+        # the tracked files found by the last status update
+        all_tracked_paths = [project_path / path for path, file_state in list( self.all_file_state.items() )
+                                if file_state.isControlled() and not file_state.isDir()]
+        files_fingerprint = wb_change_fingerprint.filesFingerprint( all_tracked_paths, self.change_fingerprint_max_files )
+        if files_fingerprint is None:
+            return None
+
+        return (wb_change_fingerprint.statFingerprint( [wc_root / '.svn' / 'wc.db'] )
+               ,folder_fingerprint
+               ,files_fingerprint)
+
     def headRefName( self ):
         return 'unknown'
 
@@ -123,11 +235,32 @@ class SvnProject:
 
             self.flat_tree.addFileByPath( filepath )
 
+    def refreshLookupCommands( self ):
+        return []
+
+    def setRefreshLookupResults( self, all_results ):
+        pass
+
+    def statusSummary( self ):
+        # call after updateState
+        return wb_project_summary.WbProjectSummary(
+                    num_modified=self.__num_uncommitted_files,
+                    num_untracked=len( [file_state for file_state in self.all_file_state.values()
+                                        if file_state.isUncontrolled() and not file_state.isIgnored()] ) )
+
     def updateState( self, tree_leaf ):
         self.debugLog( 'updateState( %r ) repo=%s' % (tree_leaf, self.projectPath()) )
 
         self.__stale_status = False
 
+        # the working copy may have been changed outside of workbench
+        # for example by svn switch or svn relocate
+        with self.__info_lock:
+            self.__all_info = {}
+            self.__root_url = None
+            self.__repos_uuid = None
+            self.__repos_root_url = None
+
         # rebuild the tree
         self.tree = SvnProjectTreeNode( self, self.prefs_project.name, pathlib.Path( '.' ) )
 
@@ -140,23 +273,56 @@ class SvnProject:
             self.__num_uncommitted_files = 0
 
         else:
-            self.__calculateStatus()
+            self.__calculateStatus( tree_leaf )
 
         for path in self.all_file_state:
             self.__updateTree( path, self.all_file_state[ path ].isDir() )
 
         #self.dumpTree()
 
-    def __calculateStatus( self ):
+    def updateTreeNodeState( self, tree_node ):
+        if not self.use_lazy_folder_status:
+            return
+
+        self.debugLogUpdateTree( 'updateTreeNodeState( %r )' % (tree_node,) )
+        if tree_node.relativePath() in self.__all_loaded_folders:
+            return
+
+        for path in self.__calculateFolderStatus( tree_node.absolutePath() ):
+            self.__updateTree( path, self.all_file_state[ path ].isDir() )
+
+    def __calculateStatus( self, tree_leaf ):
         self.all_file_state = {}
+        self.__all_loaded_folders = set()
         self.__num_uncommitted_files = 0
 
         repo_root = self.projectPath()
 
+        cancel_token = wb_background_thread.currentCancelToken()
+
+        if self.use_lazy_folder_status:
+            all_folders = [repo_root]
+            abs_path = repo_root / tree_leaf
+            while abs_path != repo_root:
+                all_folders.append( abs_path )
+                abs_path = abs_path.parent
+
+            # parents first so that each folder knows if its parent is controlled
+            for folder in sorted( all_folders, key=lambda folder: len(folder.parts) ):
+                cancel_token.checkCancelled()
+                if folder.is_dir():
+                    self.__calculateFolderStatus( folder )
+
+            return
+
+        if self.use_wc_db_status and self.__calculateStatusFromWcDb():
+            return
+
         svn_dir = repo_root / '.svn'
 
         all_folders = set( [repo_root] )
         while len(all_folders) > 0:
+            cancel_token.checkCancelled()
             folder = all_folders.pop()
 
             for filename in folder.iterdir():
@@ -173,8 +339,131 @@ class SvnProject:
                 else:
                     self.all_file_state[ repo_relative ] = WbSvnFileState( self, repo_relative )
 
-        for state in self.client().status2( str(self.projectPath()) ):
+        if self.use_changed_only_status:
+            all_walked_paths = list( self.all_file_state )
+            # ignored paths must have a state or they would be marked clean
+            self.__setAllStates( self.__status2( repo_root, get_all=False, ignore=True ) )
+            self.__setCleanStates( all_walked_paths )
+
+        else:
+            self.__setAllStates( self.__status2( repo_root, get_all=True ) )
+
+    def __status2( self, folder, get_all, ignore=False ):
+        all_subtrees = []
+        if self.use_parallel_status:
+            all_subtrees = [path for path in folder.iterdir() if path.is_dir() and path.name != '.svn']
+
+        if len(all_subtrees) < 2:
+            return self.client().status2( str(folder), get_all=get_all, ignore=ignore )
+
+        def pooledStatus2( path, depth ):
+            with self.__client_pool.client() as client:
+                return client.status2( str(path), depth=depth, get_all=get_all, ignore=ignore )
+
+        with concurrent.futures.ThreadPoolExecutor( max_workers=self.parallel_status_workers ) as executor:
+            # the folder and its files and the top of each subtree
+            top_future = executor.submit( pooledStatus2, folder, self.svn_depth_immediates )
+            all_subtree_futures = [(str(subtree), executor.submit( pooledStatus2, subtree, self.svn_depth_infinity ))
+                                    for subtree in all_subtrees]
+
+            all_state = list( top_future.result() )
+            for subtree, future in all_subtree_futures:
+                all_state.extend( [state for state in future.result() if state.path != subtree] )
+
+        return all_state
+
+    def __calculateStatusFromWcDb( self ):
+        # returns False if status2 must be used instead
+        repo_root = self.projectPath()
+
+        wc_root = wb_svn_wc_db.findWcRoot( repo_root )
+        if wc_root is None:
+            return False
+
+        try:
+            with wb_svn_wc_db.WbSvnWcDb( wc_root ) as wc_db:
+                all_paths, all_candidates = wc_db.scanForCandidates( repo_root )
+
+        except wb_svn_wc_db.WbSvnWcDbError as e:
+            self.debugLog( '__calculateStatusFromWcDb() using status2: %s' % (e,) )
+            return False
+
+        if len(all_candidates) > self.max_wc_db_status_candidates:
+            self.debugLog( '__calculateStatusFromWcDb() %d candidates using status2' % (len(all_candidates),) )
+            return False
+
+        all_relative_paths = []
+        for abs_path, is_dir in all_paths.items():
+            repo_relative = abs_path.relative_to( repo_root )
+            all_relative_paths.append( repo_relative )
+
+            self.all_file_state[ repo_relative ] = WbSvnFileState( self, repo_relative )
+            if is_dir:
+                self.all_file_state[ repo_relative ].setIsDir()
+
+        # svn is the authority on the files that may have changed
+        # one status2 of each folder with candidates in it
+        all_candidate_folders = {}
+        for abs_path in all_candidates:
+            all_candidate_folders.setdefault( abs_path.parent, set() ).add( abs_path )
+
+        all_state = []
+        for folder, all_folder_candidates in sorted( all_candidate_folders.items() ):
+            all_state.extend( [state for state in self.client().status2( str(folder), depth=self.svn_depth_immediates, get_all=False, ignore=True )
+                                if pathlib.Path( state.path ) in all_folder_candidates] )
+
+        self.__setAllStates( all_state )
+        self.__setCleanStates( all_relative_paths )
+
+        return True
+
+    def __calculateFolderStatus( self, folder ):
+        # returns the repo relative paths of the folder's contents
+        self.debugLogUpdateTree( '__calculateFolderStatus( %s )' % (folder,) )
+        repo_root = self.projectPath()
+        folder_relative = folder.relative_to( repo_root )
+
+        self.__all_loaded_folders.add( folder_relative )
+
+        all_paths = []
+        for abs_path in folder.iterdir():
+            if abs_path.name == '.svn':
+                continue
+
+            repo_relative = abs_path.relative_to( repo_root )
+            all_paths.append( repo_relative )
+
+            self.all_file_state[ repo_relative ] = WbSvnFileState( self, repo_relative )
+            if abs_path.is_dir():
+                self.all_file_state[ repo_relative ].setIsDir()
+
+        # nothing in a folder that svn does not control can be controlled
+        if( folder != repo_root
+        and folder_relative in self.all_file_state
+        and not self.all_file_state[ folder_relative ].isControlled() ):
+            return all_paths
+
+        try:
+            all_state = self.client().status2( str(folder), depth=self.svn_depth_immediates, get_all=False, ignore=True )
+
+        except ClientError as e:
+            self.logClientError( e, 'status of %s failed' % (folder,) )
+            return all_paths
+
+        # the folder itself is already in the tree
+        all_state = [state for state in all_state if self.pathForWb( state.path ) != folder_relative]
+
+        all_new_paths = [path for path in self.__setAllStates( all_state ) if path not in all_paths]
+        self.__setCleanStates( all_paths )
+
+        return all_paths + all_new_paths
+
+    def __setAllStates( self, all_state ):
+        # returns the paths of all_state
+        all_paths = []
+        for state in all_state:
             filepath = self.pathForWb( state.path )
+            all_paths.append( filepath )
 
             if filepath not in self.all_file_state:
                 # filepath has been deleted
@@ -187,6 +476,27 @@ class SvnProject:
             if state.node_status in (pysvn.wc_status_kind.added, pysvn.wc_status_kind.modified, pysvn.wc_status_kind.deleted):
                 self.__num_uncommitted_files += 1
 
+        return all_paths
+
+    def __setCleanStates( self, all_paths ):
+        # paths that status2( get_all=False, ignore=True ) did not return are clean
+        # unless they are inside an unversioned or ignored folder
+        all_uncontrolled_folders = set()
+        for path in all_paths:
+            file_state = self.all_file_state[ path ]
+            if file_state.isDir() and file_state.hasState() and not file_state.isControlled():
+                all_uncontrolled_folders.add( path )
+
+        for path in all_paths:
+            file_state = self.all_file_state[ path ]
+            if file_state.hasState():
+                continue
+
+            if any( parent in all_uncontrolled_folders for parent in path.parents ):
+                continue
+
+            file_state.setIsClean()
+
     def __updateTree( self, path, is_dir ):
         self.debugLogUpdateTree( '__updateTree path %r' % (path,) )
         node = self.tree
@@ -338,6 +648,77 @@ class SvnProject:
 
         return diff_text
 
+    def cmdDiffFolderBaseVsWorking( self, folder ):
+        '''
+        generate the unified diff lines of each changed file in folder
+        the files are diffed in parallel and returned in path order
+        '''
+        self.debugLog( 'cmdDiffFolderBaseVsWorking( %r )' % (folder,) )
+
+        all_diff_states = []
+        for state in self.client().status2( self.pathForSvn( folder ), get_all=False ):
+            if state.kind != pysvn.node_kind.file:
+                continue
+
+            if state.node_status in (pysvn.wc_status_kind.added, pysvn.wc_status_kind.deleted, pysvn.wc_status_kind.replaced):
+                all_diff_states.append( (self.pathForWb( state.path ), state.node_status) )
+
+            elif state.text_status == pysvn.wc_status_kind.modified:
+                all_diff_states.append( (self.pathForWb( state.path ), state.text_status) )
+
+        all_diff_states.sort()
+
+        with concurrent.futures.ThreadPoolExecutor( max_workers=self.diff_folder_workers ) as executor:
+            all_futures = [executor.submit( self.__diffFileBaseVsWorking, filename, node_status )
+                            for filename, node_status in all_diff_states]
+
+            for future in all_futures:
+                yield future.result()
+
+    def __diffFileBaseVsWorking( self, filename, node_status ):
+        # runs on a worker thread
+        abs_path = self.projectPath() / filename
+
+        if node_status == pysvn.wc_status_kind.added:
+            base_contents = b''
+
+        else:
+            base_contents = None
+            if self.use_pristine_store:
+                base_contents = wb_svn_wc_db.pristineText( abs_path )
+
+            if base_contents is None:
+                with self.__client_pool.client() as client:
+                    base_contents = client.cat( url_or_path=str(abs_path), revision=self.svn_rev_base )
+
+        if node_status == pysvn.wc_status_kind.deleted:
+            working_contents = b''
+
+        else:
+            working_contents = abs_path.read_bytes()
+
+        path = filename.as_posix()
+        all_lines = ['Index: %s' % (path,), '='*67]
+
+        if b'\0' in base_contents or b'\0' in working_contents:
+            all_lines.append( T_('Cannot display: file is binary') )
+            return all_lines
+
+        def contentsAsLines( contents ):
+            if len(contents) == 0:
+                return []
+
+            return wb_read_file.contentsAsUnicode( contents ).split( '\n' )
+
+        all_base_lines = contentsAsLines( base_contents )
+        all_working_lines = contentsAsLines( working_contents )
+
+        all_lines.extend( difflib.unified_diff(
+                            all_base_lines, all_working_lines,
+                            '%s\t(BASE)' % (path,), '%s\t(working copy)' % (path,),
+                            lineterm='' ) )
+        return all_lines
+
     def cmdDiffRevisionVsRevision( self, filename, old_rev, new_rev ):
         self.debugLog( 'cmdDiffRevisionVsRevision( %r )' % (filename,) )
         abs_filename = self.pathForSvn( filename )
@@ -381,9 +762,36 @@ class SvnProject:
         self.client().propset( prop_name, prop_value, self.pathForSvn( filename ) )
 
     def cmdInfo( self, filename ):
-        info = self.client().info2( self.pathForSvn( filename ), depth=self.svn_depth_empty )
+        abs_path = pathlib.Path( self.pathForSvn( filename ) )
+        with self.__info_lock:
+            info = self.__all_info.get( abs_path )
+
+        if info is not None:
+            return info
+
+        all_info = self.client().info2( str(abs_path), depth=self.svn_depth_empty )
         # info is list of (path, entry)
-        return info[0][1]
+        info = all_info[0][1]
+
+        with self.__info_lock:
+            self.__all_info[ abs_path ] = info
+
+        return info
+
+    def __invalidateInfo( self, str_path ):
+        abs_path = pathlib.Path( str_path )
+        with self.__info_lock:
+            for info_path in list( self.__all_info ):
+                # an update or switch of a folder changes all that is below it
+                if info_path == abs_path or abs_path in info_path.parents:
+                    del self.__all_info[ info_path ]
+
+            if abs_path == self.projectPath() or abs_path in self.projectPath().parents:
+                # svn switch changes the URL of the working copy
+                # and svn relocate the URL of the repository
+                self.__root_url = None
+                self.__repos_uuid = None
+                self.__repos_root_url = None
 
     def cmdLock( self, filename, message, force ):
         self.client().lock( self.pathForSvn( filename ), message, force=force )
@@ -423,6 +831,40 @@ class SvnProject:
         if limit is None:
             limit = 0
 
+        if not self.use_log_cache:
+            return self.__commitLogForFileFromServer( filename, limit, since, until )
+
+        path_log = self.__pathLog( filename, True )
+        with path_log.lock:
+            if not path_log.isEmpty():
+                self.__fetchNewerLogs( self.pathForSvn( filename ), path_log, True )
+
+            while not path_log.is_complete:
+                if limit != 0 and len( self.__logsInDateRange( path_log, since, until ) ) >= limit:
+                    break
+
+                if since is not None:
+                    oldest_log = path_log.oldestLog()
+                    if oldest_log is not None and oldest_log['date'] < since:
+                        break
+
+                if limit == 0 and since is None:
+                    fetch_size = 0
+
+                else:
+                    fetch_size = max( limit, self.log_cache_fetch_size )
+
+                if not self.__fetchOlderLogs( self.pathForSvn( filename ), path_log, True, 0, fetch_size ):
+                    break
+
+            all_logs = self.__logsInDateRange( path_log, since, until )
+
+        if limit != 0:
+            all_logs = all_logs[:limit]
+
+        return all_logs
+
+    def __commitLogForFileFromServer( self, filename, limit, since, until ):
         if until is not None:
             rev_start = pysvn.Revision( pysvn.opt_revision_kind.date, until )
         else:
@@ -442,15 +884,104 @@ class SvnProject:
 
         return all_logs
 
+    def __pathLog( self, filename, strict_node_history ):
+        info = self.cmdInfo( filename )
+        return wb_svn_log_cache.pathLog( self.reposUUID(), info.URL, strict_node_history, self.app.log )
+
+    def __logsInDateRange( self, path_log, since, until ):
+        return [log for log in path_log.allLogs()
+                    if (since is None or log.date >= since)
+                    and (until is None or log.date <= until)]
+
+    def __fetchLogs( self, url_or_path, rev_start, rev_end, limit, strict_node_history ):
+        all_logs = self.client().log(
+                        url_or_path,
+                        revision_start=rev_start,
+                        revision_end=rev_end,
+                        limit=limit,
+                        strict_node_history=strict_node_history,
+                        discover_changed_paths=True )
+
+        return [wb_svn_log_cache.plainLog( log ) for log in all_logs]
+
+    def __fetchNewerLogs( self, url_or_path, path_log, strict_node_history ):
+        # the youngest revision is fetched again as it is known to exist
+        all_logs = self.__fetchLogs( url_or_path,
+                        self.svn_rev_head,
+                        pysvn.Revision( pysvn.opt_revision_kind.number, path_log.youngest ),
+                        0, strict_node_history )
+
+        youngest = max( [path_log.youngest] + [log['revision'] for log in all_logs] )
+        path_log.addLogs( all_logs, path_log.youngest, youngest, False )
+
+    def __fetchOlderLogs( self, url_or_path, path_log, strict_node_history, rev_end_num, limit, rev_start_num=None ):
+        # returns False if nothing could be added to path_log
+        if not path_log.isEmpty():
+            rev_start_num = path_log.oldest - 1
+
+        if rev_start_num is None:
+            rev_start = self.svn_rev_head
+
+        else:
+            rev_start = pysvn.Revision( pysvn.opt_revision_kind.number, rev_start_num )
+
+        all_logs = self.__fetchLogs( url_or_path,
+                        rev_start,
+                        pysvn.Revision( pysvn.opt_revision_kind.number, rev_end_num ),
+                        limit, strict_node_history )
+
+        all_revisions = [log['revision'] for log in all_logs]
+
+        if path_log.isEmpty():
+            if rev_start_num is not None:
+                youngest = rev_start_num
+
+            elif len(all_revisions) > 0:
+                youngest = max( all_revisions )
+
+            else:
+                # do not know what revision HEAD was
+                return False
+
+        else:
+            youngest = path_log.youngest
+
+        if limit != 0 and len(all_logs) >= limit:
+            oldest = min( all_revisions )
+            is_complete = False
+
+        else:
+            oldest = rev_end_num
+            is_complete = rev_end_num == 0
+
+        path_log.addLogs( all_logs, oldest, youngest, is_complete )
+        return True
+
     def cmdTagsForFile( self, filename, oldest_revision=0 ):
-        tags_url = self.__tagsUrlForFile( filename )
+        info = self.cmdInfo( filename )
+        tags_url = self.expandTagsUrl( self.prefs_project.tags_url, info.URL )
         if tags_url is None:
             return {}
 
+        if self.use_log_cache:
+            # only the tags made since the last time are fetched
+            path_log = wb_svn_log_cache.pathLog( self.reposUUID(), tags_url, True, self.app.log )
+            with path_log.lock:
+                if path_log.isEmpty():
+                    self.__fetchOlderLogs( tags_url, path_log, True, 0, 0 )
+
+                else:
+                    self.__fetchNewerLogs( tags_url, path_log, True )
+
+                all_logs = path_log.allLogs()
+
+        else:
+            all_logs = self.client().log( tags_url, discover_changed_paths=True )
+
         all_tag_names = set()
         all_tag_logs = []
 
-        for log in self.client().log( tags_url, discover_changed_paths=True ):
+        for log in all_logs:
             for changed_path in log.changed_paths:
                 if( changed_path.copyfrom_revision is not None
                 and changed_path.copyfrom_revision.number >= oldest_revision ):
@@ -464,9 +995,25 @@ class SvnProject:
 
         return all_tag_logs
 
-    def __tagsUrlForFile( self, filename ):
-        info = self.cmdInfo( filename )
-        return self.expandTagsUrl( self.prefs_project.tags_url, info['URL'] )
+    def rootUrl( self ):
+        # the URL of the working copy only changes with svn switch
+        if self.__root_url is None:
+            self.__root_url = self.cmdInfo( self.projectPath() )['URL']
+
+        return self.__root_url
+
+    def reposUUID( self ):
+        # the repository of a working copy only changes with svn relocate
+        if self.__repos_uuid is None:
+            self.__repos_uuid = self.cmdInfo( self.projectPath() )['repos_UUID']
+
+        return self.__repos_uuid
+
+    def reposRootUrl( self ):
+        if self.__repos_root_url is None:
+            self.__repos_root_url = self.cmdInfo( self.projectPath() )['repos_root_URL']
+
+        return self.__repos_root_url
 
     def expandTagsUrl( self, tags_url, filename_url ):
         if tags_url is None or tags_url == '':
@@ -481,7 +1028,7 @@ class SvnProject:
         if wild_parts == 0:
             return tags_url
 
-        top_url = self.cmdInfo( self.projectPath() )['URL']
+        top_url = self.rootUrl()
 
         # replace wild_part dirs from the filename_url
         assert filename_url[0:len(top_url)] == top_url
@@ -511,15 +1058,33 @@ class SvnProject:
         return all_annotation_nodes
 
     def cmdCommitLogForAnnotateFile( self, filename, rev_start_num, rev_end_num ):
-        rev_start = pysvn.Revision( pysvn.opt_revision_kind.number, rev_start_num )
-        rev_end = pysvn.Revision( pysvn.opt_revision_kind.number, rev_end_num )
+        if not self.use_log_cache:
+            rev_start = pysvn.Revision( pysvn.opt_revision_kind.number, rev_start_num )
+            rev_end = pysvn.Revision( pysvn.opt_revision_kind.number, rev_end_num )
 
-        all_logs = self.client().log(
-                        self.pathForSvn( filename ),
-                        revision_start=rev_start,
-                        revision_end=rev_end,
-                        strict_node_history=False,      # follow copy and move
-                        discover_changed_paths=False )
+            all_logs = self.client().log(
+                            self.pathForSvn( filename ),
+                            revision_start=rev_start,
+                            revision_end=rev_end,
+                            strict_node_history=False,      # follow copy and move
+                            discover_changed_paths=False )
+
+            return dict( [(log['revision'].number, SvnCommitLogNode( log )) for log in all_logs] )
+
+        # follow copy and move
+        path_log = self.__pathLog( filename, False )
+        with path_log.lock:
+            if path_log.isEmpty():
+                self.__fetchOlderLogs( self.pathForSvn( filename ), path_log, False, rev_end_num, 0, rev_start_num )
+
+            else:
+                if rev_start_num > path_log.youngest:
+                    self.__fetchNewerLogs( self.pathForSvn( filename ), path_log, False )
+
+                if rev_end_num < path_log.oldest and not path_log.is_complete:
+                    self.__fetchOlderLogs( self.pathForSvn( filename ), path_log, False, rev_end_num, 0 )
+
+            all_logs = path_log.allLogs( rev_end_num, rev_start_num )
 
         return dict( [(log['revision'].number, SvnCommitLogNode( log )) for log in all_logs] )
 
@@ -537,6 +1102,9 @@ class SvnProject:
 
         action = arg_dict['action']
 
+        if self.prefs_project is not None and action in self.info_changing_notify_actions:
+            self.__invalidateInfo( arg_dict['path'] )
+
         if action in (pysvn.wc_notify_action.commit_postfix_txdelta
                       ,pysvn.wc_notify_action.commit_modified
                       ,pysvn.wc_notify_action.commit_added
@@ -594,12 +1162,13 @@ class WbSvnFileState:
         self.__filepath = filepath
 
         self.__is_dir = False
+        self.__is_clean = False
 
         self.__state = None
 
     def __repr__( self ):
-        return ('<WbSvnFileState: %s %s>' %
-                (self.__filepath, self.__state))
+        return ('<WbSvnFileState: %s %s%s>' %
+                (self.__filepath, self.__state, ' clean' if self.__is_clean else ''))
 
     def relativePath( self ):
         return self.__filepath
@@ -615,6 +1184,14 @@ class WbSvnFileState:
 
     def setState( self, state ):
         self.__state = state
+        self.__is_clean = False
+
+    def hasState( self ):
+        return self.__state is not None
+
+    def setIsClean( self ):
+        # versioned and unchanged but without a status2 state
+        self.__is_clean = True
 
     def getAbbreviatedStatus( self ):
         return wb_svn_utils.svnStatusFormat( self.__state )
@@ -629,12 +1206,21 @@ class WbSvnFileState:
 
     # ------------------------------------------------------------
     def isControlled( self ):
+        if self.__is_clean:
+            return True
+
         return self.__state is not None and self.__state.is_versioned
 
     def isUncontrolled( self ):
+        if self.__is_clean:
+            return False
+
         return self.__state is None or self.__state.node_status == pysvn.wc_status_kind.unversioned
 
     def isIgnored( self ):
+        if self.__is_clean:
+            return False
+
         return self.__state is None or self.__state.node_status == pysvn.wc_status_kind.ignored
 
     def canCommit( self ):
@@ -669,9 +1255,14 @@ class WbSvnFileState:
 
     def getTextLinesBase( self ):
         path = pathlib.Path( self.__project.projectPath() ) / self.__filepath
-        all_content_lines = self.__project.client().cat(
-                                    url_or_path=str(path),
-                                    revision=self.__project.svn_rev_base )
+        all_content_lines = None
+        if self.__project.use_pristine_store:
+            all_content_lines = wb_svn_wc_db.pristineText( path )
+
+        if all_content_lines is None:
+            all_content_lines = self.__project.client().cat(
+                                        url_or_path=str(path),
+                                        revision=self.__project.svn_rev_base )
 
         all_content_lines = wb_read_file.contentsAsUnicode( all_content_lines ).split( '\n' )
 
@@ -710,7 +1301,7 @@ class SvnProjectTreeNode:
         return '<SvnProjectTreeNode: project %r, path %s>' % (self.project, self.__path)
 
     def updateTreeNode( self ):
-        pass
+        self.project.updateTreeNodeState( self )
 
     def isByPath( self ):
         return self.is_by_path
@@ -17,6 +17,7 @@ from PyQt5 import QtWidgets
 
 import wb_log_history_options_dialog
 import wb_ui_actions
+import wb_diff_unified_view
 import wb_common_dialogs
 
 import wb_svn_project
@@ -27,6 +28,7 @@ import wb_svn_commit_dialog
 import wb_svn_annotate
 
 from wb_background_thread import thread_switcher
+from wb_background_thread import background_priority, PRIORITY_BULK, PRIORITY_INTERACTIVE
 
 #
 #   Start with the main window components interface
@@ -63,8 +65,10 @@ class SvnMainWindowActions(wb_ui_actions.WbMainWindowActions):
         return self.main_window.callTreeOrTableFunction( self.enablerTreeSvnDiffHeadVsWorking, self.enablerTableSvnDiffHeadVsWorking )
 
     # ------------------------------------------------------------
-    def treeTableActionSvnDiffBaseVsWorking( self ):
-        self.main_window.callTreeOrTableFunction( self.treeActionSvnDiffBaseVsWorking, self.tableActionSvnDiffBaseVsWorking )
+    @background_priority( PRIORITY_INTERACTIVE )
+    @thread_switcher
+    def treeTableActionSvnDiffBaseVsWorking_Bg( self, checked=None ):
+        yield from self.main_window.callTreeOrTableFunction_Bg( self.treeActionSvnDiffBaseVsWorking_Bg, self.tableActionSvnDiffBaseVsWorking )
 
     def treeTableActionSvnDiffHeadVsWorking( self ):
         self.main_window.callTreeOrTableFunction( self.treeActionSvnDiffHeadVsWorking, self.tableActionSvnDiffHeadVsWorking )
@@ -87,14 +91,17 @@ class SvnMainWindowActions(wb_ui_actions.WbMainWindowActions):
     def enablerTableSvnLogHistory( self ):
         return self._enablerTableSvnIsControlled()
 
+    @background_priority( PRIORITY_BULK )
     @thread_switcher
     def tableActionSvnLogHistory_Bg( self, checked=None ):
         yield from self.table_view.tableActionViewRepo_Bg( self.__actionSvnLogHistory_Bg )
 
+    @background_priority( PRIORITY_BULK )
     @thread_switcher
     def treeTableActionSvnLogHistory_Bg( self, checked=None ):
         yield from self.main_window.callTreeOrTableFunction_Bg( self.treeActionSvnLogHistory_Bg, self.tableActionSvnLogHistory_Bg )
 
+    @background_priority( PRIORITY_BULK )
     @thread_switcher
     def treeActionSvnLogHistory_Bg( self, checked=None ):
         tree_node = self.selectedSvnProjectTreeNode()
@@ -205,17 +212,32 @@ class SvnMainWindowActions(wb_ui_actions.WbMainWindowActions):
         return file_state.isControlled()
 
     # ------------------------------------------------------------
-    def treeActionSvnDiffBaseVsWorking( self ):
+    @background_priority( PRIORITY_INTERACTIVE )
+    @thread_switcher
+    def treeActionSvnDiffBaseVsWorking_Bg( self, checked=None ):
         tree_node = self.selectedSvnProjectTreeNode()
         if tree_node is None:
             return
 
+        svn_project = tree_node.project
+
+        # show the diff of each file as soon as it is ready
+        window = wb_diff_unified_view.WbDiffViewText( self.app, 'Diff Base vs. Working from %s' % (tree_node.relativePath(),) )
+        window.show()
+
+        yield self.switchToBackground
+
         try:
-            diff_text = tree_node.project.cmdDiffFolder( tree_node.relativePath(), head=False )
-            self.showDiffText( 'Diff Base vs. Working from %s' % (tree_node.relativePath(),), diff_text.split('\n') )
+            for all_lines in svn_project.cmdDiffFolderBaseVsWorking( tree_node.relativePath() ):
+                yield self.switchToForeground
+                window.appendUnifiedDiffText( all_lines )
+                yield self.switchToBackground
 
         except wb_svn_project.ClientError as e:
-            tree_node.project.logClientError( e )
+            svn_project.logClientError( e )
+
+        yield self.switchToForeground
+        window.ensureStartVisible()
 
     def treeActionSvnDiffHeadVsWorking( self ):
         tree_node = self.selectedSvnProjectTreeNode()
@@ -224,7 +246,7 @@ class SvnMainWindowActions(wb_ui_actions.WbMainWindowActions):
 
         try:
             diff_text = tree_node.project.cmdDiffFolder( tree_node.relativePath(), head=True )
-            self.showDiffText( 'Diff Head vs. Working from %s' % (tree_node.relativePath(),), diff_text )
+            self.showDiffText( 'Diff Head vs. Working from %s' % (tree_node.relativePath(),), diff_text.split('\n') )
 
         except wb_svn_project.ClientError as e:
             tree_node.project.logClientError( e )
@@ -335,6 +357,7 @@ class SvnMainWindowActions(wb_ui_actions.WbMainWindowActions):
 
         self.top_window.setStatusAction()
 
+    @background_priority( PRIORITY_BULK )
     @thread_switcher
     def treeActionSvnUpdate_Bg( self, checked=None ):
         tree_node = self.selectedSvnProjectTreeNode()
@@ -714,6 +737,7 @@ class SvnMainWindowActions(wb_ui_actions.WbMainWindowActions):
     def enablerTableSvnAnnotate( self ):
         return self._enablerTableSvnIsControlled()
 
+    @background_priority( PRIORITY_BULK )
     @thread_switcher
     def tableActionSvnAnnotate_Bg( self, checked=None ):
         yield from self.table_view.tableActionViewRepo_Bg( self.__actionSvnAnnotate_Bg )
@@ -1015,9 +1039,7 @@ class SvnMainWindowActions(wb_ui_actions.WbMainWindowActions):
         title = T_('Diff %s') % (filename,)
 
 
-        info = mw.svn_project.cmdInfo( pathlib.Path('.') )
-
-        url = info[ 'repos_root_URL' ] + filename
+        url = mw.svn_project.reposRootUrl() + filename
 
         text_new = mw.svn_project.getTextLinesForRevisionFromUrl( url, rev_new )
         text_old = mw.svn_project.getTextLinesForRevisionFromUrl( url, rev_old )
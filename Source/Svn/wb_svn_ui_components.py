@@ -74,7 +74,7 @@ class SvnMainWindowComponents(wb_ui_components.WbMainWindowComponents):
         m = mb.addMenu( T_('&Svn Information') )
         self.all_menus.append( m )
 
-        addMenu( m, T_('Diff Base vs. Working'), act.treeTableActionSvnDiffBaseVsWorking, act.enablerTreeTableSvnDiffBaseVsWorking, 'toolbar_images/diff.png' )
+        addMenu( m, T_('Diff Base vs. Working'), act.treeTableActionSvnDiffBaseVsWorking_Bg, act.enablerTreeTableSvnDiffBaseVsWorking, 'toolbar_images/diff.png' )
         addMenu( m, T_('Diff HEAD vs. Working'), act.treeTableActionSvnDiffHeadVsWorking, act.enablerTreeTableSvnDiffHeadVsWorking, 'toolbar_images/diff.png' )
         addMenu( m, T_('Annotate'), act.tableActionSvnAnnotate_Bg, act.enablerTableSvnAnnotate )
 
@@ -132,7 +132,7 @@ class SvnMainWindowComponents(wb_ui_components.WbMainWindowComponents):
         t = addToolBar( T_('svn info') )
         self.all_toolbars.append( t )
 
-        addTool( t, T_('Diff'), act.treeTableActionSvnDiffBaseVsWorking, act.enablerTreeTableSvnDiffBaseVsWorking, 'toolbar_images/diff.png' )
+        addTool( t, T_('Diff'), act.treeTableActionSvnDiffBaseVsWorking_Bg, act.enablerTreeTableSvnDiffBaseVsWorking, 'toolbar_images/diff.png' )
         addTool( t, T_('Log History'), act.treeTableActionSvnLogHistory_Bg, act.enablerTreeTableSvnLogHistory, 'toolbar_images/history.png' )
         addTool( t, T_('Info'), act.treeTableActionSvnInfo_Bg, act.enablerTreeTableSvnInfo, 'toolbar_images/info.png' )
         addTool( t, T_('Properties'), act.treeTableActionSvnProperties_Bg, act.enablerTreeTableSvnProperties, 'toolbar_images/property.png' )
@@ -189,7 +189,7 @@ class SvnMainWindowComponents(wb_ui_components.WbMainWindowComponents):
         act = self.ui_actions
 
         m.addSection( T_('Diff') )
-        addMenu( m, T_('Diff Base vs. Working'), act.treeActionSvnDiffBaseVsWorking, act.enablerTreeSvnDiffBaseVsWorking, 'toolbar_images/diff.png' )
+        addMenu( m, T_('Diff Base vs. Working'), act.treeActionSvnDiffBaseVsWorking_Bg, act.enablerTreeSvnDiffBaseVsWorking, 'toolbar_images/diff.png' )
         addMenu( m, T_('Diff HEAD vs. Working'), act.treeActionSvnDiffHeadVsWorking, act.enablerTreeSvnDiffHeadVsWorking, 'toolbar_images/diff.png' )
 
         m.addSection( T_('Actions') )
@@ -0,0 +1,330 @@
+'''
+ ====================================================================
+ Copyright (c) 2016 Barry A Scott.  All rights reserved.
+
+ This software is licensed as described in the file LICENSE.txt,
+ which you should have received as part of this distribution.
+
+ ====================================================================
+
+    wb_svn_wc_db.py
+
+    read the working copy database .svn/wc.db without libsvn.
+
+    Only the formats listed in supported_formats are read.
+    For anything else WbSvnWcDbError is raised and the caller
+    must use pysvn instead.
+
+'''
+import os
+import zlib
+import hashlib
+import pathlib
+import sqlite3
+
+class WbSvnWcDbError(Exception):
+    pass
+
+# svn 1.7 is format 29, 1.8 to 1.14 are format 31, 1.15 is format 32
+supported_formats = (29, 31, 32)
+
+# properties that make the working text differ from the pristine text
+_translating_properties = (b'svn:keywords', b'svn:eol-style', b'svn:special')
+
+def findWcRoot( path ):
+    '''
+    return the folder that contains .svn/wc.db for path or None
+    '''
+    for folder in [path] + list( path.parents ):
+        if (folder / '.svn' / 'wc.db').exists():
+            return folder
+
+    return None
+
+class WbSvnWcDb:
+    def __init__( self, wc_root ):
+        self.wc_root = wc_root
+        self.__svn_dir = wc_root / '.svn'
+
+        uri = (self.__svn_dir / 'wc.db').as_uri() + '?mode=ro'
+        try:
+            self.__db = sqlite3.connect( uri, uri=True )
+            self.format = self.__db.execute( 'PRAGMA user_version' ).fetchone()[0]
+
+        except sqlite3.Error as e:
+            raise WbSvnWcDbError( 'cannot open %s: %s' % (uri, e) )
+
+        if self.format not in supported_formats:
+            self.close()
+            raise WbSvnWcDbError( 'unsupported wc.db format %d' % (self.format,) )
+
+    def __repr__( self ):
+        return '<WbSvnWcDb: %s format %d>' % (self.wc_root, self.format)
+
+    def close( self ):
+        self.__db.close()
+
+    def __enter__( self ):
+        return self
+
+    def __exit__( self, exc_type, exc_value, traceback ):
+        self.close()
+
+    def relpath( self, path ):
+        # wc.db uses / separated paths relative to the wc root
+        # and the wc root itself is ''
+        relpath = path.relative_to( self.wc_root ).as_posix()
+        if relpath == '.':
+            return ''
+
+        return relpath
+
+    def query( self, sql, *args ):
+        try:
+            return self.__db.execute( sql, args ).fetchall()
+
+        except sqlite3.Error as e:
+            raise WbSvnWcDbError( 'query failed: %s' % (e,) )
+
+    def pristineText( self, path ):
+        '''
+        return the pristine text of path as bytes or None
+        if it cannot be used in place of svn cat -r BASE
+        '''
+        # the row with the highest op_depth describes the working node
+        # and its checksum is the BASE text for diff, including copies
+        all_rows = self.query( 'SELECT presence, kind, checksum, properties FROM nodes'
+                                ' WHERE local_relpath = ?'
+                                ' ORDER BY op_depth DESC LIMIT 1',
+                                self.relpath( path ) )
+        if len(all_rows) == 0:
+            return None
+
+        presence, kind, checksum, properties = all_rows[0]
+        if presence != 'normal' or kind != 'file' or checksum is None:
+            return None
+
+        if properties is not None and any( name in properties for name in _translating_properties ):
+            return None
+
+        all_rows = self.query( 'SELECT compression FROM pristine WHERE checksum = ?', checksum )
+        if len(all_rows) == 0:
+            return None
+
+        is_compressed = all_rows[0][0] not in (0, None)
+
+        # checksum is "$sha1$<hex>"
+        sha1 = checksum.split( '$' )[-1]
+        pristine_path = self.__svn_dir / 'pristine' / sha1[0:2] / ('%s.svn-base' % (sha1,))
+
+        try:
+            text = pristine_path.read_bytes()
+
+        except OSError:
+            # svn 1.15 can leave the pristine file to be fetched on demand
+            return None
+
+        if not is_compressed:
+            return text
+
+        text = decompressPristine( text )
+        # the checksum is of the uncompressed text
+        if text is None or hashlib.sha1( text ).hexdigest() != sha1:
+            return None
+
+        return text
+
+    def scanForCandidates( self, top_folder ):
+        '''
+        walk top_folder comparing it against the recorded state of each node.
+
+        returns all_paths, a dict of every path found to True if it is a folder,
+        and all_candidates, the set of paths that may not be clean.
+        all other versioned paths are known to be clean.
+
+        raises WbSvnWcDbError if svn status must be used instead.
+        '''
+        for table in ('externals', 'lock', 'wc_lock'):
+            if self.query( 'SELECT count(*) FROM %s' % (table,) )[0][0] != 0:
+                raise WbSvnWcDbError( 'working copy has %s' % (table,) )
+
+        top_relpath = self.relpath( top_folder )
+        top_prefix = top_relpath + '/' if top_relpath != '' else ''
+
+        def isBelowTop( relpath ):
+            return relpath.startswith( top_prefix ) and relpath != top_relpath
+
+        # the node with the highest op_depth is the working node
+        all_nodes = {}
+        all_base_repos_paths = {}
+        all_candidate_relpaths = set()
+        for (relpath, op_depth, presence, kind, repos_path
+            ,translated_size, last_mod_time, file_external) in self.query(
+                'SELECT local_relpath, op_depth, presence, kind, repos_path,'
+                ' translated_size, last_mod_time, file_external'
+                ' FROM nodes ORDER BY op_depth' ):
+            if op_depth == 0:
+                all_base_repos_paths[ relpath ] = repos_path
+
+            elif isBelowTop( relpath ):
+                # added, copied, moved, replaced or deleted
+                all_candidate_relpaths.add( relpath )
+
+            if file_external is not None and isBelowTop( relpath ):
+                all_candidate_relpaths.add( relpath )
+
+            all_nodes[ relpath ] = (presence, kind, translated_size, last_mod_time)
+
+        # properties, conflicts and changelists
+        for (relpath,) in self.query( 'SELECT local_relpath FROM actual_node' ):
+            if isBelowTop( relpath ):
+                all_candidate_relpaths.add( relpath )
+
+        # switched nodes are not where their parent says they should be
+        for relpath, repos_path in all_base_repos_paths.items():
+            if relpath == '' or not isBelowTop( relpath ):
+                continue
+
+            parent_relpath, _, name = relpath.rpartition( '/' )
+            parent_repos_path = all_base_repos_paths.get( parent_relpath )
+            if parent_repos_path is None:
+                continue
+
+            if parent_repos_path == '':
+                expected_repos_path = name
+
+            else:
+                expected_repos_path = '%s/%s' % (parent_repos_path, name)
+
+            if repos_path != expected_repos_path:
+                all_candidate_relpaths.add( relpath )
+
+        all_paths = {}
+        all_candidates = set()
+
+        # (folder, is_versioned)
+        all_folders = [(top_folder, True)]
+        while len(all_folders) > 0:
+            folder, is_versioned_folder = all_folders.pop()
+
+            try:
+                all_dirents = list( os.scandir( str(folder) ) )
+
+            except OSError:
+                all_candidates.add( folder )
+                continue
+
+            for dirent in all_dirents:
+                if dirent.name == '.svn':
+                    continue
+
+                path = pathlib.Path( dirent.path )
+                is_dir = dirent.is_dir( follow_symlinks=False )
+                all_paths[ path ] = is_dir
+
+                if not is_versioned_folder:
+                    # whatever status says about the folder applies to this path
+                    if is_dir:
+                        all_folders.append( (path, False) )
+                    continue
+
+                if is_dir and (path / '.svn').exists():
+                    raise WbSvnWcDbError( 'nested working copy %s' % (path,) )
+
+                relpath = self.relpath( path )
+                node = all_nodes.get( relpath )
+                if node is None or node[0] not in ('normal', 'incomplete'):
+                    # unversioned or ignored
+                    all_candidates.add( path )
+                    if is_dir:
+                        all_folders.append( (path, False) )
+                    continue
+
+                presence, kind, translated_size, last_mod_time = node
+
+                if is_dir:
+                    if kind != 'dir' or presence != 'normal':
+                        all_candidates.add( path )
+
+                    all_folders.append( (path, True) )
+                    continue
+
+                if kind not in ('file', 'symlink'):
+                    all_candidates.add( path )
+                    continue
+
+                try:
+                    file_stat = dirent.stat( follow_symlinks=False )
+
+                except OSError:
+                    all_candidates.add( path )
+                    continue
+
+                if( translated_size is None or translated_size < 0
+                or last_mod_time is None
+                or translated_size != file_stat.st_size
+                or last_mod_time != file_stat.st_mtime_ns // 1000 ):
+                    all_candidates.add( path )
+
+        # versioned nodes that are missing from disk
+        for relpath, (presence, kind, translated_size, last_mod_time) in all_nodes.items():
+            if not isBelowTop( relpath ) or presence not in ('normal', 'incomplete'):
+                continue
+
+            path = self.wc_root / relpath
+            if path not in all_paths:
+                all_candidates.add( path )
+
+        for relpath in all_candidate_relpaths:
+            all_candidates.add( self.wc_root / relpath )
+
+        return all_paths, all_candidates
+
+def decompressPristine( data ):
+    '''
+    return the text of a compressed pristine or None if data is not valid.
+
+    The text is compressed as svn__compress_zlib() does: the size of the
+    text as a varint, 7 bits a byte most significant first with the top
+    bit set on all but the last byte, then the zlib data. A text that zlib
+    cannot make smaller follows the size as it is.
+    '''
+    size = 0
+    for index, byte in enumerate( data[:10] ):
+        size = (size << 7) | (byte & 0x7f)
+        if (byte & 0x80) == 0:
+            break
+
+    else:
+        return None
+
+    data = data[index+1:]
+    if len(data) == size:
+        return data
+
+    try:
+        text = zlib.decompress( data )
+
+    except zlib.error:
+        return None
+
+    if len(text) != size:
+        return None
+
+    return text
+
+def pristineText( path ):
+    '''
+    return the BASE text of the working file path as bytes
+    or None if the pristine store cannot provide it.
+    '''
+    wc_root = findWcRoot( path.parent )
+    if wc_root is None:
+        return None
+
+    try:
+        with WbSvnWcDb( wc_root ) as wc_db:
+            return wc_db.pristineText( path )
+
+    except WbSvnWcDbError:
+        return None
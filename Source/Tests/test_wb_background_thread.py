@@ -0,0 +1,344 @@
+'''
+ ====================================================================
+ Copyright (c) 2016 Barry A Scott.  All rights reserved.
+
+ This software is licensed as described in the file LICENSE.txt,
+ which you should have received as part of this distribution.
+
+ ====================================================================
+
+    test_wb_background_thread.py
+
+    The calls for the foreground thread are run by the test
+    in place of the Qt event loop.
+
+'''
+import sys
+import types
+import time
+import queue
+import pathlib
+import threading
+import unittest
+
+sys.path.insert( 0, str( pathlib.Path( __file__ ).resolve().parent.parent / 'Common' ) )
+
+try:
+    from PyQt5 import QtCore
+
+except ImportError:
+    # only the class statement of BackgroundWorkMixin needs Qt
+    QtCore = types.ModuleType( 'PyQt5.QtCore' )
+    QtCore.pyqtSignal = lambda *args, **kwds: None
+    PyQt5 = types.ModuleType( 'PyQt5' )
+    PyQt5.QtCore = QtCore
+    sys.modules[ 'PyQt5' ] = PyQt5
+    sys.modules[ 'PyQt5.QtCore' ] = QtCore
+
+import wb_background_thread
+
+# longest time a test waits for the background threads
+wait_timeout = 5.0
+
+class FakeDebugOptions:
+    def debugLogThreading( self, msg ):
+        pass
+
+class FakeLog:
+    def __init__( self ):
+        self.all_exceptions = []
+
+    def exception( self, msg ):
+        self.all_exceptions.append( msg )
+
+class FakeSignal:
+    def __init__( self, all_calls ):
+        self.all_calls = all_calls
+
+    def emit( self, call ):
+        self.all_calls.put( call )
+
+class FakeApp(wb_background_thread.BackgroundWorkMixin):
+    # the batch always runs at once so no QTimer is needed
+    foreground_batch_interval = 0.0
+
+    def __init__( self, num_workers ):
+        self.num_background_workers = num_workers
+        self.debug_options = FakeDebugOptions()
+        self.log = FakeLog()
+
+        super().__init__()
+
+        self.all_foreground_signals = queue.Queue()
+        self.foregroundProcessSignal = FakeSignal( self.all_foreground_signals )
+        self.background_executor.start()
+
+    def runForegroundUntil( self, done ):
+        # the event loop of the test
+        end_time = time.monotonic() + wait_timeout
+        while not done():
+            timeout = end_time - time.monotonic()
+            if timeout <= 0:
+                raise AssertionError( 'timed out waiting for the background threads' )
+
+            try:
+                call = self.all_foreground_signals.get( timeout=min( timeout, 0.01 ) )
+
+            except queue.Empty:
+                continue
+
+            call()
+
+class BackgroundTestCase(unittest.TestCase):
+    num_workers = 4
+
+    def setUp( self ):
+        self.app = FakeApp( self.num_workers )
+        self.all_events = []
+        self.events_lock = threading.Lock()
+
+    def tearDown( self ):
+        self.app.background_executor.shutdown()
+        for worker in self.app.background_executor.all_workers:
+            worker.join( wait_timeout )
+
+    def record( self, *event ):
+        with self.events_lock:
+            self.all_events.append( event )
+
+    def waitForEvents( self, count ):
+        self.app.runForegroundUntil( lambda: len(self.all_events) >= count )
+        return self.all_events
+
+class TestSerialLanes(BackgroundTestCase):
+    def testSameKeyRunsInOrder( self ):
+        running = []
+
+        def work( index ):
+            running.append( index )
+            # another worker would start the next one now
+            time.sleep( 0.002 )
+            self.record( index, len(running) )
+            running.remove( index )
+
+        for index in range( 20 ):
+            self.app.runInBackground( work, (index,), serial_key='project-1' )
+
+        self.assertEqual( self.waitForEvents( 20 ), [(index, 1) for index in range( 20 )] )
+
+    def testKeysRunInParallel( self ):
+        # both must be running at the same time to pass the barrier
+        barrier = threading.Barrier( 2, timeout=wait_timeout )
+
+        def work( key ):
+            barrier.wait()
+            self.record( key )
+
+        self.app.runInBackground( work, ('project-1',), serial_key='project-1' )
+        self.app.runInBackground( work, ('project-2',), serial_key='project-2' )
+
+        self.assertEqual( sorted( self.waitForEvents( 2 ) ), [('project-1',), ('project-2',)] )
+
+    def testWorkKeepsItsKey( self ):
+        def work():
+            self.record( 'work', self.app.background_executor.currentSerialKey() )
+            # queued from the background without a key
+            self.app.runInBackground( moreWork, () )
+
+        def moreWork():
+            self.record( 'more work', self.app.background_executor.currentSerialKey() )
+
+        self.app.runInBackground( work, (), serial_key='project-1' )
+
+        self.assertEqual( self.waitForEvents( 2 ), [('work', 'project-1'), ('more work', 'project-1')] )
+
+    def testFailedWorkDoesNotStopTheLane( self ):
+        def failingWork():
+            raise ValueError( 'failed' )
+
+        self.app.runInBackground( failingWork, (), serial_key='project-1' )
+        self.app.runInBackground( self.record, ('next',), serial_key='project-1' )
+
+        self.assertEqual( self.waitForEvents( 1 ), [('next',)] )
+        self.assertEqual( len(self.app.log.all_exceptions), 1 )
+
+    def testThreadSwitcherStepsStayInOrder( self ):
+        @wb_background_thread.thread_switcher
+        def task( name ):
+            self.record( name, 'foreground 1' )
+            yield self.app.switchToBackground
+            self.record( name, 'background', self.app.background_executor.currentSerialKey() )
+            yield self.app.switchToForeground
+            self.record( name, 'foreground 2' )
+
+        self.app.foregroundSerialKey = lambda: 'project-1'
+        for name in ('task-1', 'task-2'):
+            self.app.wrapWithThreadSwitcher( task, name )( name )
+
+        all_events = self.waitForEvents( 6 )
+        for name in ('task-1', 'task-2'):
+            self.assertEqual( [event[1:] for event in all_events if event[0] == name],
+                            [('foreground 1',), ('background', 'project-1'), ('foreground 2',)] )
+
+class TestCancellation(BackgroundTestCase):
+    def taskOutcomes( self ):
+        return dict( [(task_times.reason, task_times.outcome)
+                        for task_times in self.app.task_stats.slowestRecentTasks( 100 )] )
+
+    def testCancelledBetweenSteps( self ):
+        in_background = threading.Event()
+        cancelled = threading.Event()
+
+        @wb_background_thread.thread_switcher
+        def task():
+            cancel_token = wb_background_thread.currentCancelToken()
+            try:
+                yield self.app.switchToBackground
+                self.record( 'background', wb_background_thread.currentCancelToken() is cancel_token )
+                in_background.set()
+                cancelled.wait( wait_timeout )
+                yield self.app.switchToForeground
+                self.record( 'foreground' )
+
+            finally:
+                self.record( 'closed' )
+
+        self.app.wrapWithThreadSwitcher( task, 'task-1', cancel_group='group' )()
+        self.assertTrue( in_background.wait( wait_timeout ) )
+
+        # a newer task in the same group cancels the older task
+        self.app.wrapWithThreadSwitcher( task, 'task-2', cancel_group='group' )()
+        cancelled.set()
+
+        self.app.runForegroundUntil( lambda: self.taskOutcomes().get( 'task-1' ) is not None )
+        self.assertEqual( self.taskOutcomes()[ 'task-1' ], 'cancelled' )
+
+        self.app.runForegroundUntil( lambda: self.taskOutcomes().get( 'task-2' ) is not None )
+        self.assertEqual( self.taskOutcomes()[ 'task-2' ], 'done' )
+        self.assertEqual( self.all_events.count( ('foreground',) ), 1 )
+        self.assertEqual( self.all_events.count( ('closed',) ), 2 )
+        self.assertEqual( self.all_events.count( ('background', True) ), 2 )
+
+    def testCheckCancelled( self ):
+        cancel_tokens = []
+
+        @wb_background_thread.thread_switcher
+        def task():
+            cancel_tokens.append( wb_background_thread.currentCancelToken() )
+            yield self.app.switchToBackground
+            # long running work checks the token as it goes
+            while True:
+                wb_background_thread.currentCancelToken().checkCancelled()
+                time.sleep( 0.001 )
+
+        self.app.wrapWithThreadSwitcher( task, 'task' )()
+        cancel_tokens[0].cancel()
+
+        self.app.runForegroundUntil( lambda: self.taskOutcomes().get( 'task' ) is not None )
+        self.assertEqual( self.taskOutcomes()[ 'task' ], 'cancelled' )
+        self.assertEqual( self.app.log.all_exceptions, [] )
+
+    def testEachCallHasItsOwnToken( self ):
+        @wb_background_thread.thread_switcher
+        def task( name ):
+            self.record( name, wb_background_thread.currentCancelToken() )
+            yield self.app.switchToBackground
+
+        scheduler = self.app.wrapWithThreadSwitcher( task, 'task' )
+        scheduler( 'call-1' )
+        scheduler( 'call-2' )
+
+        all_events = self.waitForEvents( 2 )
+        self.assertIsNot( all_events[0][1], all_events[1][1] )
+
+    def testNoTaskToken( self ):
+        # code that is not running for a task gets a token nothing cancels
+        cancel_token = wb_background_thread.currentCancelToken()
+        self.assertFalse( cancel_token.isCancelled() )
+        cancel_token.checkCancelled()
+
+class TestPriorities(BackgroundTestCase):
+    # one worker so that the order work starts in is the order it runs in
+    num_workers = 1
+
+    def blockWorker( self, serial_key ):
+        # returns the Event that lets the worker go on
+        release = threading.Event()
+        started = threading.Event()
+
+        def gate():
+            started.set()
+            release.wait( wait_timeout )
+
+        self.app.runInBackground( gate, (), serial_key=serial_key )
+        self.assertTrue( started.wait( wait_timeout ) )
+        return release
+
+    def testReadyWorkStartsInPriorityOrder( self ):
+        release = self.blockWorker( 'gate' )
+
+        for name, priority in (('bulk-1', wb_background_thread.PRIORITY_BULK)
+                              ,('normal', wb_background_thread.PRIORITY_NORMAL)
+                              ,('bulk-2', wb_background_thread.PRIORITY_BULK)
+                              ,('interactive', wb_background_thread.PRIORITY_INTERACTIVE)):
+            self.app.runInBackground( self.record, (name,), serial_key=name, priority=priority )
+
+        release.set()
+        self.assertEqual( self.waitForEvents( 4 ), [('interactive',), ('normal',), ('bulk-1',), ('bulk-2',)] )
+
+        all_queue_wait_stats = dict( self.app.background_executor.allQueueWaitStats() )
+        self.assertEqual( [all_queue_wait_stats[ name ].count for name in ('interactive', 'normal', 'bulk')], [1, 2, 2] )
+
+    def testWaitingWorkInALaneStartsInPriorityOrder( self ):
+        release = self.blockWorker( 'project-1' )
+
+        for name, priority in (('bulk', wb_background_thread.PRIORITY_BULK)
+                              ,('normal-1', wb_background_thread.PRIORITY_NORMAL)
+                              ,('interactive', wb_background_thread.PRIORITY_INTERACTIVE)
+                              ,('normal-2', wb_background_thread.PRIORITY_NORMAL)):
+            self.app.runInBackground( self.record, (name,), serial_key='project-1', priority=priority )
+
+        release.set()
+        self.assertEqual( self.waitForEvents( 4 ), [('interactive',), ('normal-1',), ('normal-2',), ('bulk',)] )
+
+    def testWorkKeepsItsPriority( self ):
+        def work():
+            self.record( 'work', self.app.background_executor.currentPriority() )
+            # queued from the background without a priority
+            self.app.runInBackground( moreWork, () )
+
+        def moreWork():
+            self.record( 'more work', self.app.background_executor.currentPriority() )
+
+        self.app.runInBackground( work, (), priority=wb_background_thread.PRIORITY_BULK )
+        self.app.runInBackground( lambda: self.record( 'default', self.app.background_executor.currentPriority() ), () )
+
+        self.assertEqual( sorted( self.waitForEvents( 3 ) ),
+            [('default', wb_background_thread.PRIORITY_NORMAL)
+            ,('more work', wb_background_thread.PRIORITY_BULK)
+            ,('work', wb_background_thread.PRIORITY_BULK)] )
+
+    def testThreadSwitcherPriority( self ):
+        @wb_background_thread.background_priority( wb_background_thread.PRIORITY_BULK )
+        @wb_background_thread.thread_switcher
+        def bulkTask():
+            yield self.app.switchToBackground
+            self.record( 'bulk task', self.app.background_executor.currentPriority() )
+
+        @wb_background_thread.thread_switcher
+        def task():
+            yield self.app.switchToBackground
+            self.record( 'task', self.app.background_executor.currentPriority() )
+
+        self.app.wrapWithThreadSwitcher( bulkTask, 'bulk task' )()
+        self.app.wrapWithThreadSwitcher( task, 'task' )()
+        # the caller can choose the priority
+        self.app.wrapWithThreadSwitcher( task, 'interactive task', priority=wb_background_thread.PRIORITY_INTERACTIVE )()
+
+        self.assertEqual( sorted( self.waitForEvents( 3 ) ),
+            [('bulk task', wb_background_thread.PRIORITY_BULK)
+            ,('task', wb_background_thread.PRIORITY_INTERACTIVE)
+            ,('task', wb_background_thread.PRIORITY_NORMAL)] )
+
+if __name__ == '__main__':
+    unittest.main()
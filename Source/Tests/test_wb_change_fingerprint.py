@@ -0,0 +1,105 @@
+'''
+ ====================================================================
+ Copyright (c) 2016 Barry A Scott.  All rights reserved.
+
+ This software is licensed as described in the file LICENSE.txt,
+ which you should have received as part of this distribution.
+
+ ====================================================================
+
+    test_wb_change_fingerprint.py
+
+'''
+import sys
+import os
+import pathlib
+import tempfile
+import unittest
+
+sys.path.insert( 0, str( pathlib.Path( __file__ ).resolve().parent.parent / 'Common' ) )
+
+import wb_change_fingerprint
+
+class TestChangeFingerprint(unittest.TestCase):
+    def setUp( self ):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.top = pathlib.Path( self.tmp_dir.name )
+
+        (self.top / '.git').mkdir()
+        (self.top / 'a/b').mkdir( parents=True )
+        self.all_files = [self.top / 'one.txt', self.top / 'a/b/two.txt']
+        for path in self.all_files:
+            path.write_text( 'text\n' )
+
+        # mtimes that a change in these tests cannot match by chance
+        self.setMtime( self.top, 1000 )
+        for path in self.all_files + [self.top / 'a', self.top / 'a/b']:
+            self.setMtime( path, 1000 )
+
+    def tearDown( self ):
+        self.tmp_dir.cleanup()
+
+    def setMtime( self, path, mtime ):
+        os.utime( str(path), (mtime, mtime) )
+
+    def folderFingerprint( self ):
+        return wb_change_fingerprint.folderFingerprint( self.top, ('.git',), 100 )
+
+    def filesFingerprint( self ):
+        return wb_change_fingerprint.filesFingerprint( self.all_files, 100 )
+
+    def testStable( self ):
+        self.assertEqual( self.folderFingerprint(), self.folderFingerprint() )
+        self.assertEqual( self.filesFingerprint(), self.filesFingerprint() )
+        self.assertEqual( wb_change_fingerprint.statFingerprint( self.all_files ), wb_change_fingerprint.statFingerprint( self.all_files ) )
+
+    def testNewFile( self ):
+        before = self.folderFingerprint()
+        (self.top / 'a/b/new.txt').write_text( 'new\n' )
+
+        self.assertNotEqual( self.folderFingerprint(), before )
+
+    def testSkippedFolder( self ):
+        before = self.folderFingerprint()
+        (self.top / '.git/index').write_text( 'index\n' )
+        self.setMtime( self.top / '.git', 2000 )
+
+        self.assertEqual( self.folderFingerprint(), before )
+
+    def testEditInPlace( self ):
+        folder_before = self.folderFingerprint()
+        files_before = self.filesFingerprint()
+
+        path = self.top / 'a/b/two.txt'
+        path.write_text( 'edit\n' )
+        self.setMtime( self.top / 'a/b', 1000 )
+
+        # the folder mtime does not change
+        self.assertEqual( self.folderFingerprint(), folder_before )
+        self.assertNotEqual( self.filesFingerprint(), files_before )
+
+        # the same size and only a new mtime
+        files_before = self.filesFingerprint()
+        self.setMtime( path, 3000 )
+        self.assertNotEqual( self.filesFingerprint(), files_before )
+
+    def testMissingFile( self ):
+        before = self.filesFingerprint()
+        stat_before = wb_change_fingerprint.statFingerprint( self.all_files )
+        self.all_files[0].unlink()
+
+        self.assertNotEqual( self.filesFingerprint(), before )
+        stat_after = wb_change_fingerprint.statFingerprint( self.all_files )
+        self.assertNotEqual( stat_after, stat_before )
+        self.assertEqual( stat_after[0], (str(self.all_files[0]), None) )
+
+    def testOverTheLimits( self ):
+        # top, a and a/b
+        self.assertIsNotNone( wb_change_fingerprint.folderFingerprint( self.top, ('.git',), 3 ) )
+        self.assertIsNone( wb_change_fingerprint.folderFingerprint( self.top, ('.git',), 2 ) )
+
+        self.assertIsNotNone( wb_change_fingerprint.filesFingerprint( self.all_files, 2 ) )
+        self.assertIsNone( wb_change_fingerprint.filesFingerprint( self.all_files, 1 ) )
+
+if __name__ == '__main__':
+    unittest.main()
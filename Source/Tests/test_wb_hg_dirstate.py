@@ -0,0 +1,253 @@
+'''
+ ====================================================================
+ Copyright (c) 2016 Barry A Scott.  All rights reserved.
+
+ This software is licensed as described in the file LICENSE.txt,
+ which you should have received as part of this distribution.
+
+ ====================================================================
+
+    test_wb_hg_dirstate.py
+
+    parse dirstate-v1 and dirstate-v2 files built byte by byte.
+
+'''
+import sys
+import os
+import stat
+import time
+import struct
+import pathlib
+import tempfile
+import unittest
+
+sys.path.insert( 0, str( pathlib.Path( __file__ ).resolve().parent.parent / 'Hg' ) )
+
+import wb_hg_dirstate
+
+parent_1 = bytes( range( 1, 21 ) )
+parent_2 = bytes( range( 21, 41 ) )
+
+# a time well before the dirstate is written
+old_mtime = int( time.time() ) - 3600
+
+def v1Entry( state, mode, size, mtime, filename ):
+    return struct.pack( '>cllll', state, mode, size, mtime, len(filename) ) + filename
+
+def v2Node( path_offset, path, flags, size=0, mtime=0, mtime_ns=0, children_offset=0, children_len=0 ):
+    base_name_start = path.rfind( b'/' ) + 1
+    return struct.pack( '>IHHIHIIIIHIII',
+                path_offset, len(path), base_name_start,
+                0, 0,
+                children_offset, children_len,
+                0, 0,
+                flags, size, mtime, mtime_ns )
+
+class TestHgDirstate(unittest.TestCase):
+    def setUp( self ):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.repo_root = pathlib.Path( self.tmp_dir.name )
+        self.hg_dir = self.repo_root / '.hg'
+        self.hg_dir.mkdir()
+
+        self.clean_text = b'clean\n'
+        self.writeFile( 'clean.txt', self.clean_text )
+        self.writeFile( 'added.txt', b'added\n' )
+        self.writeFile( 'sub/copied.txt', b'copied\n' )
+
+    def tearDown( self ):
+        self.tmp_dir.cleanup()
+
+    def writeFile( self, name, text ):
+        path = self.repo_root / name
+        path.parent.mkdir( parents=True, exist_ok=True )
+        path.write_bytes( text )
+        os.chmod( str(path), 0o644 )
+        os.utime( str(path), (old_mtime, old_mtime) )
+
+    def statusOf( self, dirstate, name ):
+        path = pathlib.Path( name )
+        try:
+            file_stat = (self.repo_root / path).lstat()
+
+        except OSError:
+            file_stat = None
+
+        return dirstate.statusOfFile( path, file_stat )
+
+    def writeV1( self, all_entries, p2=wb_hg_dirstate.null_node ):
+        (self.hg_dir / 'requires').write_text( 'dotencode\nfncache\nstore\n' )
+        (self.hg_dir / 'dirstate').write_bytes( parent_1 + p2 + b''.join( all_entries ) )
+
+    def writeV2( self, all_nodes, all_paths, root_len ):
+        (self.hg_dir / 'requires').write_text( 'dirstate-v2\ndotencode\nstore\n' )
+
+        data = b''.join( all_nodes ) + all_paths
+        uuid = b'0123456789abcdef'
+        (self.hg_dir / ('dirstate.%s' % (uuid.decode( 'ascii' ),))).write_bytes( data )
+
+        tree_metadata = struct.pack( '>IIIII4s20s', 0, root_len, 0, 0, 0, b'', b'' )
+        docket = struct.pack( '>12s32s32s44sIB', b'dirstate-v2\n', parent_1, wb_hg_dirstate.null_node, tree_metadata, len(data), len(uuid) )
+        (self.hg_dir / 'dirstate').write_bytes( docket + uuid )
+
+    def testV1( self ):
+        self.writeV1(
+            [v1Entry( b'n', 0o100644, len(self.clean_text), old_mtime, b'clean.txt' )
+            ,v1Entry( b'a', 0, -1, -1, b'added.txt' )
+            ,v1Entry( b'r', 0, 0, 0, b'removed.txt' )
+            ,v1Entry( b'n', 0o100644, 7, old_mtime, b'missing.txt' )
+            ,v1Entry( b'a', 0, -1, -1, b'sub/copied.txt\0clean.txt' )] )
+
+        dirstate = wb_hg_dirstate.readDirstate( self.repo_root )
+
+        self.assertEqual( dirstate.firstParent(), parent_1 )
+        self.assertFalse( dirstate.isMerging() )
+        self.assertEqual( sorted( dirstate.allTrackedPaths() ),
+            [pathlib.Path( name ) for name in ('added.txt', 'clean.txt', 'missing.txt', 'removed.txt', 'sub/copied.txt')] )
+
+        self.assertEqual( self.statusOf( dirstate, 'clean.txt' ), 'C' )
+        self.assertEqual( self.statusOf( dirstate, 'added.txt' ), 'A' )
+        self.assertEqual( self.statusOf( dirstate, 'removed.txt' ), 'R' )
+        self.assertEqual( self.statusOf( dirstate, 'missing.txt' ), '!' )
+        # the copy source is not part of the name
+        self.assertEqual( self.statusOf( dirstate, 'sub/copied.txt' ), 'A' )
+        # unknown or ignored is for hg to decide
+        self.assertEqual( self.statusOf( dirstate, 'unknown.txt' ), None )
+
+    def testV1Merging( self ):
+        self.writeV1( [], p2=parent_2 )
+
+        dirstate = wb_hg_dirstate.readDirstate( self.repo_root )
+        self.assertTrue( dirstate.isMerging() )
+
+    def testV1ChangedFiles( self ):
+        self.writeV1( [v1Entry( b'n', 0o100644, len(self.clean_text), old_mtime, b'clean.txt' )] )
+        dirstate = wb_hg_dirstate.readDirstate( self.repo_root )
+
+        # same size and a new mtime must be checked by hg
+        os.utime( str(self.repo_root / 'clean.txt'), (old_mtime+1, old_mtime+1) )
+        self.assertEqual( self.statusOf( dirstate, 'clean.txt' ), None )
+
+        # a new size is always modified
+        self.writeFile( 'clean.txt', b'modified\n' )
+        self.assertEqual( self.statusOf( dirstate, 'clean.txt' ), 'M' )
+
+    @unittest.skipIf( os.name == 'nt', 'exec bit is not recorded on windows' )
+    def testV1ExecBit( self ):
+        self.writeV1( [v1Entry( b'n', 0o100644, len(self.clean_text), old_mtime, b'clean.txt' )] )
+        dirstate = wb_hg_dirstate.readDirstate( self.repo_root )
+
+        os.chmod( str(self.repo_root / 'clean.txt'), 0o755 )
+        self.assertEqual( self.statusOf( dirstate, 'clean.txt' ), 'M' )
+
+    def testV1FileModifiedWithDirstate( self ):
+        # a file with the same mtime as the dirstate may change again in the same second
+        self.writeV1( [v1Entry( b'n', 0o100644, len(self.clean_text), old_mtime, b'clean.txt' )] )
+        os.utime( str(self.hg_dir / 'dirstate'), (old_mtime, old_mtime) )
+
+        dirstate = wb_hg_dirstate.readDirstate( self.repo_root )
+        self.assertEqual( self.statusOf( dirstate, 'clean.txt' ), None )
+
+    def testV1Truncated( self ):
+        self.writeV1( [v1Entry( b'n', 0o100644, 6, old_mtime, b'clean.txt' )[:10]] )
+
+        with self.assertRaises( wb_hg_dirstate.WbHgDirstateError ):
+            wb_hg_dirstate.readDirstate( self.repo_root )
+
+    def testV2( self ):
+        tracked = wb_hg_dirstate._v2_wdir_tracked | wb_hg_dirstate._v2_p1_tracked
+        clean_flags = tracked | wb_hg_dirstate._v2_has_mode_and_size | wb_hg_dirstate._v2_has_mtime
+
+        # three nodes at the root, sub has one child, then the paths
+        node_size = 44
+        all_names = [b'clean.txt', b'added.txt', b'removed.txt', b'sub', b'sub/copied.txt']
+        all_path_offsets = []
+        path_offset = node_size * 5
+        for name in all_names:
+            all_path_offsets.append( path_offset )
+            path_offset += len(name)
+
+        all_nodes = [
+            v2Node( all_path_offsets[0], all_names[0], clean_flags, len(self.clean_text), old_mtime )
+            ,v2Node( all_path_offsets[1], all_names[1], wb_hg_dirstate._v2_wdir_tracked )
+            ,v2Node( all_path_offsets[2], all_names[2], wb_hg_dirstate._v2_p1_tracked )
+            # a directory is not an entry
+            ,v2Node( all_path_offsets[3], all_names[3], 0, children_offset=node_size*4, children_len=1 )
+            ,v2Node( all_path_offsets[4], all_names[4], tracked | wb_hg_dirstate._v2_p2_info )]
+
+        self.writeV2( all_nodes, b''.join( all_names ), 4 )
+
+        dirstate = wb_hg_dirstate.readDirstate( self.repo_root )
+
+        self.assertEqual( dirstate.firstParent(), parent_1 )
+        self.assertFalse( dirstate.isMerging() )
+        self.assertEqual( sorted( dirstate.allTrackedPaths() ),
+            [pathlib.Path( name ) for name in ('added.txt', 'clean.txt', 'removed.txt', 'sub/copied.txt')] )
+
+        self.assertEqual( self.statusOf( dirstate, 'clean.txt' ), 'C' )
+        self.assertEqual( self.statusOf( dirstate, 'added.txt' ), 'A' )
+        self.assertEqual( self.statusOf( dirstate, 'removed.txt' ), 'R' )
+        self.assertEqual( self.statusOf( dirstate, 'sub/copied.txt' ), 'M' )
+
+    def testV2Flags( self ):
+        tracked = wb_hg_dirstate._v2_wdir_tracked | wb_hg_dirstate._v2_p1_tracked
+        has_mode_and_size = wb_hg_dirstate._v2_has_mode_and_size
+        has_mtime = wb_hg_dirstate._v2_has_mtime
+
+        entry = wb_hg_dirstate._v2Entry( tracked | has_mode_and_size | has_mtime | wb_hg_dirstate._v2_mode_exec_perm, 5, 100, 7 )
+        self.assertEqual( (entry.state, entry.mode, entry.size, entry.mtime, entry.mtime_ns), ('n', stat.S_IFREG | 0o755, 5, 100, 7) )
+
+        entry = wb_hg_dirstate._v2Entry( tracked | has_mode_and_size | has_mtime | wb_hg_dirstate._v2_mode_is_symlink, 5, 100, 0 )
+        self.assertEqual( entry.mode, stat.S_IFLNK | 0o777 )
+
+        # the mtime cannot be trusted
+        entry = wb_hg_dirstate._v2Entry( tracked | has_mode_and_size | has_mtime | wb_hg_dirstate._v2_mtime_second_ambiguous, 5, 100, 0 )
+        self.assertEqual( (entry.size, entry.mtime), (5, -1) )
+
+        # hg already knows that the file is modified
+        entry = wb_hg_dirstate._v2Entry( tracked | has_mode_and_size | wb_hg_dirstate._v2_expected_state_is_modified, 5, 0, 0 )
+        self.assertEqual( (entry.state, entry.size), ('n', -1) )
+
+    def testV2NanosecondMtime( self ):
+        tracked = wb_hg_dirstate._v2_wdir_tracked | wb_hg_dirstate._v2_p1_tracked
+        flags = tracked | wb_hg_dirstate._v2_has_mode_and_size | wb_hg_dirstate._v2_has_mtime
+
+        path = self.repo_root / 'clean.txt'
+        os.utime( str(path), ns=(old_mtime*1000000000 + 5000, old_mtime*1000000000 + 5000) )
+        mtime_ns = path.stat().st_mtime_ns % 1000000000
+        if mtime_ns == 0:
+            self.skipTest( 'file system does not record nanoseconds' )
+
+        name = b'clean.txt'
+        self.writeV2( [v2Node( 44, name, flags, len(self.clean_text), old_mtime, mtime_ns )], name, 1 )
+        dirstate = wb_hg_dirstate.readDirstate( self.repo_root )
+        self.assertEqual( self.statusOf( dirstate, 'clean.txt' ), 'C' )
+
+        self.writeV2( [v2Node( 44, name, flags, len(self.clean_text), old_mtime, mtime_ns+1 )], name, 1 )
+        dirstate = wb_hg_dirstate.readDirstate( self.repo_root )
+        self.assertEqual( self.statusOf( dirstate, 'clean.txt' ), None )
+
+    def testV2BadDocket( self ):
+        (self.hg_dir / 'requires').write_text( 'dirstate-v2\n' )
+        (self.hg_dir / 'dirstate').write_bytes( b'not a docket' + b'\0' * 200 )
+
+        with self.assertRaises( wb_hg_dirstate.WbHgDirstateError ):
+            wb_hg_dirstate.readDirstate( self.repo_root )
+
+    def testV2TruncatedData( self ):
+        name = b'clean.txt'
+        self.writeV2( [v2Node( 44, name, wb_hg_dirstate._v2_wdir_tracked )], name, 1 )
+        data_path = self.hg_dir / 'dirstate.0123456789abcdef'
+        data_path.write_bytes( data_path.read_bytes()[:-1] )
+
+        with self.assertRaises( wb_hg_dirstate.WbHgDirstateError ):
+            wb_hg_dirstate.readDirstate( self.repo_root )
+
+    def testMissingDirstate( self ):
+        (self.hg_dir / 'requires').write_text( 'store\n' )
+
+        with self.assertRaises( wb_hg_dirstate.WbHgDirstateError ):
+            wb_hg_dirstate.readDirstate( self.repo_root )
+
+if __name__ == '__main__':
+    unittest.main()
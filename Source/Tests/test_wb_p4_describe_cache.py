@@ -0,0 +1,131 @@
+'''
+ ====================================================================
+ Copyright (c) 2018 Barry A Scott.  All rights reserved.
+
+ This software is licensed as described in the file LICENSE.txt,
+ which you should have received as part of this distribution.
+
+ ====================================================================
+
+    test_wb_p4_describe_cache.py
+
+'''
+import sys
+import pathlib
+import tempfile
+import unittest
+import unittest.mock
+
+source_dir = pathlib.Path( __file__ ).resolve().parent.parent
+sys.path.insert( 0, str( source_dir / 'Common' ) )
+sys.path.insert( 0, str( source_dir / 'Perforce' ) )
+
+import wb_platform_specific
+import wb_p4_describe_cache
+
+class FakeLog:
+    def __init__( self ):
+        self.all_errors = []
+
+    def error( self, msg ):
+        self.all_errors.append( msg )
+
+class FakeP4:
+    # stands in for the run() of a P4 connection
+    def __init__( self, all_pending=() ):
+        self.all_pending = set( all_pending )
+        self.all_runs = []
+
+    def run( self, *args ):
+        self.all_runs.append( args )
+        assert args[0:2] == ('describe', '-s')
+        return [{'change': change
+                ,'user': 'barry'
+                ,'desc': 'change %s' % (change,)
+                ,'time': '1500000000'
+                ,'status': 'pending' if int(change) in self.all_pending else 'submitted'
+                ,'client': 'not kept'}
+                for change in args[2:]]
+
+class TestP4DescribeCache(unittest.TestCase):
+    def setUp( self ):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.cache_dir = pathlib.Path( self.tmp_dir.name )
+
+        patcher = unittest.mock.patch.object( wb_platform_specific, 'getCacheDir', lambda: self.cache_dir )
+        patcher.start()
+        self.addCleanup( patcher.stop )
+
+        self.log = FakeLog()
+
+    def tearDown( self ):
+        self.tmp_dir.cleanup()
+
+    def newCache( self ):
+        return wb_p4_describe_cache.WbP4DescribeCache( 'perforce:1666', self.log )
+
+    def testOnlyMissingChangesAreDescribed( self ):
+        cache = self.newCache()
+        p4 = FakeP4()
+
+        all_result = cache.describeChanges( ['1', '2'], p4.run )
+        self.assertEqual( sorted( all_result ), [1, 2] )
+        self.assertEqual( all_result[1]['desc'], 'change 1' )
+        # only the fields that are used are kept
+        self.assertNotIn( 'client', all_result[1] )
+
+        all_result = cache.describeChanges( [2, 3], p4.run )
+        self.assertEqual( sorted( all_result ), [2, 3] )
+        self.assertEqual( p4.all_runs, [('describe', '-s', '1', '2'), ('describe', '-s', '3')] )
+
+        self.assertEqual( cache.describeChanges( [1, 2, 3], p4.run ).keys(), {1, 2, 3} )
+        self.assertEqual( len(p4.all_runs), 2 )
+        self.assertEqual( self.log.all_errors, [] )
+
+    def testSavedToDisk( self ):
+        self.newCache().describeChanges( [10, 11], FakeP4().run )
+
+        p4 = FakeP4()
+        all_result = self.newCache().describeChanges( [10, 11], p4.run )
+        self.assertEqual( sorted( all_result ), [10, 11] )
+        self.assertEqual( all_result[11]['desc'], 'change 11' )
+        self.assertEqual( p4.all_runs, [] )
+
+    def testPendingChangesAreNotCached( self ):
+        cache = self.newCache()
+        p4 = FakeP4( all_pending=[5] )
+
+        all_result = cache.describeChanges( [4, 5], p4.run )
+        self.assertEqual( all_result[5]['status'], 'pending' )
+
+        cache.describeChanges( [4, 5], p4.run )
+        self.assertEqual( p4.all_runs, [('describe', '-s', '4', '5'), ('describe', '-s', '5')] )
+
+    def testChunks( self ):
+        cache = self.newCache()
+        cache.describe_chunk_size = 2
+        p4 = FakeP4()
+
+        all_result = cache.describeChanges( range( 1, 6 ), p4.run )
+        self.assertEqual( sorted( all_result ), [1, 2, 3, 4, 5] )
+        self.assertEqual( p4.all_runs,
+            [('describe', '-s', '1', '2'), ('describe', '-s', '3', '4'), ('describe', '-s', '5')] )
+
+    def testCorruptCacheFile( self ):
+        self.newCache().describeChanges( [1], FakeP4().run )
+        for cache_path in self.cache_dir.glob( 'p4-describe-*.json' ):
+            cache_path.write_text( '{not json' )
+
+        p4 = FakeP4()
+        all_result = self.newCache().describeChanges( [1], p4.run )
+        self.assertEqual( sorted( all_result ), [1] )
+        self.assertEqual( len(p4.all_runs), 1 )
+        self.assertEqual( len(self.log.all_errors), 1 )
+
+    def testCachePerServer( self ):
+        cache_1 = wb_p4_describe_cache.describeCache( 'server-1:1666', self.log )
+        self.assertIs( wb_p4_describe_cache.describeCache( 'server-1:1666', self.log ), cache_1 )
+        self.assertIsNot( wb_p4_describe_cache.describeCache( 'server-2:1666', self.log ), cache_1 )
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,149 @@
+'''
+ ====================================================================
+ Copyright (c) 2016 Barry A Scott.  All rights reserved.
+
+ This software is licensed as described in the file LICENSE.txt,
+ which you should have received as part of this distribution.
+
+ ====================================================================
+
+    test_wb_svn_log_cache.py
+
+'''
+import sys
+import types
+import pathlib
+import tempfile
+import unittest
+import unittest.mock
+
+source_dir = pathlib.Path( __file__ ).resolve().parent.parent
+sys.path.insert( 0, str( source_dir / 'Common' ) )
+sys.path.insert( 0, str( source_dir / 'Svn' ) )
+
+try:
+    import pysvn
+
+except ImportError:
+    # the cache only needs pysvn to make revision objects
+    class Revision:
+        def __init__( self, kind, number ):
+            self.kind = kind
+            self.number = number
+
+    pysvn = types.ModuleType( 'pysvn' )
+    pysvn.Revision = Revision
+    pysvn.opt_revision_kind = types.SimpleNamespace( number='number' )
+    sys.modules[ 'pysvn' ] = pysvn
+
+import wb_platform_specific
+import wb_svn_log_cache
+
+class FakeLog:
+    def __init__( self ):
+        self.all_errors = []
+
+    def error( self, msg ):
+        self.all_errors.append( msg )
+
+def plainLog( revision, all_changed_paths=() ):
+    return {'revision': revision
+           ,'author': 'barry'
+           ,'date': 1500000000.0 + revision
+           ,'message': 'r%d' % (revision,)
+           ,'changed_paths': [{'action': 'M', 'path': path, 'copyfrom_path': None, 'copyfrom_revision': None}
+                                for path in all_changed_paths]}
+
+class TestSvnLogCache(unittest.TestCase):
+    def setUp( self ):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.cache_path = pathlib.Path( self.tmp_dir.name ) / 'svn-log' / 'uuid' / 'log.json'
+        self.log = FakeLog()
+
+    def tearDown( self ):
+        self.tmp_dir.cleanup()
+
+    def testAddAndReadBack( self ):
+        path_log = wb_svn_log_cache.WbSvnPathLog( self.cache_path, self.log )
+        self.assertTrue( path_log.isEmpty() )
+        self.assertIsNone( path_log.oldestLog() )
+
+        path_log.addLogs( [plainLog( 10 ), plainLog( 12, ['/trunk/a'] )], 10, 12, False )
+        self.assertFalse( path_log.isEmpty() )
+        self.assertEqual( (path_log.oldest, path_log.youngest, path_log.is_complete), (10, 12, False) )
+
+        # youngest first
+        all_logs = path_log.allLogs()
+        self.assertEqual( [log.revision.number for log in all_logs], [12, 10] )
+        self.assertEqual( all_logs[0].message, 'r12' )
+        self.assertEqual( all_logs[0].changed_paths[0].path, '/trunk/a' )
+        self.assertIsNone( all_logs[0].changed_paths[0].copyfrom_revision )
+        self.assertEqual( path_log.oldestLog()['revision'], 10 )
+
+        self.assertEqual( [log.revision.number for log in path_log.allLogs( oldest=11 )], [12] )
+        self.assertEqual( [log.revision.number for log in path_log.allLogs( youngest=11 )], [10] )
+
+    def testEntriesAreNewObjects( self ):
+        path_log = wb_svn_log_cache.WbSvnPathLog( self.cache_path, self.log )
+        path_log.addLogs( [plainLog( 1 )], 1, 1, True )
+
+        # callers add attributes such as is_tag to the entries
+        entry = path_log.allLogs()[0]
+        entry.is_tag = True
+        self.assertFalse( hasattr( path_log.allLogs()[0], 'is_tag' ) )
+
+        with self.assertRaises( AttributeError ):
+            entry.no_such_field
+
+    def testExtendRange( self ):
+        path_log = wb_svn_log_cache.WbSvnPathLog( self.cache_path, self.log )
+        path_log.addLogs( [plainLog( 20 )], 15, 20, False )
+        # older revisions
+        path_log.addLogs( [plainLog( 8 ), plainLog( 14 )], 5, 14, True )
+        # younger revisions
+        path_log.addLogs( [plainLog( 25 )], 20, 30, False )
+
+        self.assertEqual( (path_log.oldest, path_log.youngest, path_log.is_complete), (5, 30, True) )
+        self.assertEqual( [log.revision.number for log in path_log.allLogs()], [25, 20, 14, 8] )
+
+    def testSavedToDisk( self ):
+        path_log = wb_svn_log_cache.WbSvnPathLog( self.cache_path, self.log )
+        path_log.addLogs( [plainLog( 3 ), plainLog( 7 )], 1, 7, True )
+
+        path_log = wb_svn_log_cache.WbSvnPathLog( self.cache_path, self.log )
+        self.assertEqual( (path_log.oldest, path_log.youngest, path_log.is_complete), (1, 7, True) )
+        self.assertEqual( [log.revision.number for log in path_log.allLogs()], [7, 3] )
+        self.assertEqual( self.log.all_errors, [] )
+
+    def testCorruptCacheFile( self ):
+        self.cache_path.parent.mkdir( parents=True )
+        self.cache_path.write_text( '{"oldest": 1' )
+
+        path_log = wb_svn_log_cache.WbSvnPathLog( self.cache_path, self.log )
+        self.assertTrue( path_log.isEmpty() )
+        self.assertEqual( len(self.log.all_errors), 1 )
+
+    def testPlainLog( self ):
+        revision = pysvn.Revision( pysvn.opt_revision_kind.number, 9 )
+        copyfrom_revision = pysvn.Revision( pysvn.opt_revision_kind.number, 4 )
+        changed_path = wb_svn_log_cache.WbSvnLogEntry( action='A', path='/trunk/b', copyfrom_path='/trunk/a', copyfrom_revision=copyfrom_revision )
+        log = wb_svn_log_cache.WbSvnLogEntry( revision=revision, author='barry', date=1.5, message='copy', changed_paths=[changed_path] )
+
+        plain_log = wb_svn_log_cache.plainLog( log )
+        self.assertEqual( plain_log,
+            {'revision': 9, 'author': 'barry', 'date': 1.5, 'message': 'copy'
+            ,'changed_paths': [{'action': 'A', 'path': '/trunk/b', 'copyfrom_path': '/trunk/a', 'copyfrom_revision': 4}]} )
+
+        entry = wb_svn_log_cache.logEntry( plain_log )
+        self.assertEqual( entry.revision.number, 9 )
+        self.assertEqual( entry.changed_paths[0].copyfrom_revision.number, 4 )
+
+    def testPathLogPerKey( self ):
+        with unittest.mock.patch.object( wb_platform_specific, 'getCacheDir', lambda: pathlib.Path( self.tmp_dir.name ) ):
+            path_log = wb_svn_log_cache.pathLog( 'uuid-1', 'file:///repos/trunk', False, self.log )
+            self.assertIs( wb_svn_log_cache.pathLog( 'uuid-1', 'file:///repos/trunk', False, self.log ), path_log )
+            self.assertIsNot( wb_svn_log_cache.pathLog( 'uuid-1', 'file:///repos/trunk', True, self.log ), path_log )
+            self.assertIsNot( wb_svn_log_cache.pathLog( 'uuid-2', 'file:///repos/trunk', False, self.log ), path_log )
+
+if __name__ == '__main__':
+    unittest.main()
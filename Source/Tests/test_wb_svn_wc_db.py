@@ -0,0 +1,286 @@
+'''
+ ====================================================================
+ Copyright (c) 2016 Barry A Scott.  All rights reserved.
+
+ This software is licensed as described in the file LICENSE.txt,
+ which you should have received as part of this distribution.
+
+ ====================================================================
+
+    test_wb_svn_wc_db.py
+
+    read a wc.db made with the tables and columns that
+    wb_svn_wc_db uses, laid out as svn 1.8 to 1.14 do.
+
+'''
+import sys
+import os
+import zlib
+import hashlib
+import pathlib
+import sqlite3
+import tempfile
+import unittest
+
+sys.path.insert( 0, str( pathlib.Path( __file__ ).resolve().parent.parent / 'Svn' ) )
+
+import wb_svn_wc_db
+
+def compressPristine( text ):
+    # as svn__compress_zlib() does
+    size = len(text)
+    all_size_bytes = [size & 0x7f]
+    size >>= 7
+    while size > 0:
+        all_size_bytes.insert( 0, 0x80 | (size & 0x7f) )
+        size >>= 7
+
+    compressed = zlib.compress( text )
+    if len(compressed) >= len(text):
+        return bytes( all_size_bytes ) + text
+
+    return bytes( all_size_bytes ) + compressed
+
+class FakeWorkingCopy:
+    def __init__( self, wc_root, wc_format=31 ):
+        self.wc_root = wc_root
+        self.svn_dir = wc_root / '.svn'
+        (self.svn_dir / 'pristine').mkdir( parents=True )
+
+        self.db = sqlite3.connect( str(self.svn_dir / 'wc.db') )
+        self.db.executescript( '''
+            CREATE TABLE nodes (local_relpath TEXT, op_depth INTEGER, presence TEXT, kind TEXT,
+                                repos_path TEXT, checksum TEXT, properties BLOB,
+                                translated_size INTEGER, last_mod_time INTEGER, file_external INTEGER);
+            CREATE TABLE pristine (checksum TEXT, compression INTEGER);
+            CREATE TABLE actual_node (local_relpath TEXT);
+            CREATE TABLE externals (local_relpath TEXT);
+            CREATE TABLE lock (repos_relpath TEXT);
+            CREATE TABLE wc_lock (local_dir_relpath TEXT);
+            PRAGMA user_version = %d;
+            ''' % (wc_format,) )
+        self.addDir( '', 'trunk' )
+
+    def close( self ):
+        self.db.close()
+
+    def addNode( self, relpath, kind, repos_path, op_depth=0, presence='normal',
+                    checksum=None, properties=None, translated_size=None, last_mod_time=None, file_external=None ):
+        self.db.execute( 'INSERT INTO nodes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                        (relpath, op_depth, presence, kind, repos_path, checksum, properties,
+                        translated_size, last_mod_time, file_external) )
+        self.db.commit()
+
+    def addDir( self, relpath, repos_path, **kwds ):
+        path = self.wc_root / relpath
+        path.mkdir( parents=True, exist_ok=True )
+        self.addNode( relpath, 'dir', repos_path, **kwds )
+
+    def addFile( self, relpath, repos_path, text, compress=False, **kwds ):
+        path = self.wc_root / relpath
+        path.write_bytes( text )
+        file_stat = path.stat()
+
+        sha1 = hashlib.sha1( text ).hexdigest()
+        checksum = '$sha1$%s' % (sha1,)
+        pristine_path = self.svn_dir / 'pristine' / sha1[0:2] / ('%s.svn-base' % (sha1,))
+        pristine_path.parent.mkdir( exist_ok=True )
+        pristine_path.write_bytes( compressPristine( text ) if compress else text )
+        self.db.execute( 'INSERT INTO pristine VALUES (?, ?)', (checksum, 1 if compress else 0) )
+
+        kwds.setdefault( 'translated_size', file_stat.st_size )
+        kwds.setdefault( 'last_mod_time', file_stat.st_mtime_ns // 1000 )
+        self.addNode( relpath, 'file', repos_path, checksum=checksum, **kwds )
+        return pristine_path
+
+    def execute( self, sql, *args ):
+        self.db.execute( sql, args )
+        self.db.commit()
+
+class TestDecompressPristine(unittest.TestCase):
+    def testCompressed( self ):
+        text = b'line of text\n' * 100
+        data = compressPristine( text )
+        self.assertLess( len(data), len(text) )
+        self.assertEqual( wb_svn_wc_db.decompressPristine( data ), text )
+
+    def testStoredAsIs( self ):
+        # zlib cannot make a short text smaller
+        text = b'abc'
+        data = compressPristine( text )
+        self.assertEqual( data, b'\x03abc' )
+        self.assertEqual( wb_svn_wc_db.decompressPristine( data ), text )
+
+    def testEmpty( self ):
+        self.assertEqual( wb_svn_wc_db.decompressPristine( b'\x00' ), b'' )
+
+    def testMultiByteSize( self ):
+        text = os.urandom( 300 )
+        data = compressPristine( text )
+        # 300 is 0b10_0101100
+        self.assertEqual( data[0:2], bytes( [0x82, 0x2c] ) )
+        self.assertEqual( wb_svn_wc_db.decompressPristine( data ), text )
+
+    def testNotValid( self ):
+        text = b'line of text\n' * 100
+        data = compressPristine( text )
+
+        # the size does not match the text
+        self.assertIsNone( wb_svn_wc_db.decompressPristine( bytes( [data[0], data[1]+1] ) + data[2:] ) )
+        # not zlib data
+        self.assertIsNone( wb_svn_wc_db.decompressPristine( b'\x10' + b'not zlib data' ) )
+        # the size never ends
+        self.assertIsNone( wb_svn_wc_db.decompressPristine( b'\xff' * 12 ) )
+        self.assertIsNone( wb_svn_wc_db.decompressPristine( b'' ) )
+
+class TestPristineText(unittest.TestCase):
+    def setUp( self ):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.wc_root = pathlib.Path( self.tmp_dir.name )
+        self.wc = FakeWorkingCopy( self.wc_root )
+
+    def tearDown( self ):
+        self.wc.close()
+        self.tmp_dir.cleanup()
+
+    def testPristineText( self ):
+        self.wc.addDir( 'sub', 'trunk/sub' )
+        self.wc.addFile( 'plain.txt', 'trunk/plain.txt', b'plain text\n' )
+        compressed_text = b'compressed text\n' * 50
+        self.wc.addFile( 'sub/compressed.txt', 'trunk/sub/compressed.txt', compressed_text, compress=True )
+
+        # the working file is not used
+        (self.wc_root / 'plain.txt').write_bytes( b'edited\n' )
+
+        self.assertEqual( wb_svn_wc_db.findWcRoot( self.wc_root / 'sub' ), self.wc_root )
+        self.assertEqual( wb_svn_wc_db.pristineText( self.wc_root / 'plain.txt' ), b'plain text\n' )
+        self.assertEqual( wb_svn_wc_db.pristineText( self.wc_root / 'sub/compressed.txt' ), compressed_text )
+
+    def testNoPristineText( self ):
+        self.wc.addFile( 'keywords.txt', 'trunk/keywords.txt', b'$Id$\n', properties=b'(svn:keywords 2 Id)' )
+        self.wc.addFile( 'deleted.txt', 'trunk/deleted.txt', b'deleted\n' )
+        self.wc.addNode( 'deleted.txt', 'file', None, op_depth=1, presence='base-deleted' )
+        pristine_path = self.wc.addFile( 'fetch-on-demand.txt', 'trunk/fetch-on-demand.txt', b'not here\n' )
+        pristine_path.unlink()
+        pristine_path = self.wc.addFile( 'corrupt.txt', 'trunk/corrupt.txt', b'corrupt text\n' * 20, compress=True )
+        pristine_path.write_bytes( compressPristine( b'other text\n' * 20 ) )
+
+        for name in ('keywords.txt', 'deleted.txt', 'fetch-on-demand.txt', 'corrupt.txt', 'unversioned.txt'):
+            self.assertIsNone( wb_svn_wc_db.pristineText( self.wc_root / name ), name )
+
+    def testCopiedFile( self ):
+        # the working node of a copy has the text of the copy source
+        self.wc.addFile( 'copied.txt', 'trunk/original.txt', b'original\n', op_depth=1 )
+
+        self.assertEqual( wb_svn_wc_db.pristineText( self.wc_root / 'copied.txt' ), b'original\n' )
+
+    def testUnsupportedFormat( self ):
+        self.wc.execute( 'PRAGMA user_version = 20' )
+
+        with self.assertRaises( wb_svn_wc_db.WbSvnWcDbError ):
+            wb_svn_wc_db.WbSvnWcDb( self.wc_root )
+
+        self.assertIsNone( wb_svn_wc_db.pristineText( self.wc_root / 'plain.txt' ) )
+
+class TestScanForCandidates(unittest.TestCase):
+    def setUp( self ):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.wc_root = pathlib.Path( self.tmp_dir.name )
+        self.wc = FakeWorkingCopy( self.wc_root )
+
+        self.wc.addFile( 'clean.txt', 'trunk/clean.txt', b'clean\n' )
+        self.wc.addDir( 'sub', 'trunk/sub' )
+        self.wc.addFile( 'sub/clean.txt', 'trunk/sub/clean.txt', b'clean\n' )
+
+    def tearDown( self ):
+        self.wc.close()
+        self.tmp_dir.cleanup()
+
+    def scan( self, top_folder=None ):
+        if top_folder is None:
+            top_folder = self.wc_root
+
+        with wb_svn_wc_db.WbSvnWcDb( self.wc_root ) as wc_db:
+            all_paths, all_candidates = wc_db.scanForCandidates( top_folder )
+
+        return all_paths, set( path.relative_to( self.wc_root ).as_posix() for path in all_candidates )
+
+    def testClean( self ):
+        all_paths, all_candidates = self.scan()
+
+        self.assertEqual( all_candidates, set() )
+        self.assertEqual( all_paths,
+            {self.wc_root / 'clean.txt': False
+            ,self.wc_root / 'sub': True
+            ,self.wc_root / 'sub/clean.txt': False} )
+
+    def testChangedFiles( self ):
+        self.wc.addFile( 'resized.txt', 'trunk/resized.txt', b'resized\n' )
+        (self.wc_root / 'resized.txt').write_bytes( b'longer text\n' )
+
+        self.wc.addFile( 'touched.txt', 'trunk/touched.txt', b'touched\n' )
+        file_stat = (self.wc_root / 'touched.txt').stat()
+        os.utime( str(self.wc_root / 'touched.txt'), ns=(file_stat.st_atime_ns, file_stat.st_mtime_ns + 1000000) )
+
+        # svn did not record the size
+        self.wc.addFile( 'unknown-size.txt', 'trunk/unknown-size.txt', b'unknown\n', translated_size=-1 )
+
+        self.wc.addFile( 'missing.txt', 'trunk/missing.txt', b'missing\n' )
+        (self.wc_root / 'missing.txt').unlink()
+
+        all_paths, all_candidates = self.scan()
+        self.assertEqual( all_candidates, {'resized.txt', 'touched.txt', 'unknown-size.txt', 'missing.txt'} )
+        self.assertNotIn( self.wc_root / 'missing.txt', all_paths )
+
+    def testUnversioned( self ):
+        (self.wc_root / 'new.txt').write_bytes( b'new\n' )
+        (self.wc_root / 'new-folder/deeper').mkdir( parents=True )
+        (self.wc_root / 'new-folder/deeper/new.txt').write_bytes( b'new\n' )
+
+        all_paths, all_candidates = self.scan()
+        # status of the folder covers what is inside it
+        self.assertEqual( all_candidates, {'new.txt', 'new-folder'} )
+        self.assertEqual( all_paths[ self.wc_root / 'new-folder/deeper/new.txt' ], False )
+        self.assertEqual( all_paths[ self.wc_root / 'new-folder/deeper' ], True )
+
+    def testWorkingNodes( self ):
+        # added, deleted and changed properties
+        self.wc.addFile( 'added.txt', None, b'added\n', op_depth=1 )
+        self.wc.addNode( 'sub/clean.txt', 'file', None, op_depth=2, presence='base-deleted' )
+        self.wc.execute( 'INSERT INTO actual_node VALUES (?)', 'clean.txt' )
+
+        all_paths, all_candidates = self.scan()
+        self.assertEqual( all_candidates, {'added.txt', 'sub/clean.txt', 'clean.txt'} )
+
+    def testSwitchedAndExternal( self ):
+        self.wc.addDir( 'switched', 'branches/b1/switched' )
+        self.wc.addFile( 'external.txt', 'other/external.txt', b'external\n', file_external=1 )
+
+        all_paths, all_candidates = self.scan()
+        self.assertEqual( all_candidates, {'switched', 'external.txt'} )
+
+    def testTopFolder( self ):
+        (self.wc_root / 'clean.txt').write_bytes( b'modified text\n' )
+        (self.wc_root / 'sub/clean.txt').write_bytes( b'modified text\n' )
+        self.wc.execute( 'INSERT INTO actual_node VALUES (?)', '' )
+
+        all_paths, all_candidates = self.scan( self.wc_root / 'sub' )
+        self.assertEqual( all_candidates, {'sub/clean.txt'} )
+        self.assertEqual( list( all_paths ), [self.wc_root / 'sub/clean.txt'] )
+
+    def testNeedsSvnStatus( self ):
+        for table, value in (('externals', 'ext'), ('lock', 'trunk/clean.txt'), ('wc_lock', '')):
+            self.wc.execute( 'INSERT INTO %s VALUES (?)' % (table,), value )
+            with self.assertRaises( wb_svn_wc_db.WbSvnWcDbError ):
+                self.scan()
+
+            self.wc.execute( 'DELETE FROM %s' % (table,) )
+
+        self.scan()
+
+        (self.wc_root / 'sub/.svn').mkdir()
+        with self.assertRaises( wb_svn_wc_db.WbSvnWcDbError ):
+            self.scan()
+
+if __name__ == '__main__':
+    unittest.main()